@@ -0,0 +1,954 @@
+# pyfc4
+
+import collections
+import concurrent.futures
+import gzip
+import json
+import os
+import rdflib
+import sqlite3
+import time
+
+from pyfc4.models import BasicContainer, NonRDFSource, RateLimiter, NQUADS_QUAD
+
+# logging
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+# Harvester
+class Harvester(object):
+
+	'''
+	Class for incremental harvests of a subtree, emitting only resources that were created, changed, or deleted
+	since the previous harvest.
+
+	For each resource, the ETag and Last-Modified (fedora:lastModified) from a HEAD request, and URIs of children
+	from ldp:contains, are stored in a local JSON state file.  On the next harvest, a resource whose ETag and
+	Last-Modified are unchanged is not retrieved, and its children are taken from the state file.  By default, every
+	resource in the subtree is checked.  With prune, the subtree below an unchanged container is not visited at all,
+	and carried over from the previous state.
+
+	Note: pruning relies on changes below a container updating the container's ETag and Last-Modified.  Fedora
+	updates a container when children are added or removed, but not when a child's own triples or binary change,
+	so with prune, such changes below unchanged containers are not emitted.  Only enable it where that is acceptable,
+	e.g. for subtrees whose resources are only ever added or removed, not modified.
+
+	Args:
+		repo (Repository): instance of Repository class
+		state_path (str): file path of JSON state file, created if does not exist
+		concurrency (int): number of resources checked concurrently
+		prune (bool): if True, skip subtrees of unchanged containers, missing changes to their descendants
+	'''
+
+	def __init__(self, repo, state_path, concurrency=4, prune=False):
+
+		self.repo = repo
+		self.state_path = state_path
+		self.concurrency = concurrency
+		self.prune = prune
+
+		# load state from previous harvest
+		if os.path.exists(self.state_path):
+			with open(self.state_path) as f:
+				self.state = json.load(f)
+		else:
+			self.state = {}
+
+
+	def harvest(self, root=None):
+
+		'''
+		Generator to harvest subtree below root, yielding created, changed, and deleted resources.
+		When exhausted, state is saved to self.state_path.
+
+		Args:
+			root (rdflib.term.URIRef, str): URI of resource to start from, defaults to repository root
+
+		Returns:
+			(generator): tuples of (event, uri, resource), where event is 'created', 'changed', or 'deleted',
+				and resource is retrieved Resource, or None if deleted
+		'''
+
+		new_state = {}
+		queue = collections.deque([str(self.repo.parse_uri(root))])
+		with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+			futures = set()
+			while queue or futures:
+
+				# keep bounded window of submitted checks
+				while queue and len(futures) < self.concurrency * 2:
+					futures.add(executor.submit(self._check, queue.popleft()))
+
+				done, futures = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+				for future in done:
+					uri, watermark, children, resource = future.result()
+					previous = self.state.get(uri)
+
+					# resource no longer exists
+					if not watermark:
+						if self.repo.triple_index:
+							self.repo.triple_index.remove(uri)
+						for deleted_uri in self._subtree(uri):
+							yield ('deleted', rdflib.term.URIRef(deleted_uri), None)
+						continue
+
+					# unchanged
+					if resource == None:
+						if self.prune:
+							for unchanged_uri in self._subtree(uri):
+								new_state[unchanged_uri] = self.state[unchanged_uri]
+						else:
+							new_state[uri] = previous
+							queue.extend(previous['children'])
+						continue
+
+					# created or changed
+					new_state[uri] = dict(watermark, children=children)
+					yield ('changed' if previous else 'created', resource.uri, resource)
+
+					# children no longer contained
+					if previous:
+						for removed_uri in set(previous['children']) - set(children):
+							if self.repo.triple_index:
+								self.repo.triple_index.remove(removed_uri)
+							for deleted_uri in self._subtree(removed_uri):
+								yield ('deleted', rdflib.term.URIRef(deleted_uri), None)
+
+					queue.extend(children)
+
+		# save state
+		self.state = new_state
+		self.save()
+
+
+	def _check(self, uri):
+
+		'''
+		Checks resource with HEAD request, retrieving resource only if new or changed
+
+		Args:
+			uri (str): URI of resource
+
+		Returns:
+			(tuple): (uri, watermark dictionary or None if not found, list of child URIs, Resource or None if unchanged)
+		'''
+
+		head_response = self.repo.api.http_request('HEAD', uri)
+		if head_response.status_code in [404, 410]:
+			return (uri, None, [], None)
+		elif head_response.status_code != 200:
+			raise Exception('HTTP %s, error checking resource uri %s' % (head_response.status_code, uri))
+
+		# compare watermark
+		watermark = {
+			'etag':head_response.headers.get('ETag'),
+			'last_modified':head_response.headers.get('Last-Modified')
+		}
+		previous = self.state.get(uri)
+		if previous and previous['etag'] == watermark['etag'] and previous['last_modified'] == watermark['last_modified']:
+			return (uri, watermark, previous['children'], None)
+
+		# retrieve, using resource type from HEAD request
+		resource = self.repo.get_resource(uri, resource_type=self.repo.api.parse_resource_type(head_response))
+		if not resource:
+			return (uri, None, [], None)
+		children = [] if isinstance(resource, NonRDFSource) else [ str(child) for child in resource.children() ]
+		return (uri, watermark, children, resource)
+
+
+	def _subtree(self, uri):
+
+		'''
+		Returns URI and URIs of all descendants from previous state
+
+		Args:
+			uri (str): URI of resource
+
+		Returns:
+			(list)
+		'''
+
+		uris = []
+		stack = [uri]
+		while stack:
+			uri = stack.pop()
+			if uri in self.state:
+				uris.append(uri)
+				stack.extend(self.state[uri]['children'])
+		return uris
+
+
+	def save(self):
+
+		'''
+		Atomically writes state to self.state_path
+		'''
+
+		tmp_path = '%s.tmp' % self.state_path
+		with open(tmp_path, 'w') as f:
+			json.dump(self.state, f)
+		os.replace(tmp_path, self.state_path)
+
+
+
+# Bulk Importer
+class BulkImporter(object):
+
+	'''
+	Class to import RDF dumps, with one named graph per resource, into the repository.
+
+	Graphs are staged from N-Quads, TriG, or Turtle files into a local SQLite checkpoint database, then created
+	level by level of the container hierarchy, so that parents are created before children.  Within each level,
+	resources are created concurrently within transactions of batch_size resources, and each committed batch is
+	recorded in the checkpoint, so that a failed import resumes with the resources not yet created.
+
+	Base URIs are rewritten from source_base to target_base, or the repository root, matching whole path segments,
+	e.g. source_base http://old/rest/foo rewrites http://old/rest/foo and http://old/rest/foo/bar, but not
+	http://old/rest/foobar.  Server managed triples are removed, while interaction model types, e.g.
+	ldp:DirectContainer, and their membership triples are kept, and resources are sent with lenient handling.
+	NonRDFSource descriptions are skipped, as their binary data is not part of the dump.
+
+	Args:
+		repo (Repository): instance of Repository class
+		checkpoint_path (str): file path of SQLite checkpoint database, created if does not exist
+		source_base (str): base URI of source repository in dump. If None, not rewritten
+		target_base (str): base URI that source_base is rewritten to, defaults to repo.root
+		concurrency (int): number of resources created concurrently
+		batch_size (int): number of resources per transaction
+	'''
+
+	# server managed predicates, rdf:type values, and namespaces of both
+	server_managed_predicates = [
+		'http://www.w3.org/ns/ldp#contains',
+		'http://www.iana.org/assignments/relation/describedby'
+	]
+	server_managed_types = [
+		'http://www.w3.org/ns/ldp#Resource',
+		'http://www.w3.org/ns/ldp#RDFSource',
+		'http://www.w3.org/ns/ldp#Container'
+	]
+	server_managed_namespaces = [
+		'http://fedora.info/definitions/v4/repository#'
+	]
+
+	def __init__(self, repo, checkpoint_path, source_base=None, target_base=None, concurrency=4, batch_size=500):
+
+		self.repo = repo
+		self.checkpoint_path = checkpoint_path
+		# base URIs, with trailing slash to match whole path segments
+		self.source_base = source_base.rstrip('/') + '/' if source_base else None
+		self.target_base = (target_base or repo.root).rstrip('/') + '/'
+		self.concurrency = concurrency
+		self.batch_size = batch_size
+
+		# init checkpoint
+		self.checkpoint = sqlite3.connect(self.checkpoint_path)
+		self.checkpoint.executescript('''
+			CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY);
+			CREATE TABLE IF NOT EXISTS graphs (
+				uri TEXT PRIMARY KEY,
+				depth INTEGER,
+				status TEXT,
+				error TEXT
+			);
+			CREATE INDEX IF NOT EXISTS graphs_status_depth ON graphs (status, depth);
+			CREATE TABLE IF NOT EXISTS lines (graph TEXT, line TEXT);
+			CREATE INDEX IF NOT EXISTS lines_graph ON lines (graph);
+		''')
+		self.checkpoint.commit()
+
+
+	def load(self, path, format=None, default_graph=None):
+
+		'''
+		Stage graphs from file into checkpoint database.  Files already staged are skipped.
+
+		Triples of N-Quads and TriG outside named graphs, in the default graph, are staged to default_graph if set,
+		otherwise an exception is raised, as is for graphs named by blank nodes, which cannot be created as resources.
+
+		Args:
+			path (str): file path of dump, optionally gzip compressed with .gz extension
+			format (str): 'nquads', 'trig', or 'turtle'. If None, determined from file extension
+			default_graph (str): optional, URI of resource, in source repository, for triples in default graph
+
+		Returns:
+			(int): number of graphs staged
+		'''
+
+		# skip if already staged
+		if self.checkpoint.execute('SELECT 1 FROM sources WHERE path = ?', (path,)).fetchone():
+			logger.debug('%s already staged, skipping' % path)
+			return 0
+
+		# determine format
+		if not format:
+			extension = path[:-3] if path.endswith('.gz') else path
+			format = {'nq':'nquads', 'trig':'trig', 'ttl':'turtle'}.get(extension.split('.')[-1], 'nquads')
+
+		opener = gzip.open if path.endswith('.gz') else open
+
+		def graph_name(graph, source):
+			# default graph
+			if graph == None:
+				if not default_graph:
+					raise Exception('triples outside named graph in %s, %s, set default_graph to import' % (path, source))
+				return default_graph
+			if not graph.startswith('<'):
+				raise Exception('graph named by blank node %s in %s, cannot import as resource' % (graph, path))
+			return graph[1:-1]
+
+		# N-Quads, streamed line by line, and tokenized into N-Triples terms
+		if format == 'nquads':
+			def quads():
+				with opener(path, 'rt', encoding='utf-8') as f:
+					for number, line in enumerate(f, 1):
+						line = line.strip()
+						if not line or line.startswith('#'):
+							continue
+						match = NQUADS_QUAD.match(line)
+						if not match:
+							raise Exception('could not parse N-Quads in %s, line %s' % (path, number))
+						subject, predicate, obj, graph = match.groups()
+						yield (graph_name(graph, 'line %s' % number), (subject, predicate, obj))
+			quads = quads()
+
+		# TriG, or Turtle grouped by subject document, serialized as N-Triples and tokenized
+		else:
+			with opener(path, 'rt', encoding='utf-8') as f:
+				data = f.read()
+
+			def ntriples_terms(graph):
+				data = graph.serialize(format='nt')
+				if isinstance(data, bytes):
+					data = data.decode('utf-8')
+				for line in data.splitlines():
+					match = NQUADS_QUAD.match(line)
+					if match:
+						yield match.groups()[:3]
+
+			if format == 'trig':
+				dataset = rdflib.Dataset()
+				dataset.parse(data=data, format='trig')
+				def quads():
+					for g in dataset.graphs():
+						if g.identifier == rdflib.graph.DATASET_DEFAULT_GRAPH_ID:
+							if not len(g):
+								continue
+							name = graph_name(None, 'default graph')
+						else:
+							name = graph_name(g.identifier.n3(), g.identifier)
+						for terms in ntriples_terms(g):
+							yield (name, terms)
+				quads = quads()
+			else:
+				graph = rdflib.Graph().parse(data=data, format='turtle')
+				quads = ( (terms[0][1:-1].split('#')[0], terms) for terms in ntriples_terms(graph) if terms[0].startswith('<') )
+
+		# stage, rewriting base URI of URI terms
+		try:
+			graphs = set()
+			batch = []
+			for graph, terms in quads:
+				graph = self._rewrite_uri(graph, self.source_base, self.target_base)
+				line = '%s %s %s .' % tuple(self._rewrite_terms(terms, self.source_base, self.target_base))
+				if graph not in graphs:
+					graphs.add(graph)
+					self.checkpoint.execute(
+						'INSERT OR IGNORE INTO graphs (uri, depth, status) VALUES (?, ?, ?)',
+						(graph, self._depth(graph), 'pending'))
+				batch.append((graph, line))
+				if len(batch) >= 10000:
+					self.checkpoint.executemany('INSERT INTO lines (graph, line) VALUES (?, ?)', batch)
+					batch = []
+			self.checkpoint.executemany('INSERT INTO lines (graph, line) VALUES (?, ?)', batch)
+		except Exception:
+			# discard graphs staged from this file
+			self.checkpoint.rollback()
+			raise
+		self.checkpoint.execute('INSERT INTO sources (path) VALUES (?)', (path,))
+		self.checkpoint.commit()
+
+		logger.debug('staged %s graphs from %s' % (len(graphs), path))
+		return len(graphs)
+
+
+	def _rewrite_uri(self, uri, source, target):
+
+		'''
+		Rewrites URI from source base URI to target base URI, if URI is the source base URI, or below it
+
+		Args:
+			uri (str): URI
+			source (str): base URI to rewrite, with trailing slash, if None, URI is returned unchanged
+			target (str): base URI to rewrite to, with trailing slash
+
+		Returns:
+			(str)
+		'''
+
+		if not source:
+			return uri
+		if uri == source.rstrip('/'):
+			return target.rstrip('/')
+		if uri.startswith(source):
+			return target + uri[len(source):]
+		return uri
+
+
+	def _rewrite_terms(self, terms, source, target):
+
+		'''
+		Rewrites URI terms, in N-Triples syntax, from source base URI to target base URI, see _rewrite_uri().
+		Literals, including those containing the source base URI, and blank nodes are not rewritten.
+
+		Args:
+			terms (tuple): N-Triples terms
+			source (str): base URI to rewrite, with trailing slash, if None, terms are returned unchanged
+			target (str): base URI to rewrite to, with trailing slash
+
+		Returns:
+			(list)
+		'''
+
+		if not source:
+			return list(terms)
+		return [ '<%s>' % self._rewrite_uri(term[1:-1], source, target) if term.startswith('<') else term for term in terms ]
+
+
+	def _depth(self, uri):
+
+		'''
+		Returns depth of URI below repository root, or -1 if outside repository root
+		'''
+
+		if not uri.startswith(self.repo.root):
+			return -1
+		return len([ segment for segment in uri[len(self.repo.root):].split('/') if segment ])
+
+
+	def run(self):
+
+		'''
+		Create staged resources not yet created, level by level of hierarchy, in concurrent transactions
+
+		Args:
+			None
+
+		Returns:
+			(dict): ('created':(int), 'failed':(int), 'skipped':(int), 'elapsed':(float))
+		'''
+
+		stime = time.time()
+		report = {'created':0, 'failed':0, 'skipped':0}
+
+		# graphs outside repository root
+		cursor = self.checkpoint.execute("UPDATE graphs SET status = 'failed', error = 'outside repository root' WHERE depth = -1 AND status != 'done'")
+		report['failed'] += cursor.rowcount
+		self.checkpoint.commit()
+
+		# create level by level, parents before children
+		depths = [ row[0] for row in self.checkpoint.execute("SELECT DISTINCT depth FROM graphs WHERE status IN ('pending', 'failed') AND depth >= 0 ORDER BY depth") ]
+		for depth in depths:
+			uris = [ row[0] for row in self.checkpoint.execute("SELECT uri FROM graphs WHERE status IN ('pending', 'failed') AND depth = ?", (depth,)) ]
+			for i in range(0, len(uris), self.batch_size):
+				self._run_batch(uris[i:i + self.batch_size], report)
+
+		report['elapsed'] = time.time() - stime
+		logger.debug('bulk import complete: %s' % report)
+		return report
+
+
+	def _run_batch(self, uris, report):
+
+		'''
+		Create batch of resources concurrently within single transaction, and record result in checkpoint.
+		If any resources fail, transaction is rolled back and remaining resources are retried in new transaction.
+		'''
+
+		txn = self.repo.start_txn()
+		results = {}
+		errors = {}
+		with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+			futures = { executor.submit(self._create, txn, uri):uri for uri in uris }
+			for future in concurrent.futures.as_completed(futures):
+				uri = futures[future]
+				try:
+					results[uri] = future.result()
+				except Exception as e:
+					logger.debug('could not create %s: %s' % (uri, e))
+					errors[uri] = str(e)
+
+		# rollback, record failures, and retry remainder
+		if errors:
+			txn.rollback()
+			self.checkpoint.executemany(
+				"UPDATE graphs SET status = 'failed', error = ? WHERE uri = ?",
+				[ (error, uri) for uri, error in errors.items() ])
+			self.checkpoint.commit()
+			report['failed'] += len(errors)
+			retry = [ uri for uri in uris if uri not in errors ]
+			if retry:
+				self._run_batch(retry, report)
+			return
+
+		# commit, and checkpoint
+		txn.commit()
+		self.checkpoint.executemany(
+			"UPDATE graphs SET status = ?, error = NULL WHERE uri = ?",
+			[ ('done' if status == 'created' else status, uri) for uri, status in results.items() ])
+		self.checkpoint.commit()
+		for status in results.values():
+			report[status] += 1
+
+
+	def _create(self, txn, uri):
+
+		'''
+		Create or replace single resource in transaction from staged lines
+
+		Returns:
+			(str): 'created', or 'skipped' for NonRDFSource descriptions
+		'''
+
+		# read lines with separate connection, for worker thread
+		connection = sqlite3.connect(self.checkpoint_path)
+		try:
+			lines = [ row[0] for row in connection.execute('SELECT line FROM lines WHERE graph = ?', (uri,)) ]
+		finally:
+			connection.close()
+
+		# filter server managed triples, and rewrite URI terms to transaction root
+		kept = []
+		for line in lines:
+			terms = NQUADS_QUAD.match(line).groups()[:3]
+			predicate = terms[1][1:-1]
+			if predicate in self.server_managed_predicates or any([ predicate.startswith(ns) for ns in self.server_managed_namespaces ]):
+				continue
+			if predicate == 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type' and terms[2].startswith('<'):
+				rdf_type = terms[2][1:-1]
+				if rdf_type == 'http://www.w3.org/ns/ldp#NonRDFSource':
+					return 'skipped'
+				# keep interaction model types, e.g. ldp:DirectContainer
+				if rdf_type in self.server_managed_types or any([ rdf_type.startswith(ns) for ns in self.server_managed_namespaces ]):
+					continue
+			kept.append('%s %s %s .' % tuple(self._rewrite_terms(terms, self.repo.root, txn.root)))
+
+		# PUT to transaction
+		txn_uri = uri.replace(self.repo.root, txn.root, 1)
+		data = '\n'.join(kept) + '\n'
+		response = txn.api.http_request(
+			'PUT',
+			txn_uri,
+			data=data.encode('utf-8'),
+			headers={
+				'Content-Type':'application/n-triples',
+				'Prefer':'handling=lenient; received="minimal"'
+			})
+		if response.status_code not in [201, 204]:
+			raise Exception('HTTP %s, could not create %s: %s' % (response.status_code, uri, response.text))
+		return 'created'
+
+
+	def close(self):
+
+		'''
+		Close checkpoint database
+		'''
+
+		self.checkpoint.close()
+
+
+
+# Ingest Coordinator
+class IngestCoordinator(object):
+
+	'''
+	Class to ingest a workload of resources in several concurrent transactions, instead of one.
+
+	The workload is partitioned into shards, and each shard is created in its own transaction, from
+	Repository.transaction(), on its own worker, then committed, or rolled back and retried on failure.
+	Resources are kept in the same shard as their ancestors within the workload, as uncommitted parents are not
+	visible to other transactions, and shards are balanced by number of resources.
+
+	Each item of the workload is either a callable, called with the transaction, or a dictionary:
+
+		{
+			'uri':'collections/foo/bar', # relative to repository root, or None for repository minted URI
+			'type':BasicContainer, # optional, resource class, defaults to BasicContainer
+			'triples':[(DC.title, Literal('bar'))], # optional, (predicate, object) tuples
+			'binary_data':b'...', # optional, for NonRDFSource
+			'binary_mimetype':'text/plain' # optional, for NonRDFSource
+		}
+
+	Args:
+		repo (Repository): instance of Repository class
+		shards (int): number of shards, and concurrent transactions
+		retries (int): number of times a failed shard is retried, in a new transaction
+		shard_concurrency (int): number of resources flushed concurrently within each transaction
+		buffer_size (int): number of buffered operations that trigger flush within each transaction
+	'''
+
+	def __init__(self, repo, shards=4, retries=2, shard_concurrency=2, buffer_size=500):
+
+		self.repo = repo
+		self.shards = shards
+		self.retries = retries
+		self.shard_concurrency = shard_concurrency
+		self.buffer_size = buffer_size
+
+
+	def partition(self, workload):
+
+		'''
+		Partitions workload into shards, keeping items with their ancestors within the workload
+
+		Args:
+			workload (list): list of dictionaries or callables
+
+		Returns:
+			(list): list of shards, each list of items, ordered parents first
+		'''
+
+		uris = set([ item['uri'].strip('/') for item in workload if isinstance(item, dict) and item.get('uri') ])
+
+		def group_key(index, item):
+			if not isinstance(item, dict) or not item.get('uri'):
+				return index
+			# topmost ancestor within workload
+			segments = item['uri'].strip('/').split('/')
+			for i in range(1, len(segments) + 1):
+				if '/'.join(segments[:i]) in uris:
+					return '/'.join(segments[:i])
+
+		groups = collections.OrderedDict()
+		for index, item in enumerate(workload):
+			groups.setdefault(group_key(index, item), []).append(item)
+
+		# balance groups across shards, largest first
+		shards = [ [] for i in range(0, min(self.shards, len(groups)) or 1) ]
+		for group in sorted(groups.values(), key=len, reverse=True):
+			min(shards, key=len).extend(group)
+
+		# order each shard parents first
+		def depth(item):
+			if isinstance(item, dict) and item.get('uri'):
+				return len(item['uri'].strip('/').split('/'))
+			return 0
+		return [ sorted(shard, key=depth) for shard in shards if shard ]
+
+
+	def _create(self, txn, item):
+
+		'''
+		Creates single item of workload within transaction
+		'''
+
+		if callable(item):
+			return item(txn)
+
+		resource_type = item.get('type', BasicContainer)
+		if issubclass(resource_type, NonRDFSource):
+			resource = resource_type(txn, item.get('uri'), binary_data=item.get('binary_data'), binary_mimetype=item.get('binary_mimetype'))
+		else:
+			resource = resource_type(txn, item.get('uri'))
+		for p, o in item.get('triples', []):
+			resource.add_triple(p, o, auto_refresh=False)
+		resource.create(specify_uri=bool(item.get('uri')))
+
+
+	def _run_shard(self, index, shard):
+
+		'''
+		Creates shard in transaction, retrying in new transaction on failure
+
+		Returns:
+			(dict): ('shard':(int), 'resources':(int), 'attempts':(int), 'committed':(bool), 'error':(str), 'elapsed':(float))
+		'''
+
+		stime = time.time()
+		result = {'shard':index, 'resources':len(shard), 'attempts':0, 'committed':False, 'error':None}
+		while result['attempts'] <= self.retries and not result['committed']:
+			result['attempts'] += 1
+			try:
+				with self.repo.transaction(concurrency=self.shard_concurrency, buffer_size=self.buffer_size) as txn:
+					for item in shard:
+						self._create(txn, item)
+				result['committed'] = True
+				result['error'] = None
+			except Exception as e:
+				logger.debug('shard %s, attempt %s failed: %s' % (index, result['attempts'], e))
+				result['error'] = str(e)
+		result['elapsed'] = time.time() - stime
+		return result
+
+
+	def run(self, workload):
+
+		'''
+		Partitions and ingests workload in concurrent transactions
+
+		Args:
+			workload (list): list of dictionaries or callables
+
+		Returns:
+			(dict): ('shards':(list): result of each shard, 'committed':(int), 'failed':(int), 'resources':(int), 'elapsed':(float))
+		'''
+
+		stime = time.time()
+		shards = self.partition(workload)
+		with concurrent.futures.ThreadPoolExecutor(max_workers=len(shards)) as executor:
+			results = list(executor.map(self._run_shard, range(0, len(shards)), shards))
+
+		report = {
+			'shards':results,
+			'committed':len([ result for result in results if result['committed'] ]),
+			'failed':len([ result for result in results if not result['committed'] ]),
+			'resources':sum([ result['resources'] for result in results if result['committed'] ]),
+			'elapsed':time.time() - stime
+		}
+		logger.debug('ingest complete, %s of %s shards committed' % (report['committed'], len(results)))
+		return report
+
+
+
+# Fixity Audit
+class FixityAudit(object):
+
+	'''
+	Class to run rolling fixity checks over many NonRDFSource resources.
+
+	Binaries to audit are registered in a local SQLite ledger, from a list of URIs or by walking a subtree.
+	Fixity checks via fcr:fixity are run with bounded concurrency and a ceiling on requests per second,
+	and each verdict and timing is recorded in the ledger as it completes.  Runs select binaries checked least
+	recently first, so an interrupted run resumes where it left off when run again.
+
+	Args:
+		repo (Repository): instance of Repository class
+		ledger_path (str): file path of SQLite ledger, created if does not exist
+		concurrency (int): number of fixity checks run concurrently
+		rate (float): maximum fixity requests per second, if None, no limit
+	'''
+
+	def __init__(self, repo, ledger_path, concurrency=4, rate=None):
+
+		self.repo = repo
+		self.ledger_path = ledger_path
+		self.concurrency = concurrency
+		self.rate_limiter = RateLimiter(rate)
+
+		# init ledger
+		self.ledger = sqlite3.connect(self.ledger_path)
+		self.ledger.executescript('''
+			CREATE TABLE IF NOT EXISTS binaries (
+				uri TEXT PRIMARY KEY,
+				added REAL,
+				last_checked REAL,
+				verdict INTEGER,
+				elapsed REAL,
+				error TEXT
+			);
+			CREATE INDEX IF NOT EXISTS binaries_last_checked ON binaries (last_checked);
+			CREATE TABLE IF NOT EXISTS checks (
+				uri TEXT,
+				checked REAL,
+				verdict INTEGER,
+				elapsed REAL,
+				error TEXT
+			);
+			CREATE INDEX IF NOT EXISTS checks_uri ON checks (uri);
+		''')
+		self.ledger.commit()
+
+
+	def add_uris(self, uris):
+
+		'''
+		Register binaries in ledger, ignoring those already registered
+
+		Args:
+			uris (iterable): URIs of NonRDFSource resources, as rdflib.term.URIRef or str
+
+		Returns:
+			(int): number of binaries in ledger
+		'''
+
+		now = time.time()
+		self.ledger.executemany(
+			'INSERT OR IGNORE INTO binaries (uri, added) VALUES (?, ?)',
+			( (self.repo.parse_uri(uri).toPython(), now) for uri in uris ))
+		self.ledger.commit()
+		return self.ledger.execute('SELECT COUNT(*) FROM binaries').fetchone()[0]
+
+
+	def add_uri_file(self, path):
+
+		'''
+		Register binaries from file with one URI per line
+
+		Args:
+			path (str): file path of URI list
+
+		Returns:
+			(int): number of binaries in ledger
+		'''
+
+		with open(path) as f:
+			return self.add_uris( line.strip() for line in f if line.strip() )
+
+
+	def add_subtree(self, root):
+
+		'''
+		Walk subtree by following ldp:contains from root, registering all NonRDFSource resources
+
+		Args:
+			root (rdflib.term.URIRef, str): URI of root resource
+
+		Returns:
+			(int): number of binaries in ledger
+		'''
+
+		return self.add_uris( ref.uri for ref in self.repo.walk(
+			root,
+			concurrency=self.concurrency,
+			include_types=[NonRDFSource],
+			uris_only=True,
+			rate=self.rate_limiter.rate) )
+
+
+	def pending(self, older_than=None, limit=None):
+
+		'''
+		Returns URIs of binaries due for fixity check, never checked first, then least recently checked
+
+		Args:
+			older_than (int, float): seconds, only select binaries not checked within this window. If None, all binaries.
+			limit (int): maximum number of URIs
+
+		Returns:
+			(list): URIs as str
+		'''
+
+		query = 'SELECT uri FROM binaries'
+		params = []
+		if older_than != None:
+			query += ' WHERE last_checked IS NULL OR last_checked < ?'
+			params.append(time.time() - older_than)
+		query += ' ORDER BY last_checked IS NOT NULL, last_checked ASC'
+		if limit:
+			query += ' LIMIT ?'
+			params.append(limit)
+		return [ row[0] for row in self.ledger.execute(query, params) ]
+
+
+	def _check(self, uri):
+
+		'''
+		Run fixity check for single binary, without retrieving resource
+
+		Args:
+			uri (str): URI of binary
+
+		Returns:
+			(tuple): (uri, verdict, elapsed, error)
+		'''
+
+		self.rate_limiter.wait()
+		stime = time.time()
+		try:
+			verdict = NonRDFSource(self.repo, uri).fixity()['verdict']
+			return (uri, verdict, time.time() - stime, None)
+		except Exception as e:
+			logger.debug('fixity check for %s failed: %s' % (uri, e))
+			return (uri, None, time.time() - stime, str(e))
+
+
+	def _record(self, uri, verdict, elapsed, error):
+
+		'''
+		Record result of fixity check in ledger
+		'''
+
+		checked = time.time()
+		verdict = None if verdict == None else int(verdict)
+		self.ledger.execute(
+			'UPDATE binaries SET last_checked = ?, verdict = ?, elapsed = ?, error = ? WHERE uri = ?',
+			(checked, verdict, elapsed, error, uri))
+		self.ledger.execute(
+			'INSERT INTO checks (uri, checked, verdict, elapsed, error) VALUES (?, ?, ?, ?, ?)',
+			(uri, checked, verdict, elapsed, error))
+		self.ledger.commit()
+
+
+	def run(self, older_than=None, limit=None):
+
+		'''
+		Run fixity checks for pending binaries, recording each result as it completes
+
+		Args:
+			older_than (int, float): seconds, only check binaries not checked within this window.  If None, check all binaries.
+			limit (int): maximum number of binaries to check
+
+		Returns:
+			(dict): ('checked':(int), 'passed':(int), 'failed':(int), 'errors':(int), 'elapsed':(float))
+		'''
+
+		stime = time.time()
+		report = {'checked':0, 'passed':0, 'failed':0, 'errors':0}
+		uris = iter(self.pending(older_than=older_than, limit=limit))
+
+		# keep bounded window of submitted checks
+		with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+			futures = set()
+			for uri in uris:
+				futures.add(executor.submit(self._check, uri))
+				if len(futures) >= self.concurrency * 2:
+					done, futures = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+					for future in done:
+						self._tally(report, *future.result())
+			for future in concurrent.futures.as_completed(futures):
+				self._tally(report, *future.result())
+
+		report['elapsed'] = time.time() - stime
+		logger.debug('fixity audit complete: %s' % report)
+		return report
+
+
+	def _tally(self, report, uri, verdict, elapsed, error):
+
+		'''
+		Record result in ledger and tally in report
+		'''
+
+		self._record(uri, verdict, elapsed, error)
+		report['checked'] += 1
+		if error:
+			report['errors'] += 1
+		elif verdict:
+			report['passed'] += 1
+		else:
+			report['failed'] += 1
+
+
+	def failures(self):
+
+		'''
+		Returns URIs of binaries whose most recent fixity check failed or errored
+
+		Returns:
+			(list): URIs as str
+		'''
+
+		return [ row[0] for row in self.ledger.execute(
+			'SELECT uri FROM binaries WHERE last_checked IS NOT NULL AND (verdict IS NULL OR verdict = 0)') ]
+
+
+	def close(self):
+
+		'''
+		Close ledger
+		'''
+
+		self.ledger.close()
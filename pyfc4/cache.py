@@ -0,0 +1,905 @@
+# pyfc4
+
+import hashlib
+import json
+import mmap
+import os
+import rdflib
+import requests
+import sqlite3
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+# optional, for locking shared caches across processes
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+
+# logging
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+# CachedResponse
+class CachedResponse(object):
+
+	'''
+	Minimal stand-in for requests.models.Response, for resources served from local caches.
+	Provides attributes of a response used by Resource and API.
+
+	Args:
+		uri (rdflib.term.URIRef, str): URI of response
+		content (bytes): payload
+		headers (dict): response headers
+		status_code (int): HTTP status code
+	'''
+
+	def __init__(self, uri, content, headers, status_code=200):
+
+		self.url = str(uri)
+		self.content = content
+		self.headers = requests.structures.CaseInsensitiveDict(headers)
+		self.status_code = status_code
+
+
+	def __repr__(self):
+		return '<CachedResponse [%s], uri: %s>' % (self.status_code, self.url)
+
+
+	@property
+	def text(self):
+		return self.content.decode('utf-8')
+
+
+
+# Cached Binary Response
+class CachedBinaryResponse(object):
+
+	'''
+	Stand-in for streamable requests.models.Response, for binary data served from BinaryCache, so that
+	resource.binary.data provides the same attributes, e.g. content, iter_content(), and status_code, whether
+	or not a binary cache is configured.  The cached file object, or memory map, is at self.raw, and is read
+	directly with read().
+
+	Args:
+		uri (rdflib.term.URIRef, str): URI of binary
+		raw (file object, mmap.mmap): cached binary data
+		headers (dict): response headers
+	'''
+
+	def __init__(self, uri, raw, headers):
+
+		self.url = str(uri)
+		self.raw = raw
+		self.headers = requests.structures.CaseInsensitiveDict(headers)
+		self.status_code = 200
+		self.ok = True
+		self._content = None
+
+
+	def __repr__(self):
+		return '<CachedBinaryResponse [%s], uri: %s>' % (self.status_code, self.url)
+
+
+	def __iter__(self):
+		return self.iter_content(128)
+
+
+	@property
+	def content(self):
+
+		'''
+		Reads all binary data, once
+		'''
+
+		if self._content is None:
+			self.raw.seek(0)
+			self._content = self.raw.read()
+		return self._content
+
+
+	@property
+	def text(self):
+		return self.content.decode('utf-8')
+
+
+	def iter_content(self, chunk_size=1, decode_unicode=False):
+
+		'''
+		Reads binary data in chunks of chunk_size bytes
+		'''
+
+		while True:
+			chunk = self.raw.read(chunk_size)
+			if not chunk:
+				break
+			yield chunk
+
+
+	def read(self, size=-1):
+		return self.raw.read(size)
+
+
+	def close(self):
+		self.raw.close()
+
+
+
+# Metadata Cache
+class MetadataCache(object):
+
+	'''
+	Persistent, on-disk cache of resource metadata retrieved by Repository.get_resource(), stored in SQLite.
+	Set as repo.metadata_cache.
+
+	For each resource and response format, the raw payload, response headers, and LDP resource type are stored.
+	On each use, the entry is revalidated with a conditional GET request using If-None-Match and If-Modified-Since.
+	If the repository responds 304 Not Modified, the cached payload is used without transfer, and without the HEAD
+	request for resource type, so that a warm cache survives process restarts.
+
+	To keep cache hits free of writes, access times are held in memory and written in batches of access_batch_size,
+	and entries over max_entries are evicted every evict_interval puts, so the cache may briefly exceed max_entries,
+	and least recently used order is approximate.
+
+	Args:
+		path (str): file path of SQLite database, created if does not exist
+		max_entries (int): maximum number of entries, least recently used are evicted
+		max_age (int, float): optional, seconds, entries stored longer ago are not used and evicted
+	'''
+
+	# number of access times held before written, and of puts between evictions
+	access_batch_size = 1000
+	evict_interval = 100
+
+	def __init__(self, path, max_entries=1000000, max_age=None):
+
+		self.path = path
+		self.max_entries = max_entries
+		self.max_age = max_age
+		self._local = threading.local()
+		self._pid = os.getpid()
+		self._lock = threading.Lock()
+		self._accessed = {}
+		self._puts = 0
+
+		# init database
+		self._connection().executescript('''
+			CREATE TABLE IF NOT EXISTS entries (
+				uri TEXT,
+				response_format TEXT,
+				content BLOB,
+				headers TEXT,
+				ldp_type TEXT,
+				stored REAL,
+				accessed REAL,
+				PRIMARY KEY (uri, response_format)
+			);
+			CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+		''')
+		self._connection().commit()
+
+
+	def __repr__(self):
+		return '<MetadataCache, path: %s>' % self.path
+
+
+	def __getstate__(self):
+
+		'''
+		SQLite connections, lock, and access times not yet written are not pickled, connections are reopened per
+		thread when unpickled
+		'''
+
+		state = self.__dict__.copy()
+		for attr in ['_local', '_pid', '_lock', '_accessed']:
+			del state[attr]
+		return state
+
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._local = threading.local()
+		self._pid = os.getpid()
+		self._lock = threading.Lock()
+		self._accessed = {}
+
+
+	def _connection(self):
+
+		'''
+		Returns SQLite connection for current thread, reopened in child processes after fork, as connections of
+		parent cannot be reused
+		'''
+
+		if self._pid != os.getpid():
+			logger.debug('process forked, reopening connections to %s' % self.path)
+			self._local = threading.local()
+			self._pid = os.getpid()
+		if not hasattr(self._local, 'connection'):
+			self._local.connection = sqlite3.connect(self.path, timeout=30)
+			self._local.connection.execute('PRAGMA journal_mode=WAL')
+		return self._local.connection
+
+
+	def get(self, uri, response_format):
+
+		'''
+		Returns cached entry for resource
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+			response_format (str): mimetype of response
+
+		Returns:
+			(types.SimpleNamespace): entry with attributes response (CachedResponse), ldp_type, and method conditional_headers(), or None
+		'''
+
+		connection = self._connection()
+		row = connection.execute(
+			'SELECT content, headers, ldp_type, stored FROM entries WHERE uri = ? AND response_format = ?',
+			(str(uri), response_format)).fetchone()
+		if not row:
+			return None
+
+		# expired
+		content, headers, ldp_type, stored = row
+		if self.max_age != None and stored < time.time() - self.max_age:
+			self.invalidate(uri)
+			return None
+
+		# record access time, written in batches
+		with self._lock:
+			self._accessed[(str(uri), response_format)] = time.time()
+			full = len(self._accessed) >= self.access_batch_size
+		if full:
+			self._write_accessed(connection)
+			connection.commit()
+
+		entry = SimpleNamespace()
+		entry.response = CachedResponse(uri, content, json.loads(headers))
+		entry.ldp_type = ldp_type
+		entry.conditional_headers = lambda: { header:value for header, value in [
+			('If-None-Match', entry.response.headers.get('ETag')),
+			('If-Modified-Since', entry.response.headers.get('Last-Modified'))] if value }
+		return entry
+
+
+	def put(self, uri, response_format, response, ldp_type=None):
+
+		'''
+		Stores response for resource, evicting least recently used entries if over self.max_entries
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+			response_format (str): mimetype of response
+			response (requests.models.Response): response of GET request
+			ldp_type (str): name of LDP resource type, e.g. 'BasicContainer'
+
+		Returns:
+			None
+		'''
+
+		# only cache responses that can be revalidated
+		if 'ETag' not in response.headers and 'Last-Modified' not in response.headers:
+			return
+
+		now = time.time()
+		connection = self._connection()
+		connection.execute(
+			'INSERT OR REPLACE INTO entries (uri, response_format, content, headers, ldp_type, stored, accessed) VALUES (?, ?, ?, ?, ?, ?, ?)',
+			(str(uri), response_format, response.content, json.dumps(dict(response.headers)), ldp_type, now, now))
+
+		# evict every self.evict_interval puts, with access times written
+		with self._lock:
+			self._accessed.pop((str(uri), response_format), None)
+			self._puts += 1
+			evict = self._puts % self.evict_interval == 0
+		if evict:
+			self._write_accessed(connection)
+			excess = connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - self.max_entries
+			if excess > 0:
+				connection.execute(
+					'DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY accessed ASC LIMIT ?)',
+					(excess,))
+		connection.commit()
+
+
+	def _write_accessed(self, connection):
+
+		'''
+		Writes access times held in memory, without commit
+		'''
+
+		with self._lock:
+			accessed = self._accessed
+			self._accessed = {}
+		if accessed:
+			connection.executemany(
+				'UPDATE entries SET accessed = ? WHERE uri = ? AND response_format = ?',
+				[ (accessed_time, uri, response_format) for (uri, response_format), accessed_time in accessed.items() ])
+
+
+	def flush(self):
+
+		'''
+		Writes access times held in memory
+		'''
+
+		connection = self._connection()
+		self._write_accessed(connection)
+		connection.commit()
+
+
+	def invalidate(self, uri):
+
+		'''
+		Removes entries for resource
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+
+		Returns:
+			None
+		'''
+
+		connection = self._connection()
+		connection.execute('DELETE FROM entries WHERE uri = ?', (str(uri),))
+		connection.commit()
+
+
+	def clear(self):
+
+		'''
+		Removes all entries
+		'''
+
+		connection = self._connection()
+		connection.execute('DELETE FROM entries')
+		connection.commit()
+
+
+
+# Triple Index
+class TripleIndex(object):
+
+	'''
+	Optional, local index of triples of retrieved resources, stored in SQLite with indexes on subject, predicate,
+	object, and containing resource.  Set as repo.triple_index.
+
+	Resources are written to the index by Repository.get_resource(), and so Resource.refresh() and Harvester,
+	and by Repository.walk() with uris_only.  Deleted resources are removed with their descendants, and parents
+	are removed when children are created or deleted, as their containment changed.  Resources retrieved within
+	transactions are not indexed.
+
+	Queries answer questions like "which resources of rdf:type X are below this collection", or "which resources
+	point at this URI", without requests to the repository.  See Repository.query().
+
+	Args:
+		path (str): file path of SQLite database, created if does not exist
+		max_age (int, float): optional, seconds, resources indexed longer ago are not considered fresh
+	'''
+
+	def __init__(self, path, max_age=None):
+
+		self.path = path
+		self.max_age = max_age
+		self._local = threading.local()
+		self._pid = os.getpid()
+
+		# init database
+		self._connection().executescript('''
+			CREATE TABLE IF NOT EXISTS resources (
+				uri TEXT PRIMARY KEY,
+				indexed REAL
+			);
+			CREATE TABLE IF NOT EXISTS triples (
+				resource TEXT,
+				subject TEXT,
+				predicate TEXT,
+				object TEXT,
+				datatype TEXT,
+				lang TEXT
+			);
+			CREATE INDEX IF NOT EXISTS triples_resource ON triples (resource);
+			CREATE INDEX IF NOT EXISTS triples_subject ON triples (subject, predicate);
+			CREATE INDEX IF NOT EXISTS triples_predicate ON triples (predicate, object);
+			CREATE INDEX IF NOT EXISTS triples_object ON triples (object);
+		''')
+		self._connection().commit()
+
+
+	def __repr__(self):
+		return '<TripleIndex, path: %s>' % self.path
+
+
+	def __getstate__(self):
+
+		'''
+		SQLite connections are not pickled, and are reopened per thread when unpickled
+		'''
+
+		state = self.__dict__.copy()
+		del state['_local']
+		del state['_pid']
+		return state
+
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._local = threading.local()
+		self._pid = os.getpid()
+
+
+	def _connection(self):
+
+		'''
+		Returns SQLite connection for current thread, reopened in child processes after fork, as connections of
+		parent cannot be reused
+		'''
+
+		if self._pid != os.getpid():
+			logger.debug('process forked, reopening connections to %s' % self.path)
+			self._local = threading.local()
+			self._pid = os.getpid()
+		if not hasattr(self._local, 'connection'):
+			self._local.connection = sqlite3.connect(self.path, timeout=30)
+			self._local.connection.execute('PRAGMA journal_mode=WAL')
+		return self._local.connection
+
+
+	def index_graph(self, uri, graph):
+
+		'''
+		Indexes triples of resource from rdflib graph, replacing previously indexed triples
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+			graph (rdflib.Graph): graph of resource
+
+		Returns:
+			None
+		'''
+
+		def row(s, p, o):
+			if isinstance(o, rdflib.term.Literal):
+				if o.language:
+					datatype = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#langString'
+				else:
+					datatype = str(o.datatype or 'http://www.w3.org/2001/XMLSchema#string')
+				return (self._term(s), str(p), str(o), datatype, o.language)
+			return (self._term(s), str(p), self._term(o), None, None)
+
+		self._index(uri, [ row(s, p, o) for s, p, o in graph ])
+
+
+	def index_terms(self, uri, terms):
+
+		'''
+		Indexes triples of resource as strings, as read by API.parse_ntriples_terms(), replacing previously indexed triples
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+			terms (iterable): tuples of (subject, predicate, object, datatype, language)
+
+		Returns:
+			None
+		'''
+
+		self._index(uri, list(terms))
+
+
+	def _term(self, term):
+
+		'''
+		Small method to return URI or blank node as string, consistent with API.parse_ntriples_terms()
+		'''
+
+		if isinstance(term, rdflib.term.BNode):
+			return '_:%s' % term
+		return str(term)
+
+
+	def _index(self, uri, rows):
+
+		'''
+		Replaces triples of resource in index
+		'''
+
+		uri = str(uri)
+		connection = self._connection()
+		with connection:
+			connection.execute('DELETE FROM triples WHERE resource = ?', (uri,))
+			connection.executemany(
+				'INSERT INTO triples (resource, subject, predicate, object, datatype, lang) VALUES (?, ?, ?, ?, ?, ?)',
+				[ (uri,) + tuple(row) for row in rows ])
+			connection.execute('INSERT OR REPLACE INTO resources (uri, indexed) VALUES (?, ?)', (uri, time.time()))
+
+
+	def remove(self, uri, subtree=True):
+
+		'''
+		Removes resource from index
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+			subtree (bool): if True, remove resources below URI as well
+
+		Returns:
+			None
+		'''
+
+		uri = str(uri)
+		connection = self._connection()
+		with connection:
+			connection.execute('DELETE FROM triples WHERE resource = ?', (uri,))
+			connection.execute('DELETE FROM resources WHERE uri = ?', (uri,))
+			if subtree:
+				start, end = self._subtree_range(uri)
+				connection.execute('DELETE FROM triples WHERE resource >= ? AND resource < ?', (start, end))
+				connection.execute('DELETE FROM resources WHERE uri >= ? AND uri < ?', (start, end))
+
+
+	def _subtree_range(self, uri):
+
+		'''
+		Returns range of URIs below URI, as (start, end), for indexed range queries
+		'''
+
+		uri = str(uri).rstrip('/')
+		return ('%s/' % uri, '%s0' % uri)
+
+
+	def is_fresh(self, uri):
+
+		'''
+		Determines if resource is indexed, and indexed within self.max_age
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+
+		Returns:
+			(bool)
+		'''
+
+		row = self._connection().execute('SELECT indexed FROM resources WHERE uri = ?', (str(uri),)).fetchone()
+		if not row:
+			return False
+		return self.max_age == None or row[0] >= time.time() - self.max_age
+
+
+	def objects(self, subject, predicate):
+
+		'''
+		Returns objects of indexed triples with subject and predicate
+
+		Args:
+			subject (rdflib.term.URIRef, str): subject URI
+			predicate (rdflib.term.URIRef, str): predicate URI
+
+		Returns:
+			(list): list of rdflib.term.URIRef or rdflib.term.Literal
+		'''
+
+		objects = []
+		for o, datatype, lang in self._connection().execute(
+				'SELECT object, datatype, lang FROM triples WHERE subject = ? AND predicate = ?',
+				(str(subject), str(predicate))):
+
+			# URI or blank node
+			if datatype == None:
+				objects.append(rdflib.term.BNode(o[2:]) if o.startswith('_:') else rdflib.term.URIRef(o))
+
+			# literal
+			elif lang:
+				objects.append(rdflib.term.Literal(o, lang=lang))
+			elif datatype == 'http://www.w3.org/2001/XMLSchema#string':
+				objects.append(rdflib.term.Literal(o))
+			else:
+				objects.append(rdflib.term.Literal(o, datatype=datatype))
+		return objects
+
+
+	def query(self, subject=None, predicate=None, object=None, under=None):
+
+		'''
+		Returns URIs of indexed resources with triples matching subject, predicate, and object
+
+		Args:
+			subject (rdflib.term.URIRef, str): optional, subject URI
+			predicate (rdflib.term.URIRef, str): optional, predicate URI
+			object (rdflib.term.URIRef, rdflib.term.Literal, str): optional, object URI or literal value
+			under (rdflib.term.URIRef, str): optional, only resources below this URI
+
+		Returns:
+			(list): list of rdflib.term.URIRef
+		'''
+
+		clauses = []
+		params = []
+		for column, value in [('subject', subject), ('predicate', predicate), ('object', object)]:
+			if value != None:
+				clauses.append('%s = ?' % column)
+				params.append(str(value))
+		if under != None:
+			clauses.append('resource >= ? AND resource < ?')
+			params.extend(self._subtree_range(under))
+
+		sql = 'SELECT DISTINCT resource FROM triples'
+		if clauses:
+			sql += ' WHERE %s' % ' AND '.join(clauses)
+		return [ rdflib.term.URIRef(row[0]) for row in self._connection().execute(sql + ' ORDER BY resource', params) ]
+
+
+	def types(self, uri):
+
+		'''
+		Returns rdf:type values of indexed resource
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+
+		Returns:
+			(list): list of rdflib.term.URIRef
+		'''
+
+		return self.objects(uri, 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type')
+
+
+	def clear(self):
+
+		'''
+		Removes all resources
+		'''
+
+		connection = self._connection()
+		with connection:
+			connection.execute('DELETE FROM triples')
+			connection.execute('DELETE FROM resources')
+
+
+
+# Binary Cache
+class BinaryCache(object):
+
+	'''
+	Local, content-addressed cache for binary data, keyed by the digest the repository stores for each binary
+	in premis:hasMessageDigest.  Set as repo.binary_cache to serve binary data from local files instead of GET requests.
+
+	Files are stored at [path]/[algorithm]/[first two characters of digest]/[digest].  Content is verified against
+	its digest as it is written to a temporary file, which is then atomically moved into place, so concurrent readers
+	and writers across processes never see partial files.  When the cache exceeds max_size, least recently used files
+	are evicted.  Binary data larger than max_size is not cached.  The size of the cache is kept as a running total,
+	per process, and recomputed from the files in the cache when evicting.
+
+	Args:
+		path (str): directory for cache, created if does not exist
+		max_size (int): maximum size of cache in bytes
+		use_mmap (bool): if True, cached binary data is opened as read-only memory map instead of file object
+	'''
+
+	def __init__(self, path, max_size=10737418240, use_mmap=False):
+
+		self.path = path
+		self.max_size = max_size
+		self.use_mmap = use_mmap
+		os.makedirs(self.path, exist_ok=True)
+
+		# running size of cache, computed on first put
+		self._size = None
+		self._lock = threading.Lock()
+
+
+	def __repr__(self):
+		return '<BinaryCache, path: %s>' % self.path
+
+
+	def __getstate__(self):
+
+		'''
+		Lock and running size are not pickled, size is computed again on first put when unpickled
+		'''
+
+		state = self.__dict__.copy()
+		del state['_lock']
+		state['_size'] = None
+		return state
+
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
+
+
+	def _path(self, algorithm, digest):
+
+		'''
+		Returns path of file in cache for digest
+		'''
+
+		return os.path.join(self.path, algorithm, digest[:2], digest)
+
+
+	def get(self, algorithm, digest):
+
+		'''
+		Returns path of cached file, updating access time for LRU eviction
+
+		Args:
+			algorithm (str): hashlib algorithm, e.g. 'sha1'
+			digest (str): hex digest
+
+		Returns:
+			(str): path of cached file, or None if not cached
+		'''
+
+		path = self._path(algorithm, digest)
+		try:
+			os.utime(path)
+			return path
+		except FileNotFoundError:
+			return None
+
+
+	def open(self, algorithm, digest):
+
+		'''
+		Opens cached file as file object, or read-only memory map if self.use_mmap
+
+		Args:
+			algorithm (str): hashlib algorithm, e.g. 'sha1'
+			digest (str): hex digest
+
+		Returns:
+			(file object, mmap.mmap): cached binary data, or None if not cached
+		'''
+
+		path = self.get(algorithm, digest)
+		if not path:
+			return None
+		try:
+			f = open(path, 'rb')
+		except FileNotFoundError:
+			return None
+		if self.use_mmap and os.path.getsize(path) > 0:
+			mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			f.close()
+			return mapped
+		return f
+
+
+	def put(self, algorithm, digest, chunks):
+
+		'''
+		Writes binary data to cache, verifying digest while writing.  Raises Exception if binary data is larger
+		than self.max_size, as it would be evicted at once.
+
+		Args:
+			algorithm (str): hashlib algorithm, e.g. 'sha1'
+			digest (str): expected hex digest
+			chunks (iterable): chunks of bytes
+
+		Returns:
+			(str): path of cached file
+		'''
+
+		path = self._path(algorithm, digest)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+
+		# write to temporary file in same directory, hashing
+		hasher = hashlib.new(algorithm)
+		size = 0
+		fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				for chunk in chunks:
+					size += len(chunk)
+					if size > self.max_size:
+						raise Exception('binary data larger than binary cache max_size %s' % self.max_size)
+					hasher.update(chunk)
+					f.write(chunk)
+			if hasher.hexdigest() != digest:
+				raise Exception('digest of binary data %s does not match expected digest %s' % (hasher.hexdigest(), digest))
+
+			# atomically move into place
+			os.replace(tmp_path, path)
+		except:
+			if os.path.exists(tmp_path):
+				os.remove(tmp_path)
+			raise
+
+		# evict if running size over max size
+		with self._lock:
+			if self._size is None:
+				self._size = self._total_size()
+			else:
+				self._size += size
+			evict = self._size > self.max_size
+		if evict:
+			self.evict()
+		return path
+
+
+	def _total_size(self):
+
+		'''
+		Returns total size in bytes of files in cache
+		'''
+
+		return sum([ f[1] for f in self._files() ])
+
+
+	def _files(self):
+
+		'''
+		Returns list of (mtime, size, path) tuples of files in cache
+		'''
+
+		files = []
+		for dirpath, dirnames, filenames in os.walk(self.path):
+			for filename in filenames:
+				if filename.startswith('.'):
+					continue
+				try:
+					stat = os.stat(os.path.join(dirpath, filename))
+					files.append((stat.st_mtime, stat.st_size, os.path.join(dirpath, filename)))
+				except FileNotFoundError:
+					continue
+		return files
+
+
+	def evict(self):
+
+		'''
+		Removes least recently used files until cache is under self.max_size.
+		Uses lock file across processes where supported.
+
+		Args:
+			None
+
+		Returns:
+			(int): number of files removed
+		'''
+
+		with open(os.path.join(self.path, '.lock'), 'w') as lock:
+			if fcntl:
+				fcntl.flock(lock, fcntl.LOCK_EX)
+
+			# gather cached files
+			files = self._files()
+
+			# remove least recently used
+			total = sum([ f[1] for f in files ])
+			removed = 0
+			for mtime, size, path in sorted(files):
+				if total <= self.max_size:
+					break
+				try:
+					os.remove(path)
+				except FileNotFoundError:
+					pass
+				total -= size
+				removed += 1
+
+		# reset running size
+		with self._lock:
+			self._size = total
+
+		if removed:
+			logger.debug('evicted %s files from binary cache' % removed)
+		return removed
+
+
+	def clear(self):
+
+		'''
+		Removes all files from cache
+		'''
+
+		max_size = self.max_size
+		self.max_size = 0
+		self.evict()
+		self.max_size = max_size
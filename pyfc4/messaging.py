@@ -0,0 +1,369 @@
+# pyfc4
+
+import collections
+import concurrent.futures
+import json
+import socket
+import threading
+import time
+
+# logging
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+# STOMP Client
+class StompClient(object):
+
+	'''
+	Minimal STOMP 1.2 client over a socket, sufficient to subscribe to repository events published by
+	Fedora's message broker.  Heartbeats are not negotiated.
+
+	Args:
+		host (str): hostname of broker
+		port (int): STOMP port of broker
+		login (str): optional, login for broker
+		passcode (str): optional, passcode for broker
+		timeout (int, float): seconds, socket timeout for reading frames
+	'''
+
+	def __init__(self, host='localhost', port=61613, login=None, passcode=None, timeout=1.0):
+
+		self.host = host
+		self.port = port
+		self.login = login
+		self.passcode = passcode
+		self.timeout = timeout
+		self.socket = None
+		self._buffer = b''
+
+
+	def connect(self):
+
+		'''
+		Opens socket and sends CONNECT frame
+
+		Returns:
+			(dict): headers of CONNECTED frame
+		'''
+
+		self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+		headers = {'accept-version':'1.2', 'host':self.host, 'heart-beat':'0,0'}
+		if self.login:
+			headers.update({'login':self.login, 'passcode':self.passcode})
+		self.send_frame('CONNECT', headers)
+
+		# wait for CONNECTED
+		frame = None
+		deadline = time.time() + max(self.timeout, 10)
+		while not frame and time.time() < deadline:
+			frame = self.read_frame()
+		if not frame or frame[0] != 'CONNECTED':
+			raise Exception('could not connect to STOMP broker at %s:%s: %s' % (self.host, self.port, frame))
+		return frame[1]
+
+
+	def subscribe(self, destination, subscription_id='pyfc4'):
+
+		'''
+		Subscribes to destination, with automatic acknowledgement
+
+		Args:
+			destination (str): topic or queue, e.g. /topic/fedora
+			subscription_id (str): id of subscription
+		'''
+
+		self.send_frame('SUBSCRIBE', {'destination':destination, 'id':subscription_id, 'ack':'auto'})
+
+
+	def send_frame(self, command, headers=None, body=b''):
+
+		'''
+		Sends frame to broker
+
+		Args:
+			command (str): STOMP command
+			headers (dict): frame headers
+			body (bytes): frame body
+		'''
+
+		lines = [command] + [ '%s:%s' % (header, value) for header, value in (headers or {}).items() ]
+		self.socket.sendall(('\n'.join(lines) + '\n\n').encode('utf-8') + body + b'\x00')
+
+
+	def read_frame(self):
+
+		'''
+		Reads next frame from broker
+
+		Returns:
+			(tuple): (command, headers, body), or None if no frame arrived within self.timeout
+		'''
+
+		while True:
+
+			# skip heartbeat newlines between frames
+			self._buffer = self._buffer.lstrip(b'\r\n')
+
+			# complete frame in buffer
+			header_end = self._buffer.find(b'\n\n')
+			if header_end != -1:
+				lines = self._buffer[:header_end].decode('utf-8').replace('\r', '').split('\n')
+				headers = {}
+				for line in lines[1:]:
+					header, _, value = line.partition(':')
+					headers.setdefault(header, value)
+				body_start = header_end + 2
+				if 'content-length' in headers:
+					body_end = body_start + int(headers['content-length'])
+					frame_complete = len(self._buffer) > body_end
+				else:
+					body_end = self._buffer.find(b'\x00', body_start)
+					frame_complete = body_end != -1
+				if frame_complete:
+					body = self._buffer[body_start:body_end]
+					self._buffer = self._buffer[body_end + 1:]
+					return (lines[0], headers, body)
+
+			# read more
+			try:
+				data = self.socket.recv(65536)
+			except socket.timeout:
+				return None
+			if not data:
+				raise Exception('connection to STOMP broker at %s:%s closed' % (self.host, self.port))
+			self._buffer += data
+
+
+	def disconnect(self):
+
+		'''
+		Sends DISCONNECT frame and closes socket
+		'''
+
+		if self.socket:
+			try:
+				self.send_frame('DISCONNECT')
+			except OSError:
+				pass
+			self.socket.close()
+			self.socket = None
+
+
+
+# Event Consumer
+class EventConsumer(object):
+
+	'''
+	Consumes create, update, and delete events published by the repository over STOMP, and invalidates
+	entries for changed resources in repo.metadata_cache and repo.triple_index with Repository.invalidate().
+
+	Events are buffered, and URIs deduplicated, then invalidated in batches, when batch_size URIs are buffered
+	or batch_interval seconds have passed, so that bursty ingest does not cause a write per event.  With refresh,
+	changed resources are retrieved again after invalidation, so that caches are warm before next use.
+
+	Binary cache entries are addressed by digest, and are not invalidated, as changed binary data has a new digest.
+
+	Errors while invalidating or refreshing do not stop the consumer: they are logged, counted in
+	self.stats['errors'], and the most recent max_errors are kept at self.errors as (uri, exception) tuples.
+	Resources not found when refreshed, e.g. deleted since the event, are evicted with their descendants.
+
+	Args:
+		repo (Repository): instance of Repository class
+		host (str): hostname of broker
+		port (int): STOMP port of broker
+		destination (str): topic or queue of repository events
+		batch_size (int): maximum number of URIs buffered before invalidation
+		batch_interval (int, float): maximum seconds between invalidations
+		refresh (bool): if True, retrieve created and updated resources after invalidation
+		concurrency (int): number of resources retrieved concurrently, with refresh
+		login (str): optional, login for broker
+		passcode (str): optional, passcode for broker
+	'''
+
+	# number of recent errors kept at self.errors
+	max_errors = 100
+
+	def __init__(self,
+			repo,
+			host = 'localhost',
+			port = 61613,
+			destination = '/topic/fedora',
+			batch_size = 1000,
+			batch_interval = 1.0,
+			refresh = False,
+			concurrency = 4,
+			login = None,
+			passcode = None
+		):
+
+		self.repo = repo
+		self.destination = destination
+		self.batch_size = batch_size
+		self.batch_interval = batch_interval
+		self.refresh = refresh
+		self.concurrency = concurrency
+		self.client = StompClient(host, port, login=login, passcode=passcode, timeout=min(batch_interval, 1.0))
+
+		# buffer of URIs, as uri:deleted
+		self.pending = collections.OrderedDict()
+		self.stats = {'events':0, 'batches':0, 'invalidated':0, 'refreshed':0, 'evicted':0, 'errors':0}
+		self.errors = collections.deque(maxlen=self.max_errors)
+		self.error = None
+		self._stop = threading.Event()
+		self._thread = None
+
+
+	def start(self):
+
+		'''
+		Connects to broker, subscribes, and consumes events in background thread
+		'''
+
+		self.client.connect()
+		self.client.subscribe(self.destination)
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._consume, name='pyfc4-event-consumer', daemon=True)
+		self._thread.start()
+
+
+	def stop(self):
+
+		'''
+		Stops consuming, invalidates buffered URIs, and disconnects.  If the connection was lost, the
+		exception is at self.error
+
+		Returns:
+			(dict): self.stats
+		'''
+
+		self._stop.set()
+		if self._thread:
+			self._thread.join()
+			self._thread = None
+		self.client.disconnect()
+		return self.stats
+
+
+	def _consume(self):
+
+		'''
+		Reads frames, buffering URIs, and flushing by size or interval
+		'''
+
+		last_flush = time.time()
+		while not self._stop.is_set():
+			try:
+				frame = self.client.read_frame()
+			except Exception as e:
+				logger.debug('stopped consuming events: %s' % e)
+				self.error = e
+				break
+			if frame and frame[0] == 'MESSAGE':
+				self.stats['events'] += 1
+				event = self.parse_event(frame[1], frame[2])
+				if event:
+					uri, deleted = event
+					self.pending.pop(uri, None)
+					self.pending[uri] = deleted
+			elif frame and frame[0] == 'ERROR':
+				logger.debug('STOMP error: %s' % frame[2])
+			if len(self.pending) >= self.batch_size or (self.pending and time.time() - last_flush >= self.batch_interval):
+				self._safe_flush()
+				last_flush = time.time()
+		self._safe_flush()
+
+
+	def _safe_flush(self):
+
+		'''
+		Flushes, recording exceptions instead of raising, so that consumer thread continues
+		'''
+
+		try:
+			self.flush()
+		except Exception as e:
+			self._record_error(None, e)
+
+
+	def _record_error(self, uri, e):
+
+		'''
+		Logs and records error for URI, or for batch if URI is None
+		'''
+
+		logger.debug('event consumer error for %s: %s' % (uri or 'batch', e))
+		self.stats['errors'] += 1
+		self.errors.append((uri, e))
+
+
+	def parse_event(self, headers, body):
+
+		'''
+		Parses URI and event type from repository message, using org.fcrepo.jms headers, or JSON-LD body
+
+		Args:
+			headers (dict): frame headers
+			body (bytes): frame body
+
+		Returns:
+			(tuple): (uri (str), deleted (bool)), or None if not parsed
+		'''
+
+		event_type = headers.get('org.fcrepo.jms.eventType', '')
+		if 'org.fcrepo.jms.identifier' in headers:
+			uri = '%s%s' % (headers.get('org.fcrepo.jms.baseURL', self.repo.root).rstrip('/'), headers['org.fcrepo.jms.identifier'])
+		else:
+			try:
+				message = json.loads(body.decode('utf-8'))
+			except ValueError:
+				logger.debug('could not parse event: %s' % body)
+				return None
+			uri = message.get('id') or message.get('@id')
+			event_type = str(message.get('type', event_type))
+		if not uri:
+			return None
+
+		# binary descriptions change with binary
+		uri = uri.split('/fcr:')[0]
+		deleted = 'Delet' in event_type
+		return (uri, deleted)
+
+
+	def flush(self):
+
+		'''
+		Invalidates buffered URIs, and optionally retrieves changed resources
+		'''
+
+		if not self.pending:
+			return
+		pending = self.pending
+		self.pending = collections.OrderedDict()
+
+		# invalidate, deleted resources with descendants
+		deleted = [ uri for uri, is_deleted in pending.items() if is_deleted ]
+		changed = [ uri for uri, is_deleted in pending.items() if not is_deleted ]
+		self.repo.invalidate(changed)
+		self.repo.invalidate(deleted, subtree=True)
+		self.stats['batches'] += 1
+		self.stats['invalidated'] += len(pending)
+		logger.debug('invalidated %s changed and %s deleted resources' % (len(changed), len(deleted)))
+
+		# refresh changed resources, evicting resources not found, and recording errors per resource
+		if self.refresh and changed:
+			with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+				futures = { executor.submit(self.repo.get_resource, uri):uri for uri in changed }
+				for future in concurrent.futures.as_completed(futures):
+					uri = futures[future]
+					try:
+						resource = future.result()
+						if resource:
+							self.stats['refreshed'] += 1
+						else:
+							logger.debug('%s not found on refresh, evicting' % uri)
+							self.repo.invalidate(uri, subtree=True)
+							self.stats['evicted'] += 1
+					except Exception as e:
+						self._record_error(uri, e)
@@ -1,24 +1,76 @@
 # pyfc4
 
+import collections
+import concurrent.futures
 import copy
 import datetime
+import email.utils
+import gzip
+import hashlib
 import io
 import json
+import os
 import pdb
 import rdflib
+import re
 from rdflib.compare import to_isomorphic, graph_diff
 import rdflib_jsonld
 import requests
+import shutil
+import threading
 import time
-from types import SimpleNamespace
+from types import MappingProxyType, SimpleNamespace
 import uuid
 
+# caching and messaging, re-exported
+from pyfc4.cache import CachedResponse, CachedBinaryResponse, MetadataCache, TripleIndex, BinaryCache
+from pyfc4.messaging import StompClient, EventConsumer
+
+# optional, for columnar export
+try:
+	import pyarrow
+	import pyarrow.ipc
+	import pyarrow.parquet
+except ImportError:
+	pyarrow = None
+
 # logging
 import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
+# N-Triples line with URI object, used to scan payloads without parsing
+NTRIPLES_URI_TRIPLE = re.compile(r'^<([^>]*)>\s+<([^>]*)>\s+<([^>]*)>\s*\.\s*$')
+
+# N-Triples line with any object, groups: subject, predicate, URI object, blank node object, literal, datatype, language
+NTRIPLES_TRIPLE = re.compile(r'^(<[^>]*>|_:\S+)\s+<([^>]*)>\s+(?:<([^>]*)>|(_:\S+)|"((?:[^"\\]|\\.)*)"(?:\^\^<([^>]*)>|@([a-zA-Z0-9-]+))?)\s*\.\s*$')
+
+# N-Quads line, groups: subject, predicate, object, and graph or None for default graph, as N-Triples terms
+NQUADS_QUAD = re.compile(r'^(<[^>]*>|_:\S+)\s+(<[^>]*>)\s+(<[^>]*>|_:\S+|"(?:[^"\\]|\\.)*"(?:\^\^<[^>]*>|@[a-zA-Z0-9-]+)?)(?:\s+(<[^>]*>|_:\S+))?\s*\.\s*$')
+
+# N-Triples string escapes
+NTRIPLES_ESCAPE = re.compile(r'\\(?:u([0-9a-fA-F]{4})|U([0-9a-fA-F]{8})|(.))')
+NTRIPLES_ESCAPES = {'t':'\t', 'b':'\b', 'n':'\n', 'r':'\r', 'f':'\f', '"':'"', "'":"'", '\\':'\\'}
+
+
+# named graphs of current and originally retrieved graphs of pickled resources, see Resource.__getstate__()
+PICKLED_GRAPH = rdflib.URIRef('urn:pyfc4:graph')
+PICKLED_ORIG_GRAPH = rdflib.URIRef('urn:pyfc4:orig_graph')
+
+
+# RDF serializations returned by repository, used to detect representations in responses
+RDF_SERIALIZATIONS = [
+	'application/ld+json',
+	'application/n-triples',
+	'application/rdf+xml',
+	'application/x-turtle',
+	'text/n3',
+	'text/rdf+n3',
+	'text/turtle'
+]
+
+
 # Repository
 class Repository(object):
 
@@ -34,9 +86,22 @@ class Repository(object):
 		default_serialization (str): mimetype of default Accept and Content-Type headers
 		default_auto_refresh (bool): if False, resource create/update, and graph modifications
 			will not retrieve or parse updates automatically.  Dramatically improves performance.
+		auto_refresh_strategy (str): how resources are refreshed after create/update when auto_refresh is True
+			- 'get': issue follow-up GET (and HEAD) requests via resource.refresh(), default
+			- 'representation': request the representation in the write response with Prefer: return=representation,
+				falling back to 'local' if the repository does not return one
+			- 'local': rebuild resource state from the data sent and response headers, no additional requests
+		binary_cache (BinaryCache): optional, local content-addressed cache for binary data
+		metadata_cache (MetadataCache): optional, persistent cache of resource metadata, revalidated with conditional requests
+		triple_index (TripleIndex): optional, local index of triples of retrieved resources
+		auto_keep_alive (bool): if True, renew open transactions in background before they expire, with KeepAliveScheduler
+
+	Instances are thread-safe, and may be shared across threads: context is read-only per instance, the registry of
+	transactions is locked, and each thread sends requests with its own session from a shared connection pool.
+	Resources are not, and should not be modified from several threads at once.
 
 	Attributes:
-		context (dict): Default dictionary of namespace prefixes and namespace URIs
+		context (dict): Default dictionary of namespace prefixes and namespace URIs, read-only per instance
 	'''
 
 	context = {
@@ -66,7 +131,12 @@ class Repository(object):
 			context = None,
 			default_serialization = 'application/rdf+xml',
 			default_auto_refresh = False,
-			custom_resource_type_parser = None
+			custom_resource_type_parser = None,
+			auto_refresh_strategy = 'get',
+			binary_cache = None,
+			metadata_cache = None,
+			triple_index = None,
+			auto_keep_alive = False
 		):
 
 		# handle root path
@@ -82,6 +152,11 @@ class Repository(object):
 		# default, general auto_refresh
 		self.default_auto_refresh = default_auto_refresh
 
+		# strategy for auto_refresh after create/update
+		if auto_refresh_strategy not in ['get', 'representation', 'local']:
+			raise ValueError('auto_refresh_strategy must be one of "get", "representation", or "local"')
+		self.auto_refresh_strategy = auto_refresh_strategy
+
 		# API facade
 		self.api = API(self)
 
@@ -90,17 +165,67 @@ class Repository(object):
 		for ns_prefix, ns_uri in self.context.items():
 			self.namespace_manager.bind(ns_prefix, ns_uri, override=False)
 
-		# if context provided, merge with defaults
+		# if context provided, merge with defaults, as read-only copy for this instance
+		merged_context = dict(self.context)
 		if context:
 			logger.debug('context provided, merging with defaults')
-			self.context.update(context)
+			merged_context.update(context)
+		self.context = MappingProxyType(merged_context)
 
 		# container for transactions
 		self.txns = {}
+		self._txns_lock = threading.Lock()
 
 		# optional, custom resource type parser
 		self.custom_resource_type_parser = custom_resource_type_parser
 
+		# optional, local binary cache
+		self.binary_cache = binary_cache
+
+		# optional, persistent metadata cache
+		self.metadata_cache = metadata_cache
+
+		# optional, local triple index
+		self.triple_index = triple_index
+
+		# optional, background renewal of transactions
+		self.keep_alive_scheduler = KeepAliveScheduler(self) if auto_keep_alive else None
+
+
+	def __getstate__(self):
+
+		'''
+		Returns compact state for pickling, e.g. to send to process pool workers.  The HTTP session, namespace manager,
+		open transactions, and keep alive thread are not pickled, but recreated when unpickled.
+		'''
+
+		state = self.__dict__.copy()
+		for attr in ['api', 'namespace_manager', 'txns', '_txns_lock', 'keep_alive_scheduler']:
+			del state[attr]
+		state['context'] = dict(self.context)
+		state['auto_keep_alive'] = self.keep_alive_scheduler != None
+		return state
+
+
+	def __setstate__(self, state):
+
+		auto_keep_alive = state.pop('auto_keep_alive')
+		self.__dict__.update(state)
+		self.context = MappingProxyType(self.context)
+
+		# recreate API facade, with new HTTP session
+		self.api = API(self)
+
+		# recreate namespace_manager
+		self.namespace_manager = rdflib.namespace.NamespaceManager(rdflib.Graph())
+		for ns_prefix, ns_uri in self.context.items():
+			self.namespace_manager.bind(ns_prefix, ns_uri, override=False)
+
+		# transactions are registered as they are unpickled
+		self.txns = {}
+		self._txns_lock = threading.Lock()
+		self.keep_alive_scheduler = KeepAliveScheduler(self) if auto_keep_alive else None
+
 
 	def parse_uri(self, uri=None):
 
@@ -186,21 +311,58 @@ class Repository(object):
 		if uri.toPython().endswith('/fcr:metadata'):
 			uri = rdflib.term.URIRef(uri.toPython().rstrip('/fcr:metadata'))
 
+		# within buffered transaction, flush operations pending for resource, so reads see writes
+		buffer = getattr(self, 'buffer', None)
+		if buffer != None and buffer.pending(uri):
+			logger.debug('operations pending for %s, flushing transaction buffer' % uri)
+			buffer.flush()
+
+		# within transaction, serve resources written in transaction from overlay
+		overlay = getattr(self, 'overlay', None)
+		if overlay != None:
+			entry = overlay.get(uri)
+			if entry and entry.deleted:
+				logger.debug('resource uri %s deleted within transaction, returning False' % uri)
+				return False
+			elif entry:
+				logger.debug('resource uri %s written within transaction, using overlay' % uri)
+				return (resource_type or entry.resource_type)(self, uri, response=entry.response)
+
+		# if metadata cache configured, prepare conditional GET request
+		cached = None
+		headers = None
+		if self.metadata_cache:
+			cached = self.metadata_cache.get(uri, response_format or self.default_serialization)
+			if cached:
+				headers = cached.conditional_headers()
+
 		# fire GET request
 		get_response = self.api.http_request(
 			'GET',
 			"%s/fcr:metadata" % uri,
+			headers=headers,
 			response_format=response_format)
 
+		# 304, not modified, use cached response
+		if get_response.status_code == 304 and cached:
+			logger.debug('resource uri %s not modified, using metadata cache' % uri)
+			cached.response.headers.update({ k:v for k,v in get_response.headers.items() if k in ['ETag', 'Last-Modified', 'Expires', 'Date'] })
+			get_response = cached.response
+
 		# 404, item does not exist, return False
 		if get_response.status_code == 404:
 			logger.debug('resource uri %s not found, returning False' % uri)
+			if cached:
+				self.metadata_cache.invalidate(uri)
+			if self.triple_index:
+				self.triple_index.remove(uri)
 			return False
 
 		# assume exists, parse headers for resource type and return instance
 		elif get_response.status_code == 200:
 
 			# if resource_type not provided
+			ldp_type = None
 			if not resource_type:
 
 				# if custom resource type parser affixed to repo instance, fire
@@ -208,25 +370,530 @@ class Repository(object):
 					logger.debug("custom resource type parser provided, attempting")
 					resource_type = self.custom_resource_type_parser(self, uri, get_response)
 
+				# use LDP resource type from metadata cache if not modified
+				if not resource_type and cached and get_response is cached.response and cached.ldp_type:
+					resource_type = LDP_RESOURCE_TYPES[cached.ldp_type]
+
 				# parse LDP resource type from headers if custom resource parser misses,
 				# or not provided
 				if not resource_type:
 					# Issue HEAD request to get LDP resource type from URI proper, not /fcr:metadata
 					head_response = self.api.http_request('HEAD', uri)
 					resource_type = self.api.parse_resource_type(head_response)
+					if resource_type:
+						ldp_type = resource_type.__name__
 
 			logger.debug('using resource type: %s' % resource_type)
 
-			# return resource
-			return resource_type(self,
+			# store in metadata cache
+			if self.metadata_cache and not (cached and get_response is cached.response):
+				self.metadata_cache.put(uri, response_format or self.default_serialization, get_response, ldp_type=ldp_type)
+
+			# init resource
+			resource = resource_type(self,
 				uri,
 				response=get_response)
 
+			# write to triple index
+			if self.triple_index:
+				self.triple_index.index_graph(uri, resource.rdf.graph)
+
+			# return resource
+			return resource
+
 		else:
 			raise Exception('HTTP %s, error retrieving resource uri %s' % (get_response.status_code, uri))
 
 
-	def start_txn(self, txn_name=None):
+	def walk(self,
+			root=None,
+			depth=None,
+			concurrency=4,
+			include_types=None,
+			exclude_types=None,
+			uris_only=False,
+			keep_data=False,
+			rate=None
+		):
+
+		'''
+		Generator that walks resources breadth-first by following ldp:contains from root, retrieving resources
+		with a bounded pool of concurrent workers, and yielding each as it is retrieved.
+
+		With uris_only, each resource's metadata is requested as N-Triples and only ldp:contains and rdf:type are read,
+		without parsing an rdflib graph or issuing HEAD requests, yielding lightweight ResourceRef instances.
+
+		Filters select which resources are yielded, but do not prevent walking their children.  Filters may be
+		rdflib.term.URIRef, matched against rdf:type values, or resource classes like NonRDFSource or BasicContainer.
+
+		Args:
+			root (rdflib.term.URIRef, str): URI of resource to start from, defaults to repository root
+			depth (int): maximum depth below root, where root is 0. If None, no limit
+			concurrency (int): number of resources retrieved concurrently
+			include_types (list): if set, only yield resources matching one of these types
+			exclude_types (list): if set, do not yield resources matching any of these types
+			uris_only (bool): if True, yield ResourceRef with uri and types, instead of full resources
+			keep_data (bool): if True, and uris_only, keep raw N-Triples payload at ResourceRef.data
+			rate (float): maximum requests per second, if None, no limit
+
+		Returns:
+			(generator): Resource or ResourceRef instances
+		'''
+
+		rate_limiter = RateLimiter(rate)
+		queue = collections.deque([(self.parse_uri(root), 0, None)])
+		executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+		futures = {}
+		try:
+			while queue or futures:
+
+				# keep bounded window of submitted retrievals
+				while queue and len(futures) < concurrency * 2:
+					uri, level, parent = queue.popleft()
+					futures[executor.submit(self._walk_node, uri, level, parent, uris_only, keep_data, rate_limiter)] = level
+
+				done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+				for future in done:
+					level = futures.pop(future)
+					node, children = future.result()
+					if not node:
+						continue
+
+					# queue children
+					if depth == None or level < depth:
+						queue.extend([ (child, level + 1, node.uri) for child in children ])
+
+					# filter and yield
+					if self._walk_filter(node, include_types, exclude_types):
+						yield node
+		finally:
+			for future in futures:
+				future.cancel()
+			executor.shutdown(wait=True)
+
+
+	def _walk_node(self, uri, level, parent, uris_only, keep_data, rate_limiter):
+
+		'''
+		Retrieves single resource for self.walk()
+
+		Returns:
+			(tuple): (Resource or ResourceRef, list of child URIs), or (None, []) if not found
+		'''
+
+		rate_limiter.wait()
+
+		# lightweight, only ldp:contains and rdf:type
+		if uris_only:
+			response = self.api.http_request('GET', '%s/fcr:metadata' % uri, response_format='application/n-triples')
+			if response.status_code == 404:
+				return (None, [])
+			elif response.status_code != 200:
+				raise Exception('HTTP %s, error retrieving resource uri %s' % (response.status_code, uri))
+			types, children = self.api.parse_ntriples_structure(uri, response.content)
+			if self.triple_index:
+				self.triple_index.index_terms(uri, self.api.parse_ntriples_terms(response.content))
+			ref = ResourceRef(self, uri, types=types, depth=level, parent=parent)
+			if keep_data:
+				ref.data = response.content
+			return (ref, children)
+
+		# full resource
+		else:
+			resource = self.get_resource(uri)
+			if not resource:
+				return (None, [])
+			resource.depth = level
+			children = [] if isinstance(resource, NonRDFSource) else resource.children()
+			return (resource, children)
+
+
+	def _walk_filter(self, node, include_types, exclude_types):
+
+		'''
+		Determines if node from self.walk() matches include and exclude filters
+
+		Returns:
+			(bool)
+		'''
+
+		def matches(resource_type):
+
+			# resource class
+			if isinstance(resource_type, type):
+				if isinstance(node, ResourceRef):
+					return rdflib.term.URIRef('http://www.w3.org/ns/ldp#%s' % resource_type.__name__) in node.types
+				return isinstance(node, resource_type)
+
+			# rdf:type
+			if isinstance(node, ResourceRef):
+				return resource_type in node.types
+			return (node.uri, node.rdf.prefixes.rdf.type, resource_type) in node.rdf.graph
+
+		if include_types and not any([ matches(t) for t in include_types ]):
+			return False
+		if exclude_types and any([ matches(t) for t in exclude_types ]):
+			return False
+		return True
+
+
+	def invalidate(self, uris, subtree=False):
+
+		'''
+		Invalidates resources in self.metadata_cache and self.triple_index, if configured
+
+		Args:
+			uris (list): URIs of resources, or single URI
+			subtree (bool): if True, remove descendants from triple index as well, e.g. for deleted resources
+
+		Returns:
+			None
+		'''
+
+		if isinstance(uris, (str, rdflib.term.URIRef)):
+			uris = [uris]
+		for uri in uris:
+			uri = self.parse_uri(uri)
+			if self.metadata_cache:
+				self.metadata_cache.invalidate(uri)
+			if self.triple_index:
+				self.triple_index.remove(uri, subtree=subtree)
+
+
+	def query(self, subject=None, predicate=None, object=None, under=None):
+
+		'''
+		Queries local triple index, self.triple_index, without requests to the repository
+
+		e.g. resources of rdf:type below collection:
+			repo.query(predicate=RDF.type, object=PCDM.Object, under='collections/foo')
+
+		Args:
+			subject (rdflib.term.URIRef, str): optional, subject URI
+			predicate (rdflib.term.URIRef, str): optional, predicate URI
+			object (rdflib.term.URIRef, rdflib.term.Literal, str): optional, object URI or literal value
+			under (rdflib.term.URIRef, str): optional, only resources below this URI
+
+		Returns:
+			(list): list of ResourceRef instances, with rdf:type values from index
+		'''
+
+		if not self.triple_index:
+			raise Exception('no triple index configured for repository')
+
+		if under != None:
+			under = self.parse_uri(under)
+		return [ ResourceRef(self, uri, types=self.triple_index.types(uri))
+			for uri in self.triple_index.query(subject=subject, predicate=predicate, object=object, under=under) ]
+
+
+	def export_nquads(self, destination, root=None, depth=None, concurrency=4, compress=False, include_types=None, exclude_types=None):
+
+		'''
+		Exports triples of all resources in subtree below root as N-Quads, where the graph of each triple is the URI of its resource.
+
+		Resources are retrieved concurrently with self.walk() as N-Triples, and each resource's triples are
+		rewritten line by line as quads and written as soon as retrieved, without parsing graphs, so memory use is constant.
+
+		Note: blank node labels are written as returned by the repository, and are not made unique across graphs.
+
+		Args:
+			destination (str, file-like object): file path, or writable binary file-like object such as a pipe
+			root (rdflib.term.URIRef, str): URI of resource to start from, defaults to repository root
+			depth (int): maximum depth below root. If None, no limit
+			concurrency (int): number of resources retrieved concurrently
+			compress (bool): if True, or destination path ends with .gz, write gzip compressed
+			include_types (list): passed to self.walk()
+			exclude_types (list): passed to self.walk()
+
+		Returns:
+			(dict): ('resources':(int), 'quads':(int))
+		'''
+
+		# open destination
+		compress = compress or (isinstance(destination, str) and destination.endswith('.gz'))
+		if isinstance(destination, str):
+			out = gzip.open(destination, 'wb') if compress else open(destination, 'wb')
+		else:
+			out = gzip.GzipFile(fileobj=destination, mode='wb') if compress else destination
+
+		report = {'resources':0, 'quads':0}
+		try:
+			for ref in self.walk(root, depth=depth, concurrency=concurrency, include_types=include_types, exclude_types=exclude_types, uris_only=True, keep_data=True):
+				graph = (' <%s> .\n' % ref.uri).encode('utf-8')
+				for line in ref.data.splitlines():
+					line = line.strip()
+					if not line or line.startswith(b'#') or not line.endswith(b'.'):
+						continue
+					out.write(line[:-1].rstrip() + graph)
+					report['quads'] += 1
+				report['resources'] += 1
+				ref.data = None
+		finally:
+			# close opened file, or gzip stream wrapping destination, which leaves destination open
+			if out is not destination:
+				out.close()
+
+		logger.debug('exported N-Quads: %s' % report)
+		return report
+
+
+	def export_bag(self, destination, root=None, depth=None, concurrency=4, algorithms=None, reuse_digests=True, include_types=None, exclude_types=None):
+
+		'''
+		Exports all resources in subtree below root, such as a container or PCDM object, as a BagIt bag.
+
+		Each resource's triples are written as N-Triples to data/[path].nt, and the binary data of NonRDFSources
+		to data/[path].binary, where [path] is the path of the resource below the repository root.  Resources are
+		retrieved concurrently with self.walk(), and binaries are streamed concurrently with a single GET each,
+		hashed while written, so manifests are computed without a second pass.  The stored digest and size of
+		binaries, premis:hasMessageDigest and premis:hasSize, are read from the metadata already retrieved by the
+		walk, without further requests.
+
+		If reuse_digests is True, and the repository's stored digest uses an algorithm in algorithms, the binary
+		is not hashed for that algorithm.  As the repository stores SHA-1 digests, with the default algorithms
+		binaries are written without hashing, and only their size is confirmed.
+
+		Args:
+			destination (str): directory path of bag, created if does not exist
+			root (rdflib.term.URIRef, str): URI of resource to start from, defaults to repository root
+			depth (int): maximum depth below root. If None, no limit
+			concurrency (int): number of resources retrieved, and binaries streamed, concurrently
+			algorithms (list): hashlib algorithms for manifests, defaults to ['sha1']
+			reuse_digests (bool): if True, use stored digests of binaries instead of hashing
+			include_types (list): passed to self.walk()
+			exclude_types (list): passed to self.walk()
+
+		Returns:
+			(dict): ('resources':(int), 'binaries':(int), 'bytes':(int), 'reused':(int), 'elapsed':(float))
+		'''
+
+		stime = time.time()
+		algorithms = algorithms or ['sha1']
+		report = {'resources':0, 'binaries':0, 'bytes':0, 'reused':0}
+		manifests = { algorithm:[] for algorithm in algorithms }
+		manifest_lock = threading.Lock()
+		data_dir = os.path.join(destination, 'data')
+		os.makedirs(data_dir, exist_ok=True)
+
+		def payload_path(uri, extension):
+			path = str(uri)[len(self.root):].strip('/') or self.root.rstrip('/').split('/')[-1]
+			path = '%s.%s' % (path, extension)
+			os.makedirs(os.path.dirname(os.path.join(data_dir, path)), exist_ok=True)
+			return path
+
+		def record(path, digests, size):
+			with manifest_lock:
+				for algorithm in algorithms:
+					manifests[algorithm].append((digests[algorithm], 'data/%s' % path))
+				report['bytes'] += size
+
+		def binary_metadata(ref):
+			message_digest, size = None, None
+			for s, p, o, datatype, language in self.api.parse_ntriples_terms(ref.data):
+				if s != str(ref.uri):
+					continue
+				if p == self.context['premis'] + 'hasMessageDigest':
+					message_digest = o
+				elif p == self.context['premis'] + 'hasSize':
+					size = int(o)
+			return message_digest, size
+
+		def export_binary(uri, message_digest, expected_size):
+			path = payload_path(uri, 'binary')
+
+			# reuse stored digest where possible
+			digests = {}
+			if reuse_digests and message_digest:
+				stored_algorithm, stored_digest = message_digest.split(':')[-2:]
+				stored_algorithm = stored_algorithm.replace('-','').lower()
+				if stored_algorithm in algorithms:
+					digests[stored_algorithm] = stored_digest.lower()
+			hashers = { algorithm:hashlib.new(algorithm) for algorithm in algorithms if algorithm not in digests }
+
+			# stream to bag, hashing remaining algorithms
+			response = self.api.http_request('GET', uri, is_rdf=False, stream=True)
+			try:
+				if response.status_code != 200:
+					raise Exception('HTTP %s, could not retrieve binary content for %s' % (response.status_code, uri))
+				size = 0
+				with open(os.path.join(data_dir, path), 'wb') as f:
+					for chunk in response.iter_content(chunk_size=BinaryData.chunk_size):
+						for hasher in hashers.values():
+							hasher.update(chunk)
+						f.write(chunk)
+						size += len(chunk)
+			finally:
+				response.close()
+			if expected_size != None and size != expected_size:
+				raise Exception('expected %s bytes for %s, received %s' % (expected_size, uri, size))
+			digests.update({ algorithm:hasher.hexdigest() for algorithm, hasher in hashers.items() })
+			record(path, digests, size)
+			return not hashers
+
+		# walk subtree, writing RDF, and streaming binaries concurrently
+		with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+			futures = set()
+
+			def drain(limit):
+				while len(futures) > limit:
+					done, not_done = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+					for future in done:
+						futures.remove(future)
+						if future.result():
+							report['reused'] += 1
+
+			try:
+				for ref in self.walk(root, depth=depth, concurrency=concurrency, include_types=include_types, exclude_types=exclude_types, uris_only=True, keep_data=True):
+
+					# RDF
+					path = payload_path(ref.uri, 'nt')
+					with open(os.path.join(data_dir, path), 'wb') as f:
+						f.write(ref.data)
+					record(path, { algorithm:hashlib.new(algorithm, ref.data).hexdigest() for algorithm in algorithms }, len(ref.data))
+					report['resources'] += 1
+
+					# binary
+					if rdflib.term.URIRef('http://www.w3.org/ns/ldp#NonRDFSource') in ref.types:
+						futures.add(executor.submit(export_binary, ref.uri, *binary_metadata(ref)))
+						report['binaries'] += 1
+						drain(concurrency * 2)
+					ref.data = None
+				drain(0)
+			except:
+				for future in futures:
+					future.cancel()
+				raise
+
+		# tag files
+		payload_files = sum([ len(entries) for entries in manifests.values() ]) // len(algorithms)
+		tag_files = {
+			'bagit.txt':'BagIt-Version: 1.0\nTag-File-Character-Encoding: UTF-8\n',
+			'bag-info.txt':'Bagging-Date: %s\nExternal-Identifier: %s\nPayload-Oxum: %s.%s\n' % (
+				datetime.date.today().isoformat(),
+				self.parse_uri(root),
+				report['bytes'],
+				payload_files)
+		}
+		for algorithm in algorithms:
+			tag_files['manifest-%s.txt' % algorithm] = ''.join([
+				'%s  %s\n' % (digest, path.replace('%', '%25').replace('\r', '%0D').replace('\n', '%0A'))
+				for digest, path in sorted(manifests[algorithm], key=lambda entry: entry[1]) ])
+		for name, content in tag_files.items():
+			with open(os.path.join(destination, name), 'w', encoding='utf-8') as f:
+				f.write(content)
+		for algorithm in algorithms:
+			with open(os.path.join(destination, 'tagmanifest-%s.txt' % algorithm), 'w', encoding='utf-8') as f:
+				for name in sorted(tag_files.keys()):
+					f.write('%s  %s\n' % (hashlib.new(algorithm, tag_files[name].encode('utf-8')).hexdigest(), name))
+
+		report['elapsed'] = time.time() - stime
+		logger.debug('exported bag: %s' % report)
+		return report
+
+
+	def export_columnar(self, destination, root=None, depth=None, concurrency=4, format='parquet', batch_size=100000, include_types=None, exclude_types=None):
+
+		'''
+		Exports triples of all resources in subtree below root as a columnar table, written as Parquet or Arrow
+		in batches.  Requires pyarrow.
+
+		Resources are retrieved concurrently with self.walk() as N-Triples, and triples read as strings with
+		API.parse_ntriples_terms(), without parsing rdflib graphs.  Columns are dictionary encoded:
+
+			subject, predicate, object, datatype, lang, resource
+
+		where resource is the URI of the resource the triple was retrieved from, and datatype and lang are
+		null for URI and blank node objects.
+
+		Args:
+			destination (str, file-like object): file path, or writable binary file-like object
+			root (rdflib.term.URIRef, str): URI of resource to start from, defaults to repository root
+			depth (int): maximum depth below root. If None, no limit
+			concurrency (int): number of resources retrieved concurrently
+			format (str): 'parquet', or 'arrow' for Arrow IPC file
+			batch_size (int): number of triples per batch, or Parquet row group, written
+			include_types (list): passed to self.walk()
+			exclude_types (list): passed to self.walk()
+
+		Returns:
+			(dict): ('resources':(int), 'triples':(int), 'batches':(int))
+		'''
+
+		if pyarrow == None:
+			raise Exception('pyarrow is required for columnar export')
+		if format not in ['parquet', 'arrow']:
+			raise ValueError('format must be one of: parquet, arrow')
+
+		columns = ['subject', 'predicate', 'object', 'datatype', 'lang', 'resource']
+		schema = pyarrow.schema([ (column, pyarrow.dictionary(pyarrow.int32(), pyarrow.string())) for column in columns ])
+		if format == 'parquet':
+			writer = pyarrow.parquet.ParquetWriter(destination, schema)
+		else:
+			writer = pyarrow.ipc.new_file(destination, schema)
+
+		report = {'resources':0, 'triples':0, 'batches':0}
+		batch = { column:[] for column in columns }
+
+		def write_batch():
+			arrays = [ pyarrow.array(batch[column], type=pyarrow.string()).dictionary_encode() for column in columns ]
+			writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+			report['batches'] += 1
+			for column in columns:
+				batch[column] = []
+
+		try:
+			for ref in self.walk(root, depth=depth, concurrency=concurrency, include_types=include_types, exclude_types=exclude_types, uris_only=True, keep_data=True):
+				resource = str(ref.uri)
+				for triple in self.api.parse_ntriples_terms(ref.data):
+					for column, value in zip(columns, triple):
+						batch[column].append(value)
+					batch['resource'].append(resource)
+					report['triples'] += 1
+				report['resources'] += 1
+				ref.data = None
+				if len(batch['resource']) >= batch_size:
+					write_batch()
+			if batch['resource'] or not report['batches']:
+				write_batch()
+		finally:
+			writer.close()
+
+		logger.debug('exported columnar table: %s' % report)
+		return report
+
+
+	def transaction(self, txn_name=None, buffered=True, concurrency=4, buffer_size=500, overlay=False):
+
+		'''
+		Starts transaction for use as context manager, committing on exit, or rolling back if an exception is raised.
+
+			with repo.transaction() as txn:
+				BasicContainer(txn, 'foo').create(specify_uri=True)
+
+		If buffered, resource creates, updates, and deletes made against the transaction are not sent immediately,
+		but buffered, and flushed with bounded concurrency when the transaction is committed, with or without the
+		context manager, or when buffer_size operations are buffered.  Rolling back discards buffered operations.  Reading a resource with txn.get_resource() while operations for it, or resources
+		below it, are buffered, flushes the buffer first.  See OperationBuffer.
+
+		Args:
+			txn_name (str): human name for transaction
+			buffered (bool): if True, buffer resource operations until flush
+			concurrency (int): number of resources flushed concurrently
+			buffer_size (int): number of buffered operations that trigger flush
+			overlay (bool): if True, serve reads of resources written within transaction locally, see TransactionOverlay
+
+		Returns:
+			(Transaction)
+		'''
+
+		txn = self.start_txn(txn_name, overlay=overlay)
+		if buffered:
+			txn.buffer = OperationBuffer(txn, concurrency=concurrency, max_size=buffer_size)
+		return txn
+
+
+	def start_txn(self, txn_name=None, overlay=False):
 
 		'''
 		Request new transaction from repository, init new Transaction,
@@ -234,6 +901,7 @@ class Repository(object):
 
 		Args:
 			txn_name (str): human name for transaction
+			overlay (bool): if True, serve reads of resources written within transaction locally, see TransactionOverlay
 
 		Return:
 			(Transaction): returns intance of newly created transaction
@@ -257,10 +925,16 @@ class Repository(object):
 				self, # pass the repository
 				txn_name,
 				txn_uri,
-				expires = txn_response.headers['Expires'])
+				expires = txn_response.headers['Expires'],
+				overlay = overlay)
 
 			# append to self
-			self.txns[txn_name] = txn
+			with self._txns_lock:
+				self.txns[txn_name] = txn
+
+			# schedule renewal
+			if self.keep_alive_scheduler:
+				self.keep_alive_scheduler.wake()
 
 			# return
 			return txn
@@ -300,7 +974,12 @@ class Repository(object):
 				expires = None)
 
 			# append to self
-			self.txns[txn_name] = txn
+			with self._txns_lock:
+				self.txns[txn_name] = txn
+
+			# schedule renewal
+			if self.keep_alive_scheduler:
+				self.keep_alive_scheduler.wake()
 
 			# return
 			return txn
@@ -322,29 +1001,46 @@ class Transaction(Repository):
 	Class to represent open transactions.  Spawned by repository instance, these are stored in
 	repo.txns.
 
+	A thin view over the parent repository: Repository.__init__ is not run, and the transaction shares the
+	parent's HTTP sessions and connection pool, namespace manager, context, binary cache, and settings, differing
+	only in root URI and lifecycle state.  Resources retrieved within transactions are not read from or written to
+	the metadata cache or triple index.
+
 	Inherits:
 		Repository
 
+	Optionally, with overlay, resources created and updated within the transaction are recorded in a TransactionOverlay,
+	at txn.overlay, and subsequent reads of those URIs with get_resource() or refresh() are served locally until commit
+	or rollback.  It is off by default, as recorded state lacks server managed triples, e.g. rdf:type, fedora:hasParent,
+	and ldp:contains, so that relationships like parents() and children() of resources read back are empty.
+
 	Args:
+		repo (Repository): parent repository
 		txn_name (str): human name for transaction
 		txn_uri (rdflib.term.URIRef, str): URI of transaction, also to be used as Transaction root path
 		expires (str): expires information from headers
+		overlay (bool): if True, serve reads of resources written within transaction from TransactionOverlay,
+			without server managed triples
 	'''
 
 	def __init__(self,
 			repo,
 			txn_name,
 			txn_uri,
-			expires = None
+			expires = None,
+			overlay = False
 		):
 
-		# fire parent Repository init()
-		super().__init__(
-			txn_uri,
-			repo.username,
-			repo.password,
-			context = repo.context,
-			default_serialization = repo.default_serialization)
+		# parent repository
+		self.repo = repo
+
+		# transaction root
+		self.root = str(txn_uri)
+		if not self.root.endswith('/'): # ensure trailing slash
+			self.root += '/'
+
+		# share settings and HTTP session of parent repository
+		self._share_repository()
 
 		# Transaction init
 		self.name = txn_name
@@ -353,6 +1049,105 @@ class Transaction(Repository):
 		# txn status
 		self.active = True
 
+		# optional, buffer of operations, set by Repository.transaction()
+		self.buffer = None
+
+		# optional, read-your-writes overlay
+		self.overlay = TransactionOverlay(self) if overlay else None
+
+
+	def _share_repository(self):
+
+		'''
+		Shares settings, binary cache, and HTTP sessions of parent repository, at self.repo.  Metadata cache and
+		triple index are not shared, as uncommitted changes in the transaction must not be served to, or read
+		from, the parent repository.
+		'''
+
+		repo = self.repo
+		self.username = repo.username
+		self.password = repo.password
+		self.default_serialization = repo.default_serialization
+		self.default_auto_refresh = repo.default_auto_refresh
+		self.auto_refresh_strategy = repo.auto_refresh_strategy
+		self.custom_resource_type_parser = repo.custom_resource_type_parser
+		self.context = repo.context
+		self.namespace_manager = repo.namespace_manager
+		self.binary_cache = repo.binary_cache
+		self.metadata_cache = None
+		self.triple_index = None
+		self.keep_alive_scheduler = None
+		self.txns = {}
+		self._txns_lock = threading.Lock()
+
+		# API facade, using HTTP sessions of parent repository
+		self.api = API(self)
+
+
+	def __getstate__(self):
+
+		'''
+		Returns compact state for pickling: parent repository, name, URI, and status of transaction.  Buffered
+		operations cannot be pickled, and recorded overlay entries are not, as they may be stale in the worker.
+		'''
+
+		if self.buffer and len(self.buffer):
+			raise Exception('transaction %s has buffered operations, flush before pickling' % self.root)
+		return {
+			'repo':self.repo,
+			'root':self.root,
+			'name':self.name,
+			'expires':self.expires,
+			'active':self.active,
+			'overlay':self.overlay != None
+		}
+
+
+	def __setstate__(self, state):
+
+		overlay = state.pop('overlay')
+		self.__dict__.update(state)
+		self._share_repository()
+		self.buffer = None
+		self.overlay = TransactionOverlay(self) if overlay else None
+
+		# register with unpickled parent repository
+		if self.active:
+			with self.repo._txns_lock:
+				self.repo.txns[self.name] = self
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, exc_type, exc_value, traceback):
+
+		'''
+		Flushes buffered operations and commits, or discards and rolls back if an exception was raised
+		'''
+
+		if exc_type:
+			logger.debug('exception within transaction %s, rolling back' % self.root)
+			if self.buffer != None:
+				self.buffer.discard()
+			if self.active:
+				self.rollback()
+			return False
+
+		# flush before commit, to roll back if buffered operations could not be sent
+
+		try:
+			if self.buffer != None:
+				self.buffer.flush()
+		except:
+			logger.debug('could not flush transaction %s, rolling back' % self.root)
+			self.rollback()
+			raise
+		if self.active:
+			self.commit()
+		return False
+
 
 	def keep_alive(self):
 
@@ -377,8 +1172,8 @@ class Transaction(Repository):
 			self.expires = txn_response.headers['Expires']
 			return  True
 
-		# if 410, transaction does not exist
-		elif txn_response.status_code == 410:
+		# if 410 or 404, transaction does not exist
+		elif txn_response.status_code in [404, 410]:
 			logger.debug("transaction does not exist: %s" % self.root)
 			self.active = False
 			return False
@@ -405,16 +1200,20 @@ class Transaction(Repository):
 		# if 204, transaction was closed
 		if txn_response.status_code == 204:
 			logger.debug("%s for transaction: %s, successful" % (close_type, self.root))
-			# update self.active
+			# update self.active, and discard overlay
 			self.active = False
+			if self.overlay != None:
+				self.overlay.clear()
 			# return
 			return True
 
 		# if 410 or 404, transaction does not exist
 		elif txn_response.status_code in [404, 410]:
 			logger.debug("transaction does not exist: %s" % self.root)
-			# update self.active
+			# update self.active, and discard overlay
 			self.active = False
+			if self.overlay != None:
+				self.overlay.clear()
 			return False
 
 		else:
@@ -424,7 +1223,8 @@ class Transaction(Repository):
 	def commit(self):
 
 		'''
-		Fire self._close() method
+		Flush buffered operations, if any, then fire self._close() method.  If the buffer cannot be flushed,
+		the exception is raised and the transaction is not committed, remaining open to roll back.
 
 		Args:
 			None
@@ -432,6 +1232,10 @@ class Transaction(Repository):
 			bool
 		'''
 
+		# flush buffered operations, aborting commit if raises
+		if self.buffer != None:
+			self.buffer.flush()
+
 		# fire _close method
 		return self._close('commit')
 
@@ -439,7 +1243,7 @@ class Transaction(Repository):
 	def rollback(self):
 
 		'''
-		Fire self._close() method
+		Discard buffered operations, if any, then fire self._close() method
 
 		Args:
 			None
@@ -447,74 +1251,648 @@ class Transaction(Repository):
 			bool
 		'''
 
+		# discard buffered operations
+		if self.buffer != None:
+			self.buffer.discard()
+
 		# fire _close method
 		return self._close('rollback')
 
 
 
-# API
-class API(object):
+# Operation Buffer
+class OperationBuffer(object):
 
 	'''
-	API for making requests and parsing responses from repository endpoint
+	Buffer of resource creates, updates, and deletes within a transaction, flushed with bounded concurrency.
+	Set as txn.buffer by Repository.transaction().
+
+	On flush, buffered resources are grouped in waves by depth of their URI below the transaction root, and waves
+	are sent in ascending depth, so that parents are created before children.  Resources within a wave are sent
+	concurrently, and the operations of each resource are sent in the order buffered.  Repeated updates to a
+	resource, or updates following its create, are coalesced, as the graph is serialized at flush.
+
+	Operations issued while flushing, such as by _post_create hooks, are sent immediately.  Reads of resources with
+	buffered operations, with txn.get_resource(), flush the buffer first, see pending().
+
+	Note: resources created without specify_uri receive their repository minted URI at flush.
 
 	Args:
-		repo (Repository): instance of Repository class
+		txn (Transaction): instance of Transaction
+		concurrency (int): number of resources flushed concurrently
+		max_size (int): number of buffered operations that trigger flush
 	'''
 
-	def __init__(self, repo):
+	def __init__(self, txn, concurrency=4, max_size=500):
 
-		# repository instance
-		self.repo = repo
+		self.txn = txn
+		self.concurrency = concurrency
+		self.max_size = max_size
+		self.operations = collections.OrderedDict()
+		self.size = 0
+		self.flushed = 0
+		self._lock = threading.Lock()
+		self._local = threading.local()
 
 
-	def http_request(self,
-			verb,
-			uri,
-			data=None,
-			headers=None,
-			files=None,
-			response_format=None,
-			is_rdf = True,
-			stream = False
-		):
+	def __len__(self):
+		return self.size
+
+
+	def add(self, resource, operation, kwargs):
 
 		'''
-		Primary route for all HTTP requests to repository.  Ability to set most parameters for requests library,
-		with some additional convenience parameters as well.
+		Buffers operation for resource, unless flushing in current thread
 
 		Args:
-			verb (str): HTTP verb to use for request, e.g. PUT, POST, GET, HEAD, PATCH, etc.
-			uri (rdflib.term.URIRef,str): input URI
-			data (str,file): payload of data to send for request, may be overridden in preperation of request
-			headers (dict): optional dictionary of headers passed directly to requests.request
-			files (dict): optional dictionary of files passed directly to requests.request
-			response_format (str): desired response format for resource's payload, e.g. 'application/rdf+xml', 'text/turtle', etc.
-			is_rdf (bool): if True, set Accept header based on combination of response_format and headers
-			stream (bool): passed directly to requests.request for stream parameter
+			resource (Resource): resource
+			operation (str): 'create', 'update', or 'delete'
+			kwargs (dict): keyword arguments for operation
 
 		Returns:
-			requests.models.Response
+			(bool): True if buffered, False if operation should be sent immediately
 		'''
 
-		# set content negotiated response format for RDFSources
-		if is_rdf:
-			'''
-			Acceptable content negotiated response formats include:
-				application/ld+json (discouraged, if not prohibited, as it drops prefixes used in repository)
-				application/n-triples
-				application/rdf+xml
-				text/n3 (or text/rdf+n3)
-				text/plain
-				text/turtle (or application/x-turtle)
-			'''
-			# set for GET requests only
-			if verb == 'GET':
-				# if no response_format has been requested to this point, use repository instance default
-				if not response_format:
-					response_format = self.repo.default_serialization
-				# if headers present, append
-				if headers and 'Accept' not in headers.keys():
+		if getattr(self._local, 'flushing', False):
+			return False
+
+		with self._lock:
+			key = id(resource)
+			if key not in self.operations:
+				self.operations[key] = (resource, [])
+			pending = self.operations[key][1]
+
+			# coalesce updates, graph is serialized at flush, merging flags into pending create or update
+			if operation == 'update' and pending and pending[-1][0] in ['create', 'update']:
+				pending[-1] = (pending[-1][0], self._merge_kwargs(pending[-1][0], pending[-1][1], kwargs))
+				return True
+
+			pending.append((operation, kwargs))
+			self.size += 1
+			full = self.size >= self.max_size
+
+		# flush if buffer full
+		if full:
+			self.flush()
+		return True
+
+
+	def _merge_kwargs(self, operation, pending_kwargs, kwargs):
+
+		'''
+		Merges keyword arguments of coalesced update into pending create or update.  Flags are OR-ed, where None
+		defers to the other value, and update_binary is only merged into updates, as create always sends binary data.
+
+		Returns:
+			(dict): merged keyword arguments
+		'''
+
+		merged = dict(pending_kwargs)
+		for key in ['auto_refresh', 'update_binary']:
+			if key not in kwargs or (key == 'update_binary' and operation != 'update'):
+				continue
+			if kwargs[key] == None:
+				continue
+			elif merged.get(key) == None:
+				merged[key] = kwargs[key]
+			else:
+				merged[key] = merged[key] or kwargs[key]
+		return merged
+
+
+	def pending(self, uri):
+
+		'''
+		Returns True if operations are buffered for resource, or resources below it, as its containment would change.
+		Always False while flushing in current thread.
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+
+		Returns:
+			(bool)
+		'''
+
+		if getattr(self._local, 'flushing', False):
+			return False
+		uri = str(uri).rstrip('/')
+		with self._lock:
+			uris = [ str(resource.uri) for resource, operations in self.operations.values() ]
+		return any([ pending_uri == uri or pending_uri.startswith('%s/' % uri) for pending_uri in uris ])
+
+
+	def _depth(self, resource, operations):
+
+		'''
+		Returns depth of resource below transaction root, counting resources created with minted URI as children
+		'''
+
+		path = str(resource.uri)[len(self.txn.root):].strip('/')
+		depth = len(path.split('/')) if path else 0
+		operation, kwargs = operations[0]
+		if operation == 'create' and not kwargs.get('specify_uri'):
+			depth += 1
+		return depth
+
+
+	def _send(self, resource, operations):
+
+		'''
+		Sends operations for resource, in order buffered
+		'''
+
+		self._local.flushing = True
+		try:
+			for operation, kwargs in operations:
+				getattr(resource, operation)(**kwargs)
+		finally:
+			self._local.flushing = False
+
+
+	def flush(self):
+
+		'''
+		Sends buffered operations in waves of ascending depth, with bounded concurrency
+
+		Returns:
+			(int): number of operations sent
+		'''
+
+		with self._lock:
+			operations = list(self.operations.values())
+			size = self.size
+			self.operations = collections.OrderedDict()
+			self.size = 0
+		if not operations:
+			return 0
+
+		# group by depth
+		waves = collections.defaultdict(list)
+		for resource, resource_operations in operations:
+			waves[self._depth(resource, resource_operations)].append((resource, resource_operations))
+
+		# send waves
+		logger.debug('flushing %s operations in %s waves for transaction %s' % (size, len(waves), self.txn.root))
+		with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+			for depth in sorted(waves.keys()):
+				futures = [ executor.submit(self._send, resource, resource_operations) for resource, resource_operations in waves[depth] ]
+				errors = [ future.exception() for future in futures if future.exception() ]
+				if errors:
+					raise Exception('could not flush %s of %s resources at depth %s: %s' % (len(errors), len(futures), depth, errors[0]))
+
+		self.flushed += size
+		return size
+
+
+	def discard(self):
+
+		'''
+		Discards buffered operations
+		'''
+
+		with self._lock:
+			self.operations = collections.OrderedDict()
+			self.size = 0
+
+
+
+# Transaction Overlay
+class TransactionOverlay(object):
+
+	'''
+	Read-your-writes overlay of resources created, updated, and deleted within a transaction.  Set as txn.overlay.
+
+	After a resource is created or updated within the transaction, its graph and headers are recorded, and
+	Repository.get_resource(), and so Resource.refresh(), serve that state without a request until the transaction
+	is committed or rolled back.  Deleted resources are returned as not found.  Parents are forgotten when
+	children are created or deleted, as their containment changed, and NonRDFSources are not recorded, as their
+	descriptions are computed by the repository.
+
+	Note: unless refreshed with a GET request, or representation returned by the repository, recorded state is
+	the graph sent to the repository, without server managed triples.
+
+	Args:
+		txn (Transaction): instance of Transaction
+	'''
+
+	def __init__(self, txn):
+
+		self.txn = txn
+		self.entries = {}
+		self._lock = threading.Lock()
+
+
+	def __len__(self):
+		return len(self.entries)
+
+
+	def get(self, uri):
+
+		'''
+		Returns entry for resource
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+
+		Returns:
+			(types.SimpleNamespace): entry with attributes deleted, resource_type, and response (CachedResponse), or None
+		'''
+
+		return self.entries.get(str(uri))
+
+
+	def put(self, resource, previous_uri=None):
+
+		'''
+		Records state of resource, and forgets parent
+
+		Args:
+			resource (Resource): resource written within transaction
+			previous_uri (rdflib.term.URIRef): uri of resource before create, e.g. parent for repository minted uri,
+				subjects of which are rewritten to resource.uri, if resource was not refreshed
+
+		Returns:
+			None
+		'''
+
+		uri = str(resource.uri)
+		self.forget(uri.rsplit('/', 1)[0])
+		if isinstance(resource, NonRDFSource):
+			self.forget(uri)
+			return
+
+		# rewrite subjects if uri changed during create, as _refresh_from_response() does
+		graph = resource.rdf.graph
+		if previous_uri and previous_uri != resource.uri and (previous_uri, None, None) in graph:
+			graph = copy.deepcopy(graph)
+			for s,p,o in list(graph.triples((previous_uri, None, None))):
+				graph.remove((s,p,o))
+				graph.add((resource.uri,p,o))
+
+		content = graph.serialize(format='nt')
+		if isinstance(content, str):
+			content = content.encode('utf-8')
+		headers = dict(resource.headers)
+		headers['Content-Type'] = 'application/n-triples'
+
+		entry = SimpleNamespace()
+		entry.deleted = False
+		entry.resource_type = type(resource)
+		entry.response = CachedResponse(uri, content, headers)
+		with self._lock:
+			self.entries[uri] = entry
+
+
+	def delete(self, uri):
+
+		'''
+		Records resource, and descendants, as deleted, and forgets parent
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+
+		Returns:
+			None
+		'''
+
+		uri = str(uri)
+		self.forget(uri, subtree=True)
+		self.forget(uri.rsplit('/', 1)[0])
+		entry = SimpleNamespace()
+		entry.deleted = True
+		with self._lock:
+			self.entries[uri] = entry
+
+
+	def forget(self, uri, subtree=False):
+
+		'''
+		Removes resource, and optionally descendants, so reads are sent to the repository
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource
+			subtree (bool): if True, remove descendants as well
+
+		Returns:
+			None
+		'''
+
+		uri = str(uri)
+		with self._lock:
+			self.entries.pop(uri, None)
+			if subtree:
+				prefix = '%s/' % uri.rstrip('/')
+				for key in [ key for key in self.entries if key.startswith(prefix) ]:
+					del self.entries[key]
+
+
+	def clear(self):
+
+		'''
+		Discards all entries
+		'''
+
+		with self._lock:
+			self.entries = {}
+
+
+
+# Keep Alive Scheduler
+class KeepAliveScheduler(object):
+
+	'''
+	Renews all open transactions in repo.txns shortly before they expire, from a single background thread
+	per repository.  Set as repo.keep_alive_scheduler with Repository(auto_keep_alive=True).
+
+	The thread sleeps until the next renewal is due, renews with Transaction.keep_alive(), and exits when no
+	active transactions remain, so committed or rolled back transactions are no longer renewed.  It is started
+	again by wake(), called when transactions are started or retrieved.
+
+	The margin is clamped to half the lifetime remaining at the last renewal, so that a margin longer than the
+	repository's transaction timeout does not make transactions always due.  If expires is already past at
+	renewal, e.g. with clock skew, transactions are renewed every default_interval instead.  Failed renewals
+	are retried with exponential backoff, up to default_interval, and transactions the repository no longer
+	knows, responding 404 or 410, are set inactive and no longer renewed.
+
+	Args:
+		repo (Repository): instance of Repository class
+		margin (int, float): seconds before expiry to renew
+		default_interval (int, float): seconds between renewals, for transactions without parsable expires
+
+	Attributes:
+		latencies (collections.deque): seconds for recent renewal requests
+	'''
+
+	def __init__(self, repo, margin=30, default_interval=60):
+
+		self.repo = repo
+		self.margin = margin
+		self.default_interval = default_interval
+		self.renewals = 0
+		self.failures = 0
+		self.latencies = collections.deque(maxlen=1000)
+		self._condition = threading.Condition()
+		self._thread = None
+		self._stopped = False
+		self._renewed = {}
+		self._retry = {}
+		self._attempts = {}
+
+
+	def wake(self):
+
+		'''
+		Starts thread if not running, or notifies thread to recompute next renewal
+		'''
+
+		with self._condition:
+			self._stopped = False
+			if not self._thread:
+				self._thread = threading.Thread(target=self._run, name='pyfc4-keep-alive', daemon=True)
+				self._thread.start()
+			else:
+				self._condition.notify()
+
+
+	def stop(self):
+
+		'''
+		Stops thread
+		'''
+
+		with self._condition:
+			self._stopped = True
+			self._condition.notify()
+			thread = self._thread
+		if thread:
+			thread.join()
+
+
+	def _due(self, txn):
+
+		'''
+		Returns time, as seconds since epoch, when transaction should be renewed
+		'''
+
+		try:
+			expires = email.utils.parsedate_to_datetime(txn.expires).timestamp()
+		except (TypeError, ValueError):
+			expires = None
+		renewed = self._renewed.setdefault(txn.root, time.time())
+
+		# expires unknown, or already past at renewal, e.g. clock skew
+		if expires == None or expires <= renewed:
+			due = renewed + self.default_interval
+
+		# margin clamped to half of lifetime remaining at renewal
+		else:
+			due = expires - min(self.margin, (expires - renewed) / 2)
+		return max(due, self._retry.get(txn.root, 0))
+
+
+	def _run(self):
+
+		'''
+		Renews transactions as they come due, until no active transactions remain
+		'''
+
+		while True:
+
+			# find next due, or exit
+			with self._condition:
+				with self.repo._txns_lock:
+					active = [ txn for txn in self.repo.txns.values() if txn.active ]
+
+				# forget closed transactions
+				roots = set([ txn.root for txn in active ])
+				for tracked in [self._renewed, self._retry, self._attempts]:
+					for root in [ root for root in tracked if root not in roots ]:
+						del tracked[root]
+
+				if self._stopped or not active:
+					logger.debug('no active transactions, stopping keep alive thread')
+					self._thread = None
+					return
+				txn = min(active, key=self._due)
+				wait = self._due(txn) - time.time()
+				if wait > 0:
+					self._condition.wait(wait)
+					continue
+
+			# renew, outside of lock
+			stime = time.time()
+			try:
+				renewed = txn.keep_alive()
+			except Exception as e:
+				# retry with exponential backoff, e.g. after connection error
+				attempts = self._attempts.get(txn.root, 0) + 1
+				self._attempts[txn.root] = attempts
+				backoff = min(2 ** (attempts - 1), self.default_interval)
+				logger.debug('could not renew transaction %s, retrying in %ss: %s' % (txn.root, backoff, e))
+				self.failures += 1
+				self._retry[txn.root] = time.time() + backoff
+				continue
+			latency = time.time() - stime
+			self._attempts.pop(txn.root, None)
+			self._retry.pop(txn.root, None)
+			if renewed:
+				self.renewals += 1
+				self.latencies.append(latency)
+				self._renewed[txn.root] = time.time()
+				logger.debug('renewed transaction %s in %.3fs, expires %s' % (txn.root, latency, txn.expires))
+			else:
+				# transaction no longer exists, Transaction.keep_alive() sets inactive, stop tracking
+				self.failures += 1
+				self._renewed.pop(txn.root, None)
+
+
+	def report(self):
+
+		'''
+		Returns summary of renewals
+
+		Returns:
+			(dict): ('renewals':(int), 'failures':(int), 'latency_mean':(float), 'latency_max':(float), 'active':(int))
+		'''
+
+		latencies = list(self.latencies)
+		return {
+			'renewals':self.renewals,
+			'failures':self.failures,
+			'latency_mean':sum(latencies) / len(latencies) if latencies else None,
+			'latency_max':max(latencies) if latencies else None,
+			'active':len([ txn for txn in list(self.repo.txns.values()) if txn.active ])
+		}
+
+
+
+# API
+class API(object):
+
+	'''
+	API for making requests and parsing responses from repository endpoint
+
+	Thread-safe: each thread sends requests with its own requests.Session, as sessions carry mutable cookies and
+	state, while all sessions of a repository share one HTTPAdapter, pooling connections across threads.  Transactions
+	spawned from the repository use the sessions and connection pool of the repository.  Pooled connections are not shared across
+	processes: if the process has forked since the pool was created, a new pool is created on next use.
+
+	Args:
+		repo (Repository): instance of Repository class
+		session (requests.Session): optional, single session used by all threads instead, e.g. for custom
+			authentication, which must then be safe to share
+	'''
+
+	# maximum connections kept per host, sized for concurrent workers
+	pool_maxsize = 32
+
+	def __init__(self, repo, session=None):
+
+		# repository instance
+		self.repo = repo
+
+		# optional, session shared by all threads
+		self._shared_session = session
+
+		# transactions reuse connection pool of parent repository, as their sessions are those of the parent
+		if isinstance(repo, Transaction):
+			parent_api = repo.repo.api
+			self._adapter = parent_api._adapter
+			self._local = parent_api._local
+			self._pid = parent_api._pid
+
+		# connection pool, per-thread sessions, and process that created them
+		else:
+			self._init_pool()
+
+
+	def _init_pool(self):
+
+		'''
+		Creates connection pool, and discards sessions of all threads
+		'''
+
+		self._adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.pool_maxsize)
+		self._local = threading.local()
+		self._pid = os.getpid()
+
+
+	@property
+	def session(self):
+
+		'''
+		HTTP session for current thread, recreated in child processes after fork, as pooled connections of parent
+		cannot be reused
+
+		Returns:
+			(requests.Session)
+		'''
+
+		# transactions use sessions of parent repository
+		if isinstance(self.repo, Transaction):
+			return self.repo.repo.api.session
+
+		if self._shared_session:
+			return self._shared_session
+
+		if self._pid != os.getpid():
+			logger.debug('process forked, creating new connection pool for %s' % self.repo.root)
+			self._init_pool()
+
+		if not hasattr(self._local, 'session'):
+			self._local.session = requests.Session()
+			self._local.session.mount('http://', self._adapter)
+			self._local.session.mount('https://', self._adapter)
+		return self._local.session
+
+
+	def http_request(self,
+			verb,
+			uri,
+			data=None,
+			headers=None,
+			files=None,
+			response_format=None,
+			is_rdf = True,
+			stream = False
+		):
+
+		'''
+		Primary route for all HTTP requests to repository.  Ability to set most parameters for requests library,
+		with some additional convenience parameters as well.
+
+		Args:
+			verb (str): HTTP verb to use for request, e.g. PUT, POST, GET, HEAD, PATCH, etc.
+			uri (rdflib.term.URIRef,str): input URI
+			data (str,file): payload of data to send for request, may be overridden in preperation of request
+			headers (dict): optional dictionary of headers passed directly to requests.request
+			files (dict): optional dictionary of files passed directly to requests.request
+			response_format (str): desired response format for resource's payload, e.g. 'application/rdf+xml', 'text/turtle', etc.
+			is_rdf (bool): if True, set Accept header based on combination of response_format and headers
+			stream (bool): passed directly to requests.request for stream parameter
+
+		Returns:
+			requests.models.Response
+		'''
+
+		# set content negotiated response format for RDFSources
+		if is_rdf:
+			'''
+			Acceptable content negotiated response formats include:
+				application/ld+json (discouraged, if not prohibited, as it drops prefixes used in repository)
+				application/n-triples
+				application/rdf+xml
+				text/n3 (or text/rdf+n3)
+				text/plain
+				text/turtle (or application/x-turtle)
+			'''
+			# set for GET requests only
+			if verb == 'GET':
+				# if no response_format has been requested to this point, use repository instance default
+				if not response_format:
+					response_format = self.repo.default_serialization
+				# if headers present, append
+				if headers and 'Accept' not in headers.keys():
 					headers['Accept'] = response_format
 				# if headers are blank, init dictionary
 				else:
@@ -528,10 +1906,9 @@ class API(object):
 			(verb, uri, response_format, headers))
 
 		# manually prepare request
-		session = requests.Session()
 		request = requests.Request(verb, uri, auth=(self.repo.username, self.repo.password), data=data, headers=headers, files=files)
-		prepped_request = session.prepare_request(request)
-		response = session.send(prepped_request,
+		prepped_request = self.session.prepare_request(request)
+		response = self.session.send(prepped_request,
 			stream=stream,
 		)
 		return response
@@ -557,9 +1934,10 @@ class API(object):
 			for link in response.headers['Link'].split(', ')
 			if link.startswith('<http://www.w3.org/ns/ldp#')]
 
-		# parse resource type string with self.repo.namespace_manager.compute_qname()
+		# parse local name of resource type, without compute_qname() of self.repo.namespace_manager, which
+		# binds and caches prefixes, and is shared across threads
 		ldp_resource_types = [
-			self.repo.namespace_manager.compute_qname(resource_type)[2]
+			resource_type.split('#')[-1]
 			for resource_type in links]
 
 		logger.debug('Parsed LDP resource types from LINK header: %s' % ldp_resource_types)
@@ -582,6 +1960,82 @@ class API(object):
 			return False
 
 
+	def parse_ntriples_structure(self, uri, data):
+
+		'''
+		Small function to read rdf:type and ldp:contains of a resource from N-Triples payload, scanning lines
+		without parsing an rdflib graph
+
+		Args:
+			uri (rdflib.term.URIRef, str): URI of resource, subject of triples
+			data (bytes): N-Triples payload
+
+		Returns:
+			(tuple): (list of rdf:type values, list of ldp:contains values), as rdflib.term.URIRef
+		'''
+
+		types = []
+		children = []
+		subject = '<%s>' % uri
+		for line in data.decode('utf-8').splitlines():
+			if not line.startswith(subject):
+				continue
+			match = NTRIPLES_URI_TRIPLE.match(line)
+			if not match:
+				continue
+			s, p, o = match.groups()
+			if p == 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type':
+				types.append(rdflib.term.URIRef(o))
+			elif p == 'http://www.w3.org/ns/ldp#contains':
+				children.append(rdflib.term.URIRef(o))
+		return (types, children)
+
+
+	def parse_ntriples_terms(self, data):
+
+		'''
+		Generator to read triples from N-Triples payload as strings, matching lines with a regular expression
+		without creating rdflib terms
+
+		URIs are returned without angle brackets, blank nodes with _: prefix, and literals unescaped.
+		Literals without datatype or language return xsd:string as datatype, and URIs and blank nodes return
+		None for datatype and language, so that URI and literal objects can be distinguished.
+
+		Args:
+			data (bytes): N-Triples payload
+
+		Returns:
+			(generator): tuples of (subject, predicate, object, datatype, language)
+		'''
+
+		def unescape(match):
+			if match.group(3) != None:
+				return NTRIPLES_ESCAPES.get(match.group(3), match.group(0))
+			return chr(int(match.group(1) or match.group(2), 16))
+
+		for line in data.decode('utf-8').splitlines():
+			match = NTRIPLES_TRIPLE.match(line)
+			if not match:
+				continue
+			s, p, o_uri, o_bnode, o_literal, datatype, language = match.groups()
+			if s.startswith('<'):
+				s = s[1:-1]
+
+			# URI or blank node
+			if o_literal == None:
+				yield (s, p, o_uri or o_bnode, None, None)
+
+			# literal
+			else:
+				if '\\' in o_literal:
+					o_literal = NTRIPLES_ESCAPE.sub(unescape, o_literal)
+				if language:
+					datatype = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#langString'
+				elif not datatype:
+					datatype = 'http://www.w3.org/2001/XMLSchema#string'
+				yield (s, p, o_literal, datatype, language)
+
+
 	def parse_rdf_payload(self, data, headers):
 
 		'''
@@ -616,6 +2070,49 @@ class API(object):
 
 
 
+# RateLimiter
+class RateLimiter(object):
+
+	'''
+	Thread-safe limiter for requests per second, shared by concurrent workers
+
+	Args:
+		rate (float): maximum requests per second, if None, no limit
+	'''
+
+	def __init__(self, rate=None):
+
+		self.rate = rate
+		self._lock = threading.Lock()
+		self._next = time.monotonic()
+
+
+	def wait(self):
+
+		'''
+		Blocks until next request is allowed
+
+		Args:
+			None
+
+		Returns:
+			None
+		'''
+
+		if not self.rate:
+			return
+
+		# reserve next slot
+		with self._lock:
+			now = time.monotonic()
+			delay = self._next - now
+			self._next = max(now, self._next) + (1.0 / self.rate)
+
+		if delay > 0:
+			time.sleep(delay)
+
+
+
 # SparqlUpdate
 class SparqlUpdate(object):
 
@@ -741,6 +2238,11 @@ class Resource(object):
 		uri (rdflib.term.URIRef,str): input URI
 		response (requests.models.Response): defaults None, but if passed, populate self.data, self.headers, self.status_code
 		rdf_prefixes_mixins (dict): optional rdf prefixes and namespaces
+
+	Attributes:
+		headers (dict): headers of resource, response headers when retrieved, and sent with create or update requests
+		response_headers (dict): headers of the most recent response the state of resource was taken from, the GET
+			of retrieve or 'get' refresh, or the create or update response with 'local' or 'representation' refresh
 	'''
 
 	def __init__(self,
@@ -762,6 +2264,7 @@ class Resource(object):
 			self.response = response
 			self.data = self.response.content
 			self.headers = self.response.headers
+			self.response_headers = requests.structures.CaseInsensitiveDict(self.response.headers)
 			self.status_code = self.response.status_code
 			# if response, and status_code is 200, set True
 			if self.status_code == 200:
@@ -772,6 +2275,7 @@ class Resource(object):
 			self.response = None
 			self.data = None
 			self.headers = {}
+			self.response_headers = {}
 			self.status_code = None
 			self.exists = False
 
@@ -786,6 +2290,63 @@ class Resource(object):
 		return '<%s Resource, uri: %s>' % (self.__class__.__name__, self.uri)
 
 
+	def __getstate__(self):
+
+		'''
+		Returns compact state for pickling, e.g. to send to process pool workers.  The response and raw payload are
+		not pickled, and the current and originally retrieved graphs are pickled as named graphs of a single N-Quads
+		document, so that modifications not yet sent with update() are retained, and blank nodes shared by both
+		graphs remain shared when unpickled.
+		'''
+
+		state = self.__dict__.copy()
+		state['response'] = None
+		state['data'] = None
+
+		# ResourceVersion instances do not parse RDF
+		rdf = state.pop('rdf', None)
+		if rdf:
+			dataset = rdflib.Dataset()
+			dataset.addN([ triple + (dataset.graph(PICKLED_GRAPH),) for triple in rdf.graph ])
+			dataset.addN([ triple + (dataset.graph(PICKLED_ORIG_GRAPH),) for triple in rdf._orig_graph ])
+			state['_rdf'] = {
+				'graphs':dataset.serialize(format='nquads'),
+				'namespaces':[ (ns_prefix, str(ns_uri)) for ns_prefix, ns_uri in rdf.graph.namespaces() ]
+			}
+		return state
+
+
+	def __setstate__(self, state):
+
+		rdf = state.pop('_rdf', None)
+		self.__dict__.update(state)
+
+		# rebuild rdf from pickled graphs, as _build_rdf() would from payload
+		if rdf:
+			self.rdf = SimpleNamespace()
+			self.rdf.data = None
+			self.rdf.prefixes = SimpleNamespace()
+			self.rdf.uris = SimpleNamespace()
+			for prefix,uri in self.repo.context.items():
+				setattr(self.rdf.prefixes, prefix, rdflib.Namespace(uri))
+			dataset = rdflib.Dataset()
+			dataset.parse(data=rdf['graphs'], format='nquads')
+			self.rdf.graph = rdflib.Graph()
+			self.rdf._orig_graph = rdflib.Graph()
+			for triple in dataset.graph(PICKLED_GRAPH):
+				self.rdf.graph.add(triple)
+			for triple in dataset.graph(PICKLED_ORIG_GRAPH):
+				self.rdf._orig_graph.add(triple)
+			self.rdf.namespace_manager = rdflib.namespace.NamespaceManager(self.rdf.graph)
+			for ns_prefix, ns_uri in self.rdf.prefixes.__dict__.items():
+				self.rdf.namespace_manager.bind(ns_prefix, ns_uri, override=False)
+			for ns_prefix, ns_uri in rdf['namespaces']:
+				self.rdf.namespace_manager.bind(ns_prefix, ns_uri, override=False)
+				setattr(self.rdf.prefixes, ns_prefix, rdflib.Namespace(ns_uri))
+				setattr(self.rdf.uris, rdflib.Namespace(ns_uri), ns_prefix)
+			self.parse_object_like_triples()
+
+
 	def uri_as_string(self):
 
 		'''
@@ -837,9 +2398,17 @@ class Resource(object):
 		if self.exists:
 			raise Exception('resource exists attribute True, aborting')
 
+		# if within buffered transaction, defer until flush
+		elif self._buffer_operation('create', specify_uri=specify_uri, ignore_tombstone=ignore_tombstone, serialization_format=serialization_format, stream=stream, auto_refresh=auto_refresh):
+			logger.debug('buffering create of resource %s' % self.uri)
+			return self
+
 		# else, continue
 		else:
 
+			# forget state recorded in transaction overlay, resource is written
+			self._forget_in_overlay()
+
 			# determine verb based on specify_uri parameter
 			if specify_uri:
 				verb = 'PUT'
@@ -852,7 +2421,7 @@ class Resource(object):
 			#if so, run self.binary._prep_binary()
 			if issubclass(type(self),NonRDFSource):
 				self.binary._prep_binary()
-				data = self.binary.data
+				data = self.binary.payload
 
 			# otherwise, prep for RDF
 			else:
@@ -864,11 +2433,55 @@ class Resource(object):
 				logger.debug(data.decode('utf-8'))
 				self.headers['Content-Type'] = serialization_format
 
+			# if requesting representation in response, add Prefer and Accept headers for this request only
+			headers = self.headers
+			if self._requests_representation(auto_refresh):
+				headers = self._representation_headers(self.headers)
+
 			# fire creation request
-			response = self.repo.api.http_request(verb, self.uri, data=data, headers=self.headers, stream=stream)
+			response = self.repo.api.http_request(verb, self.uri, data=data, headers=headers, stream=stream)
 			return self._handle_create(response, ignore_tombstone, auto_refresh)
 
 
+	def _record_in_overlay(self, previous_uri=None):
+
+		'''
+		Small method to record state of resource in transaction overlay, if resource belongs to transaction with
+		TransactionOverlay, and to forget parent, as containment changed
+		'''
+
+		overlay = getattr(self.repo, 'overlay', None)
+		if overlay != None:
+			overlay.put(self, previous_uri=previous_uri)
+
+
+	def _forget_in_overlay(self):
+
+		'''
+		Small method to forget state of resource in transaction overlay, before resource is written
+		'''
+
+		overlay = getattr(self.repo, 'overlay', None)
+		if overlay != None:
+			overlay.forget(self.uri)
+
+
+	def _buffer_operation(self, operation, **kwargs):
+
+		'''
+		Small method to buffer operation if resource belongs to transaction with OperationBuffer
+
+		Args:
+			operation (str): 'create', 'update', or 'delete'
+
+		Returns:
+			(bool): True if buffered
+		'''
+
+		buffer = getattr(self.repo, 'buffer', None)
+		return buffer != None and buffer.add(self, operation, kwargs)
+
+
 	def _handle_create(self, response, ignore_tombstone, auto_refresh):
 
 		'''
@@ -882,13 +2495,19 @@ class Resource(object):
 		# 201, success, refresh
 		if response.status_code == 201:
 			# if not specifying uri, capture from response and append to object
-			self.uri = self.repo.parse_uri(response.text)
+			# favor Location header, as body may contain representation
+			previous_uri = self.uri
+			self.uri = self.repo.parse_uri(response.headers.get('Location', response.text))
+			# binary data streamed without Digest header, verify against digest stored by repository
+			if isinstance(self, NonRDFSource):
+				self.binary._verify_upload()
+			# containment of parent changed, remove from triple index
+			if self.repo.triple_index:
+				self.repo.triple_index.remove(self.uri.rsplit('/', 1)[0], subtree=False)
 			# creation successful
-			if auto_refresh:
-				self.refresh()
-			elif auto_refresh == None:
-				if self.repo.default_auto_refresh:
-					self.refresh()
+			self._handle_auto_refresh(response, auto_refresh, previous_uri=previous_uri)
+			# record in transaction overlay
+			self._record_in_overlay(previous_uri=previous_uri)
 			# fire resource._post_create hook if exists
 			if hasattr(self,'_post_create'):
 				self._post_create(auto_refresh=auto_refresh)
@@ -897,6 +2516,10 @@ class Resource(object):
 		elif response.status_code == 404:
 			raise Exception('HTTP 404, for this POST request target location does not exist')
 
+		# 409, conflict, checksum mismatch for Digest header
+		elif response.status_code == 409 and 'checksum' in response.text.lower():
+			raise Exception('HTTP 409, checksum mismatch for binary data')
+
 		# 409, conflict, resource likely exists
 		elif response.status_code == 409:
 			raise Exception('HTTP 409, resource already exists')
@@ -968,8 +2591,11 @@ class Resource(object):
 
 		# handle response
 		if response.status_code == 201:
-			# set self exists
+			# set self exists, and forget in transaction overlay
 			self.exists = False
+			if getattr(self.repo, 'overlay', None) != None:
+				self.repo.overlay.forget(self.uri, subtree=True)
+				self.repo.overlay.forget(self.uri.rsplit('/', 1)[0])
 			# handle tombstone
 			if remove_tombstone:
 				tombstone_response = self.repo.api.http_request('DELETE', "%s/fcr:tombstone" % self.uri)
@@ -1020,11 +2646,21 @@ class Resource(object):
 			(bool)
 		'''
 
+		# if within buffered transaction, defer until flush
+		if self._buffer_operation('delete', remove_tombstone=remove_tombstone):
+			logger.debug('buffering delete of resource %s' % self.uri)
+			return True
+
 		response = self.repo.api.http_request('DELETE', self.uri)
 
 		# update exists
 		if response.status_code == 204:
-			# removal successful, updating self
+			# removal successful, remove from triple index with parent, and updating self
+			if self.repo.triple_index:
+				self.repo.triple_index.remove(self.uri)
+				self.repo.triple_index.remove(self.uri.rsplit('/', 1)[0], subtree=False)
+			if getattr(self.repo, 'overlay', None) != None:
+				self.repo.overlay.delete(self.uri)
 			self._empty_resource_attributes()
 
 		if remove_tombstone:
@@ -1057,6 +2693,7 @@ class Resource(object):
 			self.status_code = updated_self.status_code
 			self.rdf.data = updated_self.rdf.data
 			self.headers = updated_self.headers
+			self.response_headers = updated_self.response_headers
 			self.exists = updated_self.exists
 
 			# update graph if RDFSource
@@ -1106,13 +2743,13 @@ class Resource(object):
 		self._parse_graph()
 
 
-	def _parse_graph(self):
+	def _parse_graph(self, headers=None):
 
 		'''
 		use Content-Type from headers to determine parsing method
 
 		Args:
-			None
+			headers (dict): optional, headers with Content-Type of self.rdf.data, defaults to self.headers
 
 		Return:
 			None: sets self.rdf by parsing data from GET request, or setting blank graph of resource does not yet exist
@@ -1120,7 +2757,7 @@ class Resource(object):
 
 		# if resource exists, parse self.rdf.data
 		if self.exists:
-			self.rdf.graph = self.repo.api.parse_rdf_payload(self.rdf.data, self.headers)
+			self.rdf.graph = self.repo.api.parse_rdf_payload(self.rdf.data, headers or self.headers)
 
 		# else, create empty graph
 		else:
@@ -1244,6 +2881,7 @@ class Resource(object):
 
 		self.status_code = 404
 		self.headers = {}
+		self.response_headers = {}
 		self.exists = False
 
 		# build RDF
@@ -1382,37 +3020,55 @@ class Resource(object):
 			(bool)
 		'''
 
+		# if within buffered transaction, defer until flush
+		if not sparql_query_only and self._buffer_operation('update', auto_refresh=auto_refresh, update_binary=update_binary):
+			logger.debug('buffering update of resource %s' % self.uri)
+			return True
+
 		# run diff on graphs, send as PATCH request
 		self._diff_graph()
 		sq = SparqlUpdate(self.rdf.prefixes, self.rdf.diffs)
 		if sparql_query_only:
 			return sq.build_query()
+		self._forget_in_overlay()
+		headers = {'Content-Type':'application/sparql-update'}
+		if self._requests_representation(auto_refresh):
+			headers = self._representation_headers(headers)
 		response = self.repo.api.http_request(
 			'PATCH',
 			'%s/fcr:metadata' % self.uri, # send RDF updates to URI/fcr:metadata
 			data=sq.build_query(),
-			headers={'Content-Type':'application/sparql-update'})
+			headers=headers)
 
-		# if RDF update not 204, raise Exception
-		if response.status_code != 204:
+		# if RDF update not 204 (or 200, when representation returned), raise Exception
+		if response.status_code not in [200, 204]:
 			logger.debug(response.content)
 			raise Exception('HTTP %s, expecting 204' % response.status_code)
 
-		# if NonRDFSource, and self.binary.data is not a Response object, update binary as well
-		if type(self) == NonRDFSource and update_binary and type(self.binary.data) != requests.models.Response:
+		# if NonRDFSource, and binary data was set locally (not retrieved from repository), update binary as well
+		if type(self) == NonRDFSource and update_binary and self.binary._has_local_data():
 			self.binary._prep_binary()
-			binary_data = self.binary.data
+			binary_headers = {'Content-Type':self.binary.mimetype}
+			if 'Digest' in self.headers:
+				binary_headers['Digest'] = self.headers['Digest']
 			binary_response = self.repo.api.http_request(
 				'PUT',
 				self.uri,
-				data=binary_data,
-				headers={'Content-Type':self.binary.mimetype})
+				data=self.binary.payload,
+				headers=binary_headers)
 
-			# if not refreshing RDF, still update binary here
-			if not auto_refresh and not self.repo.default_auto_refresh:
+			# if binary update not 204, raise Exception
+			if binary_response.status_code not in [201, 204]:
+				logger.debug(binary_response.content)
+				raise Exception('HTTP %s, could not update binary data' % binary_response.status_code)
+
+			# binary data streamed without Digest header, verify against digest stored by repository
+			self.binary._verify_upload()
+
+			# if not refreshing RDF with follow-up GET, reset binary data to be retrieved on next access
+			if (not auto_refresh and not self.repo.default_auto_refresh) or self.repo.auto_refresh_strategy != 'get':
 				logger.debug("not refreshing resource RDF, but updated binary, so must refresh binary data")
-				updated_self = self.repo.get_resource(self.uri)
-				self.binary.refresh(updated_self)
+				self.binary.data = None
 
 		# fire optional post-update hook
 		if hasattr(self,'_post_update'):
@@ -1422,14 +3078,151 @@ class Resource(object):
 		'''
 		If not updating binary, pass that bool to refresh as refresh_binary flag to avoid touching binary data
 		'''
-		if auto_refresh:
-			self.refresh(refresh_binary=update_binary)
-		elif auto_refresh == None:
-			if self.repo.default_auto_refresh:
-				self.refresh(refresh_binary=update_binary)
+		self._handle_auto_refresh(response, auto_refresh, refresh_binary=update_binary)
+		self._record_in_overlay()
 		return True
 
 
+	def _requests_representation(self, auto_refresh):
+
+		'''
+		Small method to determine if a create or update request should ask the repository
+		to return the representation of the resource in the response
+
+		Args:
+			auto_refresh (bool): auto_refresh flag passed to create/update
+
+		Returns:
+			(bool)
+		'''
+
+		# only RDF resources, binary representations are the binary data
+		if isinstance(self, NonRDFSource):
+			return False
+
+		# determine auto_refresh from repository default if not set
+		if auto_refresh == None:
+			auto_refresh = self.repo.default_auto_refresh
+
+		return bool(auto_refresh) and self.repo.auto_refresh_strategy == 'representation'
+
+
+	def _representation_headers(self, headers):
+
+		'''
+		Returns copy of headers with Prefer and Accept headers requesting representation in response
+
+		Args:
+			headers (dict): headers for create/update request
+
+		Returns:
+			(dict)
+		'''
+
+		headers = dict(headers)
+		headers['Prefer'] = 'return=representation'
+		headers['Accept'] = self.repo.default_serialization
+		return headers
+
+
+	def _handle_auto_refresh(self, response, auto_refresh, refresh_binary=True, previous_uri=None):
+
+		'''
+		Determines if, and how, resource is refreshed after create or update, based on repo.auto_refresh_strategy
+
+		Args:
+			response (requests.models.Response): response from create or update request
+			auto_refresh (bool): If True, refreshes resource. If left None, defaults to repo.default_auto_refresh
+			refresh_binary (bool): passed to self.refresh() for 'get' strategy
+			previous_uri (rdflib.term.URIRef): uri of resource before create, used to rewrite subjects of local graph
+
+		Returns:
+			None
+		'''
+
+		# if auto_refresh is not set (None), check repository instance default
+		if auto_refresh == None:
+			auto_refresh = self.repo.default_auto_refresh
+		if not auto_refresh:
+			return
+
+		# follow-up GET request
+		if self.repo.auto_refresh_strategy == 'get':
+			self.refresh(refresh_binary=refresh_binary)
+
+		# representation from response, or local
+		else:
+			self._refresh_from_response(response, previous_uri=previous_uri)
+
+
+	def _refresh_from_response(self, response, previous_uri=None):
+
+		'''
+		Refreshes resource without issuing requests to the repository.
+
+		If the response contains an RDF representation of the resource (Prefer: return=representation),
+		parse as if retrieved with GET.  Otherwise, build state locally from self.rdf.graph, which was
+		just sent to the repository.  In both cases, headers of the response, including ETag, Last-Modified,
+		and Location, are stored in self.response_headers, as the 'get' strategy stores those of its GET, and
+		self.headers, the request headers of the resource, are left unchanged.
+
+		Note: server managed triples (e.g. fedora:created, ldp:contains) are not present in locally built state.
+
+		Args:
+			response (requests.models.Response): response from create or update request
+			previous_uri (rdflib.term.URIRef): uri of resource before create
+
+		Returns:
+			None
+		'''
+
+		# store response headers, keeping request headers of resource
+		self.response_headers = requests.structures.CaseInsensitiveDict(response.headers)
+
+		# parse representation if returned
+		content_type = response.headers.get('Content-Type', '').split(';')[0]
+		if not isinstance(self, NonRDFSource) and response.content and content_type in RDF_SERIALIZATIONS:
+			logger.debug('refreshing %s from representation in response' % self.uri)
+			self.status_code = 200
+			self.rdf.data = response.content
+			self.exists = True
+			self._parse_graph(headers=response.headers)
+			if self.repo.triple_index:
+				self.repo.triple_index.index_graph(self.uri, self.rdf.graph)
+
+		# else, build locally
+		else:
+			logger.debug('refreshing %s from local graph and response headers' % self.uri)
+
+			# rewrite subjects if uri changed during create (e.g. repository minted uri)
+			if previous_uri and previous_uri != self.uri:
+				for s,p,o in list(self.rdf.graph.triples((previous_uri, None, None))):
+					self.rdf.graph.remove((s,p,o))
+					self.rdf.graph.add((self.uri,p,o))
+
+			self.status_code = 200
+			self.exists = True
+
+			# binary data sent, retrieve from repository on next access
+			if isinstance(self, NonRDFSource):
+				self.binary.data = None
+
+			# local graph is now the state of the resource
+			self.rdf._orig_graph = copy.deepcopy(self.rdf.graph)
+			self.parse_object_like_triples()
+
+			# local graph lacks server managed triples, remove from triple index
+			if self.repo.triple_index:
+				self.repo.triple_index.remove(self.uri, subtree=False)
+
+		# empty versions
+		self.versions = SimpleNamespace()
+
+		# fire resource._post_refresh hook if exists
+		if hasattr(self,'_post_refresh'):
+			self._post_refresh()
+
+
 	def children(self, as_resources=False):
 
 		'''
@@ -1488,10 +3281,19 @@ class Resource(object):
 
 		siblings = set()
 
+		# answer from triple index if parents fresh
+		index = self.repo.triple_index
+		if not as_resources and index and all([ index.is_fresh(parent) for parent in self.parents() ]):
+			logger.debug('retrieving siblings from triple index')
+			for parent in self.parents():
+				siblings.update(index.objects(parent, self.rdf.prefixes.ldp.contains))
+			siblings.add(self.uri)
+
 		# loop through parents and get children
-		for parent in self.parents(as_resources=True):
-			for sibling in parent.children(as_resources=as_resources):
-				siblings.add(sibling)
+		else:
+			for parent in self.parents(as_resources=True):
+				for sibling in parent.children(as_resources=as_resources):
+					siblings.add(sibling)
 
 		# remove self
 		if as_resources:
@@ -1502,16 +3304,14 @@ class Resource(object):
 		return list(siblings)
 
 
-	def _affix_version(self, version_uri, version_label):
-
-		# retrieve version
-		version_resource = self.repo.get_resource(version_uri)
+	def _affix_version(self, version_uri, version_label, created=None):
 
-		# instantiate ResourceVersion
-		rv = ResourceVersion(self, version_resource, version_uri, version_label)
+		# instantiate ResourceVersion, version is retrieved on first access of rv.resource
+		rv = ResourceVersion(self, None, version_uri, version_label, created=created)
 
 		# append to self.versions
 		setattr(self.versions, version_label, rv)
+		return rv
 
 
 	def create_version(self, version_label):
@@ -1537,16 +3337,19 @@ class Resource(object):
 			logger.debug('version created: %s' % version_response.headers['Location'])
 
 			# affix version
-			self._affix_version(version_response.headers['Location'], version_label)
+			return self._affix_version(version_response.headers['Location'], version_label)
 
 
-	def get_versions(self):
+	def get_versions(self, fetch=False, concurrency=4):
 
 		'''
-		retrieves all versions of an object, and stores them at self.versions
+		retrieves list of all versions of an object from fcr:versions, and stores them at self.versions
+
+		Versions are not retrieved here, but on first access of version.resource, unless fetch is True.
 
 		Args:
-			None
+			fetch (bool): if True, retrieve all versions concurrently, with self.fetch_versions()
+			concurrency (int): number of versions retrieved concurrently, if fetch is True
 
 		Returns:
 			None: appends instances
@@ -1561,11 +3364,35 @@ class Resource(object):
 		# loop through fedora.hasVersion
 		for version_uri in versions_graph.objects(self.uri, self.rdf.prefixes.fedora.hasVersion):
 
-			# get label
+			# get label and created date
 			version_label = versions_graph.value(version_uri, self.rdf.prefixes.fedora.hasVersionLabel, None).toPython()
+			created = versions_graph.value(version_uri, self.rdf.prefixes.fedora.created, None)
+			if created != None:
+				created = created.toPython()
 
 			# affix version
-			self._affix_version(version_uri, version_label)
+			self._affix_version(version_uri, version_label, created=created)
+
+		# optionally, retrieve all versions
+		if fetch:
+			self.fetch_versions(concurrency=concurrency)
+
+
+	def fetch_versions(self, concurrency=4):
+
+		'''
+		retrieves all versions at self.versions not yet retrieved, concurrently
+
+		Args:
+			concurrency (int): number of versions retrieved concurrently
+
+		Returns:
+			None: sets version.resource for each version
+		'''
+
+		versions = [ version for version in self.versions.__dict__.values() if not version.fetched ]
+		with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+			list(executor.map(lambda version: version.resource, versions))
 
 
 	def dump(self,format='ttl'):
@@ -1592,95 +3419,375 @@ class ResourceVersion(Resource):
 	Versions are spawned by the Resource class method resource.create_version(), or retrieved by resource.get_versions().
 	Versions are stored in the resource instance at resource.versions
 
-	Args:
-		version_resource (Resource): retrieved and prased resource version
-		version_uri (rdflib.term.URIRef, str): uri of version
-		version_label (str): lable for version
-	'''
+	The version itself is retrieved on first access of self.resource, so that versions can be listed without
+	a request for each.
+
+	Args:
+		current_resource (Resource): resource of which this is a version
+		version_resource (Resource): retrieved and prased resource version, or None to retrieve lazily
+		version_uri (rdflib.term.URIRef, str): uri of version
+		version_label (str): lable for version
+		created (datetime.datetime): optional, date version was created, from fcr:versions
+	'''
+
+	def __init__(self, current_resource, version_resource, version_uri, version_label, created=None):
+
+		self._current_resource = current_resource
+		self._resource = version_resource
+		self.uri = version_uri
+		self.label = version_label
+		self.created = created
+
+
+	@property
+	def fetched(self):
+
+		'''
+		True if version has been retrieved
+		'''
+
+		return self._resource != None
+
+
+	@property
+	def resource(self):
+
+		'''
+		Version of resource, retrieved on first access
+
+		Returns:
+			(Resource)
+		'''
+
+		if self._resource is None:
+			logger.debug('retrieving version %s, %s' % (self.label, self.uri))
+			self._resource = self._current_resource.repo.get_resource(self.uri)
+		return self._resource
+
+
+	def revert_to(self):
+
+		'''
+		method to revert resource to this version by issuing PATCH
+
+		Args:
+			None
+
+		Returns:
+			None: sends PATCH request, and refreshes parent resource
+		'''
+
+		# send patch
+		response = self._current_resource.repo.api.http_request('PATCH', self.uri)
+
+		# if response 204
+		if response.status_code == 204:
+			logger.debug('reverting to previous version of resource, %s' % self.uri)
+
+			# refresh current resource handle
+			self._current_resource.refresh()
+
+		else:
+			raise Exception('HTTP %s, could not revert to resource version, %s' % (response.status_code, self.uri))
+
+
+	def delete(self):
+
+		'''
+		method to remove version from resource's history
+		'''
+
+		# send patch
+		response = self._current_resource.repo.api.http_request('DELETE', self.uri)
+
+		# if response 204
+		if response.status_code == 204:
+			logger.debug('deleting previous version of resource, %s' % self.uri)
+
+			# remove from resource versions
+			delattr(self._current_resource.versions, self.label)
+
+		# if 400, likely most recent version and cannot remove
+		elif response.status_code == 400:
+			raise Exception('HTTP 400, likely most recent resource version which cannot be removed')
+
+		else:
+			raise Exception('HTTP %s, could not delete resource version: %s' % (response.status_code, self.uri))
+
+
+
+# Resource Reference
+class ResourceRef(object):
+
+	'''
+	Lightweight handle for a resource, with URI and rdf:type values but without parsed graph.
+	Yielded by Repository.walk() with uris_only.
+
+	Args:
+		repo (Repository): instance of Repository class
+		uri (rdflib.term.URIRef): URI of resource
+		types (list): rdf:type values of resource
+		depth (int): depth below root of walk
+		parent (rdflib.term.URIRef): URI of resource that contains this resource
+	'''
+
+	def __init__(self, repo, uri, types=None, depth=None, parent=None):
+
+		self.repo = repo
+		self.uri = uri
+		self.types = types or []
+		self.depth = depth
+		self.parent = parent
+		self.data = None
+
+
+	def __repr__(self):
+		return '<ResourceRef, uri: %s>' % self.uri
+
+
+	def get_resource(self):
+
+		'''
+		Retrieves full resource from repository
+
+		Returns:
+			(Resource)
+		'''
+
+		return self.repo.get_resource(self.uri)
+
+
+
+# Binary Data
+class BinaryData(object):
+
+	'''
+	Class to handle binary data for NonRDFSource (Binary) resources
+	Builds out self.binary, and provides some method for setting/accessing binary data
+
+	Args:
+		resource (NonRDFSource): instance of NonRDFSource resource
+
+	Attributes:
+		chunk_size (int): size in bytes of chunks read from file-like objects for streaming uploads
+		digest_algorithms (list): hashlib algorithms used to compute digests of uploaded content, sent as Digest header
+	'''
+
+	chunk_size = 1048576
+	digest_algorithms = ['sha1']
+
+	def __init__(self, resource, binary_data, binary_mimetype):
+
+		# scaffold
+		self.resource = resource
+		self.delivery = None
+		self.payload = None
+		self.digests = {}
+		self._data = binary_data
+		self._fetched = False
+		self.stream = False
+		self.mimetype = binary_mimetype
+		self.location = None
+		self.size = None
+		self.message_digest = None
+		self.fixity_result = None
+		self._verify_after_upload = False
+
+		# if resource exists, parse binary metadata, content is retrieved lazily
+		if self.resource.exists:
+			self.parse_binary()
+
+
+	def __getstate__(self):
+
+		'''
+		Retrieved content, prepared payloads, and open files are not pickled, binary content is retrieved
+		again lazily when unpickled.  Local data set as bytes, string, or URL is retained.
+		'''
+
+		state = self.__dict__.copy()
+		if not isinstance(self._data, (bytes, str)):
+			state['_data'] = None
+		state['_fetched'] = False
+		state['payload'] = None
+		state['delivery'] = None
+		return state
+
+
+	@property
+	def data(self):
+
+		'''
+		Binary data for resource.  If the resource exists and no local data has been set,
+		binary content is retrieved on first access as streamable requests response, or CachedBinaryResponse
+		if served from repo.binary_cache.
+
+		Returns:
+			(requests.models.Response, CachedBinaryResponse, str, bytes, file-like object)
+		'''
+
+		if self._data is None and not self._fetched and self.resource and self.resource.exists:
+			self._fetch()
+		return self._data
+
+
+	@data.setter
+	def data(self, binary_data):
+
+		# release connection of previously retrieved content
+		self.close()
+		self._data = binary_data
+		self._fetched = False
+
+
+	def _fetch(self):
+
+		'''
+		Retrieves binary content as streamable response, or as CachedBinaryResponse from repo.binary_cache if configured
+
+		Args:
+			None
+
+		Returns:
+			None: sets self._data
+		'''
+
+		# serve from binary cache if configured
+		binary_cache = self.resource.repo.binary_cache
+		algorithm, digest = self._parse_message_digest()
+		if binary_cache and algorithm:
+
+			# cache miss, stream into cache, unless larger than cache
+			if not binary_cache.get(algorithm, digest):
+				if self.size and int(self.size) > binary_cache.max_size:
+					logger.debug('binary content for %s larger than binary cache, not caching' % self.resource.uri)
+				else:
+					logger.debug('binary cache miss for %s, retrieving binary content for %s' % (digest, self.resource.uri))
+					response = self._get_content()
+					try:
+						binary_cache.put(algorithm, digest, response.iter_content(self.chunk_size))
+					except Exception as e:
+						logger.debug('could not cache binary content for %s: %s' % (self.resource.uri, e))
+					finally:
+						response.close()
+
+			# serve local file, as response
+			cached = binary_cache.open(algorithm, digest)
+			if cached:
+				logger.debug('binary cache hit for %s, serving %s' % (self.resource.uri, digest))
+				headers = {'Content-Type':self.mimetype}
+				if self.size:
+					headers['Content-Length'] = str(self.size)
+				self._data = CachedBinaryResponse(self.resource.uri, cached, headers)
+				self._fetched = True
+				return
+
+		logger.debug('retrieving binary content for %s' % self.resource.uri)
+		self._data = self._get_content()
+		self._fetched = True
+
+
+	def _get_content(self):
+
+		'''
+		Issues GET request for binary content
+
+		Returns:
+			(requests.models.Response): streamable response
+		'''
+
+		return self.resource.repo.api.http_request(
+			'GET',
+			self.resource.uri,
+			data=None,
+			headers={'Content-Type':self.resource.mimetype},
+			is_rdf=False,
+			stream=True)
+
+
+	def _cached_path(self):
+
+		'''
+		Small method to return path of binary content in repo.binary_cache, if configured and cached
 
-	def __init__(self, current_resource, version_resource, version_uri, version_label):
+		Returns:
+			(str): path of cached binary content, or None
+		'''
 
-		self._current_resource = current_resource
-		self.resource = version_resource
-		self.uri = version_uri
-		self.label = version_label
+		algorithm, digest = self._parse_message_digest()
+		if self.resource.repo.binary_cache and algorithm:
+			return self.resource.repo.binary_cache.get(algorithm, digest)
 
 
-	def revert_to(self):
+	def _has_local_data(self):
 
 		'''
-		method to revert resource to this version by issuing PATCH
-
-		Args:
-			None
+		Small method to determine if binary data has been set locally, and not retrieved from repository
 
 		Returns:
-			None: sends PATCH request, and refreshes parent resource
+			(bool)
 		'''
 
-		# send patch
-		response = self.resource.repo.api.http_request('PATCH', self.uri)
+		return self._data is not None and not self._fetched
 
-		# if response 204
-		if response.status_code == 204:
-			logger.debug('reverting to previous version of resource, %s' % self.uri)
 
-			# refresh current resource handle
-			self._current_resource.refresh()
+	def open(self, block_size=1048576, cache_size=32, read_ahead=0):
 
-		else:
-			raise Exception('HTTP %s, could not revert to resource version, %s' % (response.status_code, self.uri))
+		'''
+		Returns file-like object for reading binary data.
 
+		For binary data in the repository, returns a read-only, seekable BinaryReader that retrieves
+		only the blocks that are read with HTTP Range requests.  For binary data set locally, returns a
+		file-like object over that data.
 
-	def delete(self):
+		Args:
+			block_size (int): size in bytes of blocks retrieved by BinaryReader
+			cache_size (int): number of blocks kept in BinaryReader's LRU cache
+			read_ahead (int): number of additional blocks BinaryReader retrieves with each request
 
+		Returns:
+			(BinaryReader, file-like object): readable, seekable stream of binary data
 		'''
-		method to remove version from resource's history
-		'''
-
-		# send patch
-		response = self.resource.repo.api.http_request('DELETE', self.uri)
 
-		# if response 204
-		if response.status_code == 204:
-			logger.debug('deleting previous version of resource, %s' % self.uri)
+		# local data
+		if self._has_local_data():
+			if isinstance(self._data, str):
+				return io.BytesIO(self._data.encode('utf-8'))
+			elif isinstance(self._data, bytes):
+				return io.BytesIO(self._data)
+			elif hasattr(self._data, 'read'):
+				return self._data
+			else:
+				raise Exception('binary data of type %s cannot be opened as file-like object' % type(self._data))
 
-			# remove from resource versions
-			delattr(self._current_resource.versions, self.label)
+		# binary data in binary cache
+		elif self.resource and self.resource.exists and self._cached_path():
+			return open(self._cached_path(), 'rb')
 
-		# if 400, likely most recent version and cannot remove
-		elif response.status_code == 400:
-			raise Exception('HTTP 400, likely most recent resource version which cannot be removed')
+		# binary data in repository
+		elif self.resource and self.resource.exists:
+			return BinaryReader(self, block_size=block_size, cache_size=cache_size, read_ahead=read_ahead)
 
 		else:
-			raise Exception('HTTP %s, could not delete resource version: %s' % (response.status_code, self.uri))
-
+			raise Exception('no binary data to open')
 
 
-# Binary Data
-class BinaryData(object):
-
-	'''
-	Class to handle binary data for NonRDFSource (Binary) resources
-	Builds out self.binary, and provides some method for setting/accessing binary data
+	def close(self):
 
-	Args:
-		resource (NonRDFSource): instance of NonRDFSource resource
-	'''
+		'''
+		Closes retrieved binary content, releasing connection, and resets so content is retrieved again on next access
 
-	def __init__(self, resource, binary_data, binary_mimetype):
+		Args:
+			None
 
-		# scaffold
-		self.resource = resource
-		self.delivery = None
-		self.data = binary_data
-		self.stream = False
-		self.mimetype = binary_mimetype
-		self.location = None
+		Returns:
+			None
+		'''
 
-		# if resource exists, issue GET and prep for use
-		if self.resource.exists:
-			self.parse_binary()
+		if self._fetched and self._data is not None:
+			self._data.close()
+			self._data = None
+			self._fetched = False
 
 
 	def empty(self):
@@ -1690,12 +3797,19 @@ class BinaryData(object):
 		object is deleted but remains as variable
 		'''
 
+		self.close()
 		self.resource = None
 		self.delivery = None
-		self.data = None
+		self.payload = None
+		self.digests = {}
+		self._data = None
+		self._fetched = False
 		self.stream = False
 		self.mimetype = None
 		self.location = None
+		self.size = None
+		self.message_digest = None
+		self.fixity_result = None
 
 
 	def refresh(self, updated_self):
@@ -1703,6 +3817,8 @@ class BinaryData(object):
 		'''
 		method to refresh binary attributes and data
 
+		Note: binary content is not retrieved here, but on next access of self.data
+
 		Args:
 			updated_self (Resource): resource this binary data attaches to
 
@@ -1712,29 +3828,54 @@ class BinaryData(object):
 
 		logger.debug('refreshing binary attributes')
 		self.mimetype = updated_self.binary.mimetype
-		self.data = updated_self.binary.data
+		self.size = updated_self.binary.size
+		self.message_digest = updated_self.binary.message_digest
+		self.data = None
 
 
 	def parse_binary(self):
 
 		'''
-		when retrieving a NonRDF resource, parse binary data and make available
-		via generators
+		when retrieving a NonRDF resource, parse binary metadata from resource graph
+
+		Note: binary content is retrieved lazily, on first access of self.data or self.open()
 		'''
 
 		# derive mimetype
-		self.mimetype = self.resource.rdf.graph.value(
+		mimetype = self.resource.rdf.graph.value(
 			self.resource.uri,
-			self.resource.rdf.prefixes.ebucore.hasMimeType).toPython()
+			self.resource.rdf.prefixes.ebucore.hasMimeType)
+		if mimetype:
+			self.mimetype = mimetype.toPython()
 
-		# get binary content as stremable response
-		self.data = self.resource.repo.api.http_request(
-			'GET',
+		# derive size
+		size = self.resource.rdf.graph.value(
 			self.resource.uri,
-			data=None,
-			headers={'Content-Type':self.resource.mimetype},
-			is_rdf=False,
-			stream=True)
+			self.resource.rdf.prefixes.premis.hasSize)
+		if size:
+			self.size = int(size.toPython())
+
+		# derive digest stored by repository, e.g. urn:sha1:<hex>
+		message_digest = self.resource.rdf.graph.value(
+			self.resource.uri,
+			self.resource.rdf.prefixes.premis.hasMessageDigest)
+		if message_digest:
+			self.message_digest = message_digest.toPython()
+
+
+	def _parse_message_digest(self):
+
+		'''
+		Small method to parse algorithm and hex digest from self.message_digest, e.g. urn:sha1:<hex>
+
+		Returns:
+			(tuple): (algorithm, hex digest), or (None, None) if no digest
+		'''
+
+		if not self.message_digest:
+			return (None, None)
+		algorithm, digest = self.message_digest.split(':')[-2:]
+		return (algorithm.replace('-','').lower(), digest.lower())
 
 
 	def _prep_binary(self):
@@ -1796,7 +3937,7 @@ class BinaryData(object):
 		'''
 
 		# nothing present
-		if not self.data and not self.location and 'Content-Location' not in self.resource.headers.keys():
+		if not self._data and not self.location and 'Content-Location' not in self.resource.headers.keys():
 			raise Exception('creating/updating NonRDFSource requires content from self.binary.data, self.binary.location, or the Content-Location header')
 
 		elif 'Content-Location' in self.resource.headers.keys():
@@ -1812,18 +3953,173 @@ class BinaryData(object):
 				self.resource.headers['Content-Location'] = self.location
 				self.delivery = 'header'
 
-			# data attribute is plain text, binary, or file-like object
-			elif self.data:
+			# data attribute is plain text, binary, file-like object, or iterable
+			elif self._data:
+				self.delivery = 'payload'
+				self._prep_binary_payload()
 
-				# if file-like object, set flag for api.http_request
-				if isinstance(self.data, io.BufferedIOBase):
-					logger.debug('detected file-like object')
-					self.delivery = 'payload'
 
-				# else, just bytes
-				else:
-					logger.debug('detected bytes')
-					self.delivery = 'payload'
+	def _prep_binary_payload(self):
+
+		'''
+		Prepares self.payload from self.data for upload, computing digests of content with self.digest_algorithms.
+
+			- str or bytes: sent as-is, with Digest header
+			- seekable file-like object: hashed in chunks, rewound, then streamed with chunked transfer encoding, with Digest header
+			- non-seekable file-like object or iterable: hashed while streaming with chunked transfer encoding,
+				digests available at self.digests after upload, but cannot be sent as Digest header, so are compared
+				with premis:hasMessageDigest after upload instead, see _verify_upload()
+
+		Memory use for file-like objects and iterables is bounded by self.chunk_size.
+
+		Args:
+			None
+
+		Returns:
+			None: sets self.payload, self.digests, and Digest header
+		'''
+
+		# remove Digest header from previous create/update
+		self.resource.headers.pop('Digest', None)
+		self.digests = {}
+		self._verify_after_upload = False
+
+		# str or bytes
+		if isinstance(self._data, (str, bytes)):
+			logger.debug('detected bytes')
+			self.payload = self._data.encode('utf-8') if isinstance(self._data, str) else self._data
+			hashers = self._init_hashers()
+			for hasher in hashers.values():
+				hasher.update(self.payload)
+			self._set_digests(hashers)
+
+		# seekable file-like object, hash ahead of upload
+		elif hasattr(self._data, 'read') and hasattr(self._data, 'seekable') and self._data.seekable():
+			logger.debug('detected seekable file-like object')
+			position = self._data.tell()
+			hashers = self._init_hashers()
+			for chunk in self._read_chunks(self._data):
+				for hasher in hashers.values():
+					hasher.update(chunk)
+			self._set_digests(hashers)
+			self._data.seek(position)
+			self.payload = self._stream_chunks(self._read_chunks(self._data))
+
+		# non-seekable file-like object
+		elif hasattr(self._data, 'read'):
+			logger.debug('detected non-seekable file-like object, digest computed while streaming')
+			self.payload = self._stream_chunks(self._read_chunks(self._data), hashers=self._init_hashers())
+			self._verify_after_upload = True
+
+		# generator, iterator, or other iterable of chunks
+		elif hasattr(self._data, '__iter__'):
+			logger.debug('detected iterable, digest computed while streaming')
+			self.payload = self._stream_chunks(self._data, hashers=self._init_hashers())
+			self._verify_after_upload = True
+
+		else:
+			raise TypeError('binary data must be str, bytes, file-like object, or iterable of bytes')
+
+
+	def _verify_upload(self):
+
+		'''
+		Verifies binary data streamed without Digest header, from non-seekable file-like objects or iterables, by
+		comparing digests computed while streaming with premis:hasMessageDigest stored by the repository.
+
+		Args:
+			None
+
+		Returns:
+			None: sets self.message_digest, raises Exception on mismatch
+		'''
+
+		if not self._verify_after_upload:
+			return
+		self._verify_after_upload = False
+
+		# retrieve digest stored by repository
+		response = self.resource.repo.api.http_request(
+			'GET',
+			'%s/fcr:metadata' % self.resource.uri,
+			response_format='application/n-triples')
+		if response.status_code != 200:
+			raise Exception('HTTP %s, could not retrieve premis:hasMessageDigest to verify upload of %s' % (response.status_code, self.resource.uri))
+		graph = self.resource.repo.api.parse_rdf_payload(response.content, response.headers)
+		message_digest = graph.value(self.resource.uri, self.resource.rdf.prefixes.premis.hasMessageDigest)
+		if message_digest == None:
+			raise Exception('premis:hasMessageDigest not found for %s, cannot verify upload' % self.resource.uri)
+		self.message_digest = message_digest.toPython()
+
+		# compare
+		algorithm, digest = self._parse_message_digest()
+		if algorithm not in self.digests:
+			logger.debug('digest algorithm %s of %s not in digest_algorithms, cannot verify upload' % (algorithm, self.resource.uri))
+		elif self.digests[algorithm] != digest:
+			raise Exception('checksum mismatch for binary data of %s, streamed %s %s, repository stored %s' % (
+				self.resource.uri, algorithm, self.digests[algorithm], digest))
+		else:
+			logger.debug('verified streamed upload of %s, %s %s' % (self.resource.uri, algorithm, digest))
+
+
+	def _init_hashers(self):
+
+		'''
+		Returns dictionary of hashlib instances for self.digest_algorithms
+		'''
+
+		return { algorithm:hashlib.new(algorithm) for algorithm in self.digest_algorithms }
+
+
+	def _set_digests(self, hashers):
+
+		'''
+		Sets self.digests from hashers, and Digest header if any were computed
+		'''
+
+		self.digests = { algorithm:hasher.hexdigest() for algorithm, hasher in hashers.items() }
+		if self.digests:
+			self.resource.headers['Digest'] = ', '.join([ '%s=%s' % (algorithm, digest) for algorithm, digest in self.digests.items() ])
+
+
+	def _read_chunks(self, file_obj, chunk_size=None):
+
+		'''
+		Generator to read file-like object in chunks of chunk_size, defaulting to self.chunk_size
+		'''
+
+		while True:
+			chunk = file_obj.read(chunk_size or self.chunk_size)
+			if not chunk:
+				break
+			yield chunk
+
+
+	def _stream_chunks(self, chunks, hashers=None):
+
+		'''
+		Generator that yields chunks as bytes for upload, optionally updating hashers while streaming.
+		When exhausted, sets self.digests.
+
+		Args:
+			chunks (iterable): chunks of str or bytes
+			hashers (dict): hashlib instances to update with each chunk
+
+		Returns:
+			(generator)
+		'''
+
+		for chunk in chunks:
+			if isinstance(chunk, str):
+				chunk = chunk.encode('utf-8')
+			if hashers:
+				for hasher in hashers.values():
+					hasher.update(chunk)
+			yield chunk
+
+		# set digests, too late for Digest header
+		if hashers:
+			self.digests = { algorithm:hasher.hexdigest() for algorithm, hasher in hashers.items() }
 
 
 	def range(self, byte_start, byte_end, stream=True):
@@ -1859,6 +4155,400 @@ class BinaryData(object):
 			raise Exception('HTTP %s, but was expecting 206' % response.status_code)
 
 
+	def iter_content(self, chunk_size=None, verify=True):
+
+		'''
+		Generator to read binary data from repository in chunks, hashing content while streaming.
+
+		When the content is exhausted, and verify is True, the digest is compared with premis:hasMessageDigest
+		and the result stored at self.fixity_result, in the same shape as NonRDFSource.fixity()
+
+		Args:
+			chunk_size (int): size in bytes of chunks, defaults to self.chunk_size
+			verify (bool): if True, compute digest and set self.fixity_result
+
+		Returns:
+			(generator): chunks of bytes
+		'''
+
+		if self._has_local_data():
+			raise Exception('binary data was set locally, nothing to retrieve from repository')
+
+		if not chunk_size:
+			chunk_size = self.chunk_size
+
+		# prepare hasher from repository digest
+		algorithm, expected_digest = self._parse_message_digest()
+		hasher = hashlib.new(algorithm) if verify and algorithm else None
+		size = 0
+
+		# stream content, response or file from binary cache
+		data = self.data
+		if data is None:
+			raise Exception('HTTP %s, no binary content to retrieve for %s' % (self.resource.status_code, self.resource.uri))
+		if hasattr(data, 'status_code') and data.status_code != 200:
+			self.close()
+			raise Exception('HTTP %s, could not retrieve binary content for %s' % (data.status_code, self.resource.uri))
+		chunks = data.iter_content(chunk_size) if hasattr(data, 'iter_content') else self._read_chunks(data, chunk_size)
+		try:
+			for chunk in chunks:
+				if hasher:
+					hasher.update(chunk)
+				size += len(chunk)
+				yield chunk
+		finally:
+			self.close()
+
+		# verdict
+		if hasher:
+			self.fixity_result = self._client_fixity(algorithm, hasher.hexdigest(), size)
+			logger.debug('client side fixity for %s: %s' % (self.resource.uri, self.fixity_result['verdict']))
+
+
+	def _client_fixity(self, algorithm, digest, size):
+
+		'''
+		Compares digest and size computed by client with premis:hasMessageDigest and premis:hasSize,
+		and returns result in the same shape as NonRDFSource.fixity(), including PREMIS graph modeled
+		after the one returned by the repository's fcr:fixity endpoint
+
+		Args:
+			algorithm (str): hashlib algorithm, e.g. 'sha1'
+			digest (str): hex digest computed by client
+			size (int): number of bytes hashed by client
+
+		Returns:
+			(dict): ('verdict':(bool): verdict of fixity check, 'premis_graph':(rdflib.Graph): PREMIS graph of check)
+		'''
+
+		expected_algorithm, expected_digest = self._parse_message_digest()
+
+		# determine outcome
+		if self.size != None and size != self.size:
+			outcome = 'BAD_SIZE'
+		elif algorithm != expected_algorithm or digest != expected_digest:
+			outcome = 'BAD_CHECKSUM'
+		else:
+			outcome = 'SUCCESS'
+
+		# build PREMIS graph
+		premis = self.resource.rdf.prefixes.premis
+		fixity_graph = rdflib.Graph()
+		fixity_graph.bind('premis', premis)
+		fixity_uri = rdflib.term.URIRef('%s#fixity/%s' % (self.resource.uri, int(time.time() * 1000)))
+		fixity_graph.add((self.resource.uri, premis.hasFixity, fixity_uri))
+		fixity_graph.add((fixity_uri, self.resource.rdf.prefixes.rdf.type, premis.Fixity))
+		fixity_graph.add((fixity_uri, self.resource.rdf.prefixes.rdf.type, premis.EventOutcomeDetail))
+		fixity_graph.add((fixity_uri, premis.hasEventOutcome, rdflib.term.Literal(outcome)))
+		fixity_graph.add((fixity_uri, premis.hasMessageDigest, rdflib.term.URIRef('urn:%s:%s' % (algorithm, digest))))
+		fixity_graph.add((fixity_uri, premis.hasSize, rdflib.term.Literal(size)))
+
+		return {
+			'verdict':outcome == 'SUCCESS',
+			'premis_graph':fixity_graph
+		}
+
+
+	def download(self, path, workers=4, range_size=8388608, retries=3, resume=True, verify=True):
+
+		'''
+		method to download binary data to disk, fetching byte ranges concurrently.
+
+		The file at path is preallocated to the size of the binary, from premis:hasSize, and each range is written
+		at its offset as it arrives.  Completed ranges are recorded in a sidecar file, [path].parts, so that a failed
+		or interrupted download can be resumed, fetching only missing ranges.  The sidecar is removed on success.
+
+		If verify is True, and the digest of the downloaded file does not match premis:hasMessageDigest, an Exception
+		is raised and the sidecar is kept, with no ranges recorded as completed, so that the file is not mistaken for
+		a complete download, and downloading again fetches all ranges.
+
+		Args:
+			path (str): local file path to write binary data
+			workers (int): number of ranges to fetch concurrently
+			range_size (int): size in bytes of each range
+			retries (int): number of attempts for each range before failing
+			resume (bool): if True, and sidecar file from previous download exists, skip completed ranges
+			verify (bool): if True, verify digest of downloaded file against premis:hasMessageDigest, raising Exception on mismatch
+
+		Returns:
+			(dict): ('size':(int), 'ranges':(int), 'fetched':(int), 'verdict':(bool, None): result of digest verification, None if not verified)
+		'''
+
+		# copy from binary cache if cached, content verified when cached
+		cached_path = self._cached_path()
+		if cached_path:
+			logger.debug('binary cache hit for %s, copying to %s' % (self.resource.uri, path))
+			shutil.copyfile(cached_path, path)
+			return {
+				'size':os.path.getsize(path),
+				'ranges':0,
+				'fetched':0,
+				'verdict':True
+			}
+
+		# determine size, falling back to Content-Length of HEAD request
+		size = self.size
+		if size == None:
+			head_response = self.resource.repo.api.http_request('HEAD', self.resource.uri, is_rdf=False)
+			size = int(head_response.headers['Content-Length'])
+
+		# compute ranges
+		ranges = [ (start, min(start + range_size, size) - 1) for start in range(0, size, range_size) ]
+
+		# load progress from previous download
+		parts_path = '%s.parts' % path
+		progress = {'size':size, 'range_size':range_size, 'message_digest':self.message_digest, 'completed':[]}
+		if resume and os.path.exists(parts_path) and os.path.exists(path):
+			with open(parts_path) as f:
+				previous = json.load(f)
+			if all([ previous.get(k) == progress[k] for k in ['size', 'range_size', 'message_digest'] ]):
+				logger.debug('resuming download of %s, %s of %s ranges completed' % (self.resource.uri, len(previous['completed']), len(ranges)))
+				progress['completed'] = previous['completed']
+
+		# preallocate file
+		with open(path, 'r+b' if progress['completed'] else 'wb') as f:
+			f.truncate(size)
+
+		# fetch missing ranges concurrently
+		pending = [ index for index in range(0, len(ranges)) if index not in set(progress['completed']) ]
+		progress_lock = threading.Lock()
+
+		def fetch_range(index):
+			byte_start, byte_end = ranges[index]
+			for attempt in range(1, retries + 1):
+				try:
+					response = self.range(byte_start, byte_end)
+					with open(path, 'r+b') as f:
+						f.seek(byte_start)
+						written = 0
+						for chunk in response.iter_content(self.chunk_size):
+							f.write(chunk)
+							written += len(chunk)
+					response.close()
+					if written != byte_end - byte_start + 1:
+						raise Exception('expected %s bytes for range %s-%s, received %s' % (byte_end - byte_start + 1, byte_start, byte_end, written))
+					break
+				except Exception as e:
+					logger.debug('attempt %s for range %s-%s of %s failed: %s' % (attempt, byte_start, byte_end, self.resource.uri, e))
+					if attempt == retries:
+						raise
+
+			# record progress
+			with progress_lock:
+				progress['completed'].append(index)
+				tmp_path = '%s.tmp' % parts_path
+				with open(tmp_path, 'w') as f:
+					json.dump(progress, f)
+				os.replace(tmp_path, parts_path)
+
+		failed = []
+		with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+			futures = { executor.submit(fetch_range, index):index for index in pending }
+			for future in concurrent.futures.as_completed(futures):
+				if future.exception():
+					failed.append(ranges[futures[future]])
+		if failed:
+			raise Exception('could not download ranges %s for %s, progress saved to %s' % (failed, self.resource.uri, parts_path))
+
+		# verify digest
+		verdict = None
+		algorithm, expected_digest = self._parse_message_digest()
+		if verify and algorithm:
+			hasher = hashlib.new(algorithm)
+			with open(path, 'rb') as f:
+				for chunk in self._read_chunks(f):
+					hasher.update(chunk)
+			self.fixity_result = self._client_fixity(algorithm, hasher.hexdigest(), size)
+			verdict = self.fixity_result['verdict']
+
+			# keep sidecar, without completed ranges, and raise
+			if not verdict:
+				progress['completed'] = []
+				tmp_path = '%s.tmp' % parts_path
+				with open(tmp_path, 'w') as f:
+					json.dump(progress, f)
+				os.replace(tmp_path, parts_path)
+				raise Exception('checksum mismatch for download of %s to %s, computed %s %s, expected %s, progress reset in %s' % (
+					self.resource.uri, path, algorithm, hasher.hexdigest(), expected_digest, parts_path))
+
+		# remove sidecar
+		if os.path.exists(parts_path):
+			os.remove(parts_path)
+
+		return {
+			'size':size,
+			'ranges':len(ranges),
+			'fetched':len(pending),
+			'verdict':verdict
+		}
+
+
+
+# Binary Reader
+class BinaryReader(io.RawIOBase):
+
+	'''
+	Read-only, seekable file-like object over binary data in the repository, backed by HTTP Range requests
+	through BinaryData.range().  Retrieved blocks are kept in an LRU cache, so that libraries like zipfile or
+	PIL only transfer the bytes they read.
+
+	Spawned by BinaryData.open()
+
+	Args:
+		binary (BinaryData): instance of BinaryData for NonRDFSource in repository
+		block_size (int): size in bytes of blocks retrieved
+		cache_size (int): number of blocks kept in cache
+		read_ahead (int): number of additional, consecutive blocks retrieved with each request
+
+	Attributes:
+		size (int): size of binary data in bytes
+		requests (int): number of Range requests issued
+		bytes_fetched (int): number of bytes retrieved from repository
+	'''
+
+	def __init__(self, binary, block_size=1048576, cache_size=32, read_ahead=0):
+
+		self.binary = binary
+		self.block_size = block_size
+		self.cache_size = max(cache_size, read_ahead + 1)
+		self.read_ahead = read_ahead
+		self.position = 0
+		self.requests = 0
+		self.bytes_fetched = 0
+		self._cache = collections.OrderedDict()
+
+		# determine size, falling back to Content-Length of HEAD request
+		self.size = binary.size
+		if self.size == None:
+			head_response = binary.resource.repo.api.http_request('HEAD', binary.resource.uri, is_rdf=False)
+			self.size = int(head_response.headers['Content-Length'])
+
+
+	def __repr__(self):
+		return '<BinaryReader, uri: %s, position: %s>' % (self.binary.resource.uri, self.position)
+
+
+	def readable(self):
+		return True
+
+
+	def seekable(self):
+		return True
+
+
+	def tell(self):
+		return self.position
+
+
+	def seek(self, offset, whence=io.SEEK_SET):
+
+		'''
+		Change stream position
+
+		Args:
+			offset (int): offset relative to position indicated by whence
+			whence (int): io.SEEK_SET, io.SEEK_CUR, or io.SEEK_END
+
+		Returns:
+			(int): new position
+		'''
+
+		if whence == io.SEEK_SET:
+			position = offset
+		elif whence == io.SEEK_CUR:
+			position = self.position + offset
+		elif whence == io.SEEK_END:
+			position = self.size + offset
+		else:
+			raise ValueError('invalid whence value: %s' % whence)
+		if position < 0:
+			raise ValueError('negative seek position: %s' % position)
+		self.position = position
+		return self.position
+
+
+	def readinto(self, b):
+
+		'''
+		Read bytes into pre-allocated, writable bytes-like object, retrieving blocks as needed
+
+		Args:
+			b (bytearray, memoryview): buffer to read into
+
+		Returns:
+			(int): number of bytes read, 0 at end of binary
+		'''
+
+		view = memoryview(b).cast('B')
+		length = min(len(view), max(self.size - self.position, 0))
+		read = 0
+		while read < length:
+			block_index, block_offset = divmod(self.position, self.block_size)
+			block = self._get_block(block_index)
+			chunk = block[block_offset:block_offset + length - read]
+			# block shorter than expected, e.g. stale premis:hasSize, or short 206 response
+			if not chunk:
+				raise IOError('binary data for %s truncated, expected %s bytes, received %s' % (
+					self.binary.resource.uri, self.size, block_index * self.block_size + len(block)))
+			view[read:read + len(chunk)] = chunk
+			read += len(chunk)
+			self.position += len(chunk)
+		return read
+
+
+	def _get_block(self, block_index):
+
+		'''
+		Returns block from cache, or retrieves block and read ahead blocks with single Range request
+
+		Args:
+			block_index (int): index of block
+
+		Returns:
+			(bytes)
+		'''
+
+		# cache hit
+		if block_index in self._cache:
+			self._cache.move_to_end(block_index)
+			return self._cache[block_index]
+
+		# determine consecutive, uncached blocks to retrieve
+		last_block = (self.size - 1) // self.block_size
+		end_index = block_index
+		while end_index < min(block_index + self.read_ahead, last_block) and end_index + 1 not in self._cache:
+			end_index += 1
+
+		# retrieve range
+		byte_start = block_index * self.block_size
+		byte_end = min((end_index + 1) * self.block_size, self.size) - 1
+		response = self.binary.range(byte_start, byte_end, stream=False)
+		content = response.content
+		self.requests += 1
+		self.bytes_fetched += len(content)
+
+		# split into blocks and cache, evicting least recently used
+		for index in range(block_index, end_index + 1):
+			offset = (index - block_index) * self.block_size
+			self._cache[index] = content[offset:offset + self.block_size]
+			self._cache.move_to_end(index)
+		self._cache.move_to_end(block_index)
+		while len(self._cache) > self.cache_size:
+			self._cache.popitem(last=False)
+
+		return self._cache[block_index]
+
+
+	def close(self):
+
+		'''
+		Close reader and empty cache
+		'''
+
+		self._cache.clear()
+		super().close()
+
+
 
 # NonRDF Source
 class NonRDFSource(Resource):
@@ -1868,8 +4558,9 @@ class NonRDFSource(Resource):
 	An LDPR whose state is not represented in RDF. For example, these can be binary or text documents that do not have useful RDF representations.
 	https://www.w3.org/TR/ldp/
 
-	Note: When a pre-existing NonRDFSource is retrieved, the binary data is stored under self.binary.data as a
-	streamable requests object.
+	Note: When a pre-existing NonRDFSource is retrieved, the binary data is available under self.binary.data as a
+	streamable requests object.  Binary content is not retrieved until self.binary.data is first accessed.
+	self.binary.open() returns a seekable file-like object that retrieves only the byte ranges that are read.
 
 	Inherits:
 		Resource
@@ -1893,18 +4584,37 @@ class NonRDFSource(Resource):
 		self.binary = BinaryData(self, binary_data, binary_mimetype)
 
 
-	def fixity(self, response_format=None):
+	def fixity(self, response_format=None, client_side=False, path=None):
 
 		'''
 		Issues fixity check, return parsed graph
 
+		If client_side is True, the repository is not asked to compute the checksum.  Instead, binary data
+		is streamed and hashed by the client, and compared with the stored premis:hasMessageDigest.
+
 		Args:
-			None
+			response_format (str): mimetype for response of fcr:fixity
+			client_side (bool): if True, stream and hash binary data on the client
+			path (str): optional, for client side fixity, local file path to write streamed binary data
 
 		Returns:
 			(dict): ('verdict':(bool): verdict of fixity check, 'premis_graph':(rdflib.Graph): parsed PREMIS graph from check)
 		'''
 
+		# client side
+		if client_side:
+			if not self.binary.message_digest:
+				raise Exception('premis:hasMessageDigest not found for %s, cannot verify fixity client side' % self.uri)
+			out = open(path, 'wb') if path else None
+			try:
+				for chunk in self.binary.iter_content():
+					if out:
+						out.write(chunk)
+			finally:
+				if out:
+					out.close()
+			return self.binary.fixity_result
+
 		# if no response_format, use default
 		if not response_format:
 			response_format = self.repo.default_serialization
@@ -2107,3 +4817,13 @@ class IndirectContainer(Container):
 			self.add_triple(self.rdf.prefixes.ldp.hasMemberRelation, hasMemberRelation)
 		if insertedContentRelation:
 			self.add_triple(self.rdf.prefixes.ldp.insertedContentRelation, insertedContentRelation)
+
+
+
+# LDP resource types, by name
+LDP_RESOURCE_TYPES = {
+	'NonRDFSource':NonRDFSource,
+	'BasicContainer':BasicContainer,
+	'DirectContainer':DirectContainer,
+	'IndirectContainer':IndirectContainer
+}
@@ -14,5 +14,8 @@ setup(name='pyfc4',
         'rdflib-jsonld',
         'requests'
       ],
+      extras_require={
+        'columnar': ['pyarrow']
+      },
       packages=['pyfc4', 'pyfc4.plugins', 'pyfc4.plugins.pcdm'],
       zip_safe=False)
@@ -1,14 +1,26 @@
 # pyfc4 - tests
 
 from pyfc4.models import *
+from pyfc4.batch import Harvester, BulkImporter, IngestCoordinator, FixityAudit
 
 from tests import localsettings
 
+import concurrent.futures
+import copy
 import datetime
+import email.utils
+import gzip
+import hashlib
 import inspect
+import io
+import json
+import os
 import pdb
+import pickle
 import pytest
 import rdflib
+import socket
+import threading
 import time
 
 # logging
@@ -192,6 +204,144 @@ class TestBasicCRUDPUT(object):
 		assert final_string == 'this is a test, this is only a test'
 
 
+	# binary content retrieved lazily
+	def test_lazy_binary_content(self):
+
+		baz = repo.get_resource('%s/foo/baz' % testing_container_uri)
+		assert baz.binary.mimetype == 'text/plain'
+
+		# content not yet retrieved
+		assert not baz.binary._fetched
+
+		# access data
+		assert baz.binary.data.content.decode('utf-8') == 'this is a test, this is only a test'
+		assert baz.binary._fetched
+
+		# close and confirm retrieved again on access
+		baz.binary.close()
+		assert not baz.binary._fetched
+		assert baz.binary.data.content.decode('utf-8') == 'this is a test, this is only a test'
+
+
+	# seekable reader over byte ranges
+	def test_binary_reader(self):
+
+		baz = repo.get_resource('%s/foo/baz' % testing_container_uri)
+		reader = baz.binary.open(block_size=4, cache_size=2, read_ahead=1)
+		assert reader.seekable()
+		assert reader.read(4) == b'this'
+		reader.seek(-4, io.SEEK_END)
+		assert reader.read() == b'test'
+		reader.seek(0)
+		assert reader.read().decode('utf-8') == 'this is a test, this is only a test'
+		assert not baz.binary._fetched
+
+		# size larger than binary, e.g. stale premis:hasSize, raises instead of hanging
+		reader = baz.binary.open(block_size=64)
+		reader.size += 10
+		with pytest.raises(IOError) as excinfo:
+			reader.read()
+		assert 'expected 45 bytes, received 35' in str(excinfo.value)
+
+
+	# download binary to disk with concurrent ranges
+	def test_binary_download(self, tmpdir):
+
+		baz1 = repo.get_resource('%s/foo/baz1' % testing_container_uri)
+		path = str(tmpdir.join('baz1'))
+		report = baz1.binary.download(path, workers=2, range_size=512)
+		assert report['verdict']
+		assert report['ranges'] == report['fetched']
+		with open(path, 'rb') as f, open('README.md', 'rb') as readme:
+			assert f.read() == readme.read()
+
+		# digest mismatch raises, keeping sidecar without completed ranges
+		baz1.binary.message_digest = 'urn:sha1:%s' % hashlib.sha1(b'not the content').hexdigest()
+		path = str(tmpdir.join('baz1_mismatch'))
+		with pytest.raises(Exception) as excinfo:
+			baz1.binary.download(path, workers=2, range_size=512)
+		assert 'checksum mismatch' in str(excinfo.value)
+		with open('%s.parts' % path) as f:
+			assert json.load(f)['completed'] == []
+		report = baz1.binary.download(path, workers=2, range_size=512, verify=False)
+		assert report['verdict'] == None
+
+
+	# serve binary data from local binary cache
+	def test_binary_cache(self, tmpdir):
+
+		cache = BinaryCache(str(tmpdir.join('binary_cache')), max_size=1048576)
+		cache_repo = Repository(
+			localsettings.REPO_ROOT,
+			localsettings.REPO_USERNAME,
+			localsettings.REPO_PASSWORD,
+			binary_cache=cache)
+
+		# miss, then cached
+		baz = cache_repo.get_resource('%s/foo/baz' % testing_container_uri)
+		algorithm, digest = baz.binary._parse_message_digest()
+		assert not cache.get(algorithm, digest)
+		assert baz.binary.data.read().decode('utf-8') == 'this is a test, this is only a test'
+		assert cache.get(algorithm, digest)
+
+		# hit, served from local file, as response
+		baz = cache_repo.get_resource('%s/foo/baz' % testing_container_uri)
+		assert baz.binary.open().read().decode('utf-8') == 'this is a test, this is only a test'
+		assert type(baz.binary.data) == CachedBinaryResponse
+		assert baz.binary.data.status_code == 200
+		assert baz.binary.data.content.decode('utf-8') == 'this is a test, this is only a test'
+		baz.binary.close()
+
+		# larger than cache, not cached, served from repository
+		small_cache = BinaryCache(str(tmpdir.join('small_binary_cache')), max_size=10)
+		cache_repo.binary_cache = small_cache
+		baz = cache_repo.get_resource('%s/foo/baz' % testing_container_uri)
+		assert type(baz.binary.data) == requests.models.Response
+		assert baz.binary.data.content.decode('utf-8') == 'this is a test, this is only a test'
+		assert not small_cache.get(algorithm, digest)
+		with pytest.raises(Exception):
+			small_cache.put(algorithm, digest, [b'this is a test, this is only a test'])
+
+
+	# revalidate resources from persistent metadata cache
+	def test_metadata_cache(self, tmpdir):
+
+		cache_path = str(tmpdir.join('metadata_cache.db'))
+		cache_repo = Repository(
+			localsettings.REPO_ROOT,
+			localsettings.REPO_USERNAME,
+			localsettings.REPO_PASSWORD,
+			metadata_cache=MetadataCache(cache_path))
+
+		# cold
+		foo = cache_repo.get_resource('%s/foo' % testing_container_uri)
+		assert cache_repo.metadata_cache.get(foo.uri, cache_repo.default_serialization)
+
+		# warm, after restart, served from cache when not modified
+		cache_repo = Repository(
+			localsettings.REPO_ROOT,
+			localsettings.REPO_USERNAME,
+			localsettings.REPO_PASSWORD,
+			metadata_cache=MetadataCache(cache_path))
+		cached_foo = cache_repo.get_resource('%s/foo' % testing_container_uri)
+		assert type(cached_foo) == BasicContainer
+		assert type(cached_foo.response) == CachedResponse
+		assert cached_foo.rdf.graph.isomorphic(foo.rdf.graph)
+
+		# access times of hits held in memory until flushed
+		assert cache_repo.metadata_cache._accessed
+		cache_repo.metadata_cache.flush()
+		assert not cache_repo.metadata_cache._accessed
+
+		# transactions do not use cache, nor create connection pool of their own
+		txn = cache_repo.start_txn()
+		assert txn.metadata_cache is None
+		assert txn.api._adapter is cache_repo.api._adapter
+		txn_foo = txn.get_resource('%s/foo' % testing_container_uri)
+		assert type(txn_foo.response) != CachedResponse
+		txn.rollback()
+
+
 	# test alternate response formats for resource get
 	def test_alternate_formats(self):
 
@@ -262,6 +412,48 @@ class TestBinaryUpload(object):
 		assert baz1.exists
 
 
+	# upload from generator, with chunked transfer and digest computed while streaming
+	def test_generator_upload(self):
+
+		def chunks():
+			for x in range(0, 10):
+				yield ('chunk %s\n' % x).encode('utf-8')
+
+		baz3 = Binary(repo, '%s/foo/baz3' % testing_container_uri)
+		baz3.binary.data = chunks()
+		baz3.binary.mimetype = 'text/plain'
+		baz3.create(specify_uri=True)
+		assert baz3.exists
+
+		# confirm digest matches repository, verified after upload
+		expected = hashlib.sha1(b''.join([ ('chunk %s\n' % x).encode('utf-8') for x in range(0, 10) ])).hexdigest()
+		assert baz3.binary.digests['sha1'] == expected
+		assert baz3.binary.message_digest == 'urn:sha1:%s' % expected
+
+		# mismatch between streamed and stored digest raises
+		baz3.binary._verify_after_upload = True
+		baz3.binary.digests = {'sha1':hashlib.sha1(b'not the content').hexdigest()}
+		with pytest.raises(Exception) as excinfo:
+			baz3.binary._verify_upload()
+		assert 'checksum mismatch' in str(excinfo.value)
+		baz3 = repo.get_resource('%s/foo/baz3' % testing_container_uri)
+		assert baz3.rdf.graph.value(baz3.uri, baz3.rdf.prefixes.premis.hasMessageDigest).toPython() == 'urn:sha1:%s' % expected
+
+
+	# Digest header sent for file-like objects, repository rejects mismatch
+	def test_digest_header(self):
+
+		baz4 = Binary(repo, '%s/foo/baz4' % testing_container_uri)
+		baz4.binary.data = io.BytesIO(b'this is a test, this is only a test')
+		baz4.binary.mimetype = 'text/plain'
+		baz4.binary._prep_binary()
+		assert baz4.headers['Digest'] == 'sha1=%s' % hashlib.sha1(b'this is a test, this is only a test').hexdigest()
+
+		# send different content with same Digest header
+		response = repo.api.http_request('PUT', baz4.uri, data=b'this is not the test', headers=baz4.headers)
+		assert response.status_code == 409
+
+
 	# upload via Content-Location header
 	def test_remote_location(self):
 
@@ -410,6 +602,231 @@ class TestBasicRelationship(object):
 
 
 
+	def test_walk(self):
+
+		# full resources
+		walked = list(repo.walk(testing_container_uri, concurrency=4))
+		uris = [ resource.uri for resource in walked ]
+		assert repo.parse_uri('%s/foo/bar' % testing_container_uri) in uris
+		assert walked[0].uri == repo.parse_uri(testing_container_uri)
+
+		# uris only, depth limited
+		refs = list(repo.walk(testing_container_uri, depth=1, uris_only=True))
+		assert repo.parse_uri('%s/foo' % testing_container_uri) in [ ref.uri for ref in refs ]
+		assert max([ ref.depth for ref in refs ]) == 1
+
+		# only binaries
+		refs = list(repo.walk('%s/foo' % testing_container_uri, uris_only=True, include_types=[NonRDFSource]))
+		assert repo.parse_uri('%s/foo/baz' % testing_container_uri) in [ ref.uri for ref in refs ]
+		assert repo.parse_uri('%s/foo/bar' % testing_container_uri) not in [ ref.uri for ref in refs ]
+
+
+
+	def test_incremental_harvest(self, tmpdir):
+
+		state_path = str(tmpdir.join('harvest.json'))
+
+		# first harvest, all created
+		events = list(Harvester(repo, state_path).harvest(testing_container_uri))
+		assert set([ event for event, uri, resource in events ]) == set(['created'])
+
+		# second harvest, nothing changed
+		events = list(Harvester(repo, state_path).harvest(testing_container_uri))
+		assert events == []
+
+		# add child, and confirm parent changed and child created
+		harvest_child = BasicContainer(repo, '%s/foo/harvest_child' % testing_container_uri)
+		harvest_child.create(specify_uri=True)
+		events = [ (event, uri) for event, uri, resource in Harvester(repo, state_path).harvest(testing_container_uri) ]
+		assert ('changed', repo.parse_uri('%s/foo' % testing_container_uri)) in events
+		assert ('created', harvest_child.uri) in events
+
+		# delete child
+		harvest_child.delete()
+		events = [ (event, uri) for event, uri, resource in Harvester(repo, state_path).harvest(testing_container_uri) ]
+		assert ('deleted', harvest_child.uri) in events
+
+		# triples of descendant changed, reported by default, as containers above are unchanged
+		bar = repo.get_resource('%s/foo/bar' % testing_container_uri)
+		bar.add_triple(bar.rdf.prefixes.dc.description, 'harvested')
+		bar.update()
+		events = [ (event, uri) for event, uri, resource in Harvester(repo, state_path).harvest(testing_container_uri) ]
+		assert ('changed', bar.uri) in events
+
+
+
+	def test_export_nquads(self, tmpdir):
+
+		path = str(tmpdir.join('export.nq.gz'))
+		report = repo.export_nquads(path, root='%s/foo' % testing_container_uri)
+		assert report['resources'] >= 2
+
+		# parse and confirm graph per resource
+		dataset = rdflib.Dataset()
+		with gzip.open(path) as f:
+			dataset.parse(data=f.read().decode('utf-8'), format='nquads')
+		foo = repo.get_resource('%s/foo' % testing_container_uri)
+		assert (foo.uri, foo.rdf.prefixes.ldp.contains, repo.parse_uri('%s/foo/bar' % testing_container_uri), foo.uri) in dataset
+
+
+	# export foo as Parquet
+	def test_export_columnar(self, tmpdir):
+
+		parquet = pytest.importorskip('pyarrow.parquet')
+		path = str(tmpdir.join('export.parquet'))
+		report = repo.export_columnar(path, root='%s/foo' % testing_container_uri, batch_size=10)
+		table = parquet.read_table(path)
+		assert table.num_rows == report['triples']
+		assert table.column_names == ['subject', 'predicate', 'object', 'datatype', 'lang', 'resource']
+
+		# confirm ldp:contains row for foo/bar
+		rows = table.to_pydict()
+		foo_uri = str(repo.parse_uri('%s/foo' % testing_container_uri))
+		assert (foo_uri, 'http://www.w3.org/ns/ldp#contains', '%s/bar' % foo_uri, None) in zip(rows['subject'], rows['predicate'], rows['object'], rows['datatype'])
+
+
+	# bulk import export to new location, and resume
+	def test_bulk_import(self, tmpdir):
+
+		path = str(tmpdir.join('export.nq.gz'))
+		repo.export_nquads(path, root='%s/foo' % testing_container_uri)
+
+		importer = BulkImporter(
+			repo,
+			str(tmpdir.join('import.db')),
+			source_base=str(repo.parse_uri('%s/foo' % testing_container_uri)),
+			target_base=str(repo.parse_uri('%s/foo_import' % testing_container_uri)))
+		assert importer.load(path) >= 2
+		report = importer.run()
+		assert report['created'] >= 2
+		assert report['failed'] == 0
+		assert type(repo.get_resource('%s/foo_import/bar' % testing_container_uri)) == BasicContainer
+
+		# resume creates nothing further
+		assert importer.load(path) == 0
+		assert importer.run()['created'] == 0
+		importer.close()
+
+		# default graph requires explicit target, literals are not rewritten
+		source_base = 'http://example.org/rest/'
+		target_base = str(repo.parse_uri('%s/' % testing_container_uri))
+		path = str(tmpdir.join('default.nq'))
+		with open(path, 'w') as f:
+			f.write('<%simport_default> <http://purl.org/dc/elements/1.1/title> "moved from %simport_default" .\n' % (source_base, source_base))
+			f.write('<%simport_default> <http://purl.org/dc/elements/1.1/extent> "1"^^<http://www.w3.org/2001/XMLSchema#int> .\n' % source_base)
+		importer = BulkImporter(repo, str(tmpdir.join('default.db')), source_base=source_base, target_base=target_base)
+		with pytest.raises(Exception) as excinfo:
+			importer.load(path)
+		assert 'default_graph' in str(excinfo.value)
+		assert importer.load(path, default_graph='%simport_default' % source_base) == 1
+		assert importer.run()['created'] == 1
+		imported = repo.get_resource('%s/import_default' % testing_container_uri)
+		assert imported.rdf.triples.dc.title[0].toPython() == 'moved from %simport_default' % source_base
+		importer.close()
+
+		# interaction model types kept, URIs rewritten on path segment boundaries only
+		source_base = 'http://example.org/rest/foo/'
+		target_base = str(repo.parse_uri(testing_container_uri))
+		path = str(tmpdir.join('direct.nq'))
+		with open(path, 'w') as f:
+			graph = '<http://example.org/rest/foo/import_direct>'
+			f.write('%s <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/ns/ldp#DirectContainer> %s .\n' % (graph, graph))
+			f.write('%s <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/ns/ldp#Container> %s .\n' % (graph, graph))
+			f.write('%s <http://www.w3.org/ns/ldp#membershipResource> <http://example.org/rest/foo> %s .\n' % (graph, graph))
+			f.write('%s <http://www.w3.org/ns/ldp#hasMemberRelation> <http://pcdm.org/models#hasMember> %s .\n' % (graph, graph))
+			f.write('%s <http://purl.org/dc/elements/1.1/relation> <http://example.org/rest/foobar> %s .\n' % (graph, graph))
+		importer = BulkImporter(repo, str(tmpdir.join('direct.db')), source_base=source_base, target_base=target_base)
+		assert importer.load(path) == 1
+		assert importer.run()['created'] == 1
+		imported = repo.get_resource('%s/import_direct' % testing_container_uri)
+		assert type(imported) == DirectContainer
+		assert imported.rdf.graph.value(imported.uri, imported.rdf.prefixes.ldp.membershipResource) == repo.parse_uri(testing_container_uri)
+		assert imported.rdf.graph.value(imported.uri, imported.rdf.prefixes.dc.relation) == rdflib.term.URIRef('http://example.org/rest/foobar')
+		importer.close()
+
+
+	# query local triple index, and answer siblings from index
+	def test_triple_index(self, tmpdir):
+
+		index = TripleIndex(str(tmpdir.join('index.db')))
+		index_repo = Repository(
+			localsettings.REPO_ROOT,
+			localsettings.REPO_USERNAME,
+			localsettings.REPO_PASSWORD,
+			triple_index=index)
+
+		# index with walk
+		list(index_repo.walk(testing_container_uri, uris_only=True))
+		refs = index_repo.query(object=rdflib.term.URIRef('http://www.w3.org/ns/ldp#NonRDFSource'), under='%s/foo' % testing_container_uri)
+		assert index_repo.parse_uri('%s/foo/baz' % testing_container_uri) in [ ref.uri for ref in refs ]
+
+		# who points at foo
+		foo_uri = index_repo.parse_uri('%s/foo' % testing_container_uri)
+		assert index_repo.parse_uri(testing_container_uri) in [ ref.uri for ref in index_repo.query(object=foo_uri) ]
+
+		# siblings from index match repository
+		bar = index_repo.get_resource('%s/foo/bar' % testing_container_uri)
+		assert index.is_fresh(foo_uri)
+		assert set(bar.siblings()) == set(repo.get_resource('%s/foo/bar' % testing_container_uri).siblings())
+
+
+	# consume events from local STOMP broker stand-in, invalidating triple index
+	def test_event_consumer(self, tmpdir):
+
+		index = TripleIndex(str(tmpdir.join('index.db')))
+		index_repo = Repository(
+			localsettings.REPO_ROOT,
+			localsettings.REPO_USERNAME,
+			localsettings.REPO_PASSWORD,
+			triple_index=index)
+		bar = index_repo.get_resource('%s/foo/bar' % testing_container_uri)
+		assert index.is_fresh(bar.uri)
+
+		# broker stand-in, sends CONNECTED, then update events for identifiers
+		def broker(identifiers):
+			server = socket.socket()
+			server.bind(('127.0.0.1', 0))
+			server.listen(1)
+			def serve():
+				connection, address = server.accept()
+				data = b''
+				while not data.endswith(b'\x00'):
+					data += connection.recv(4096)
+				connection.sendall(b'CONNECTED\nversion:1.2\n\n\x00')
+				for identifier in identifiers:
+					connection.sendall(('MESSAGE\ndestination:/topic/fedora\norg.fcrepo.jms.identifier:/%s\norg.fcrepo.jms.baseURL:%s\norg.fcrepo.jms.eventType:http://fedora.info/definitions/v4/event#ResourceModification\n\n\x00' % (identifier, index_repo.root.rstrip('/'))).encode('utf-8'))
+				time.sleep(2)
+				connection.close()
+			threading.Thread(target=serve, daemon=True).start()
+			return server
+
+		# events batched into single invalidation
+		server = broker(['%s/foo/bar' % testing_container_uri] * 10)
+		consumer = EventConsumer(index_repo, host='127.0.0.1', port=server.getsockname()[1], batch_interval=0.5)
+		consumer.start()
+		time.sleep(1)
+		stats = consumer.stop()
+		server.close()
+		assert stats['events'] == 10
+		assert stats['invalidated'] == 1
+		assert not index.is_fresh(bar.uri)
+
+		# event for deleted resource evicted on refresh, consumer continues
+		server = broker(['%s/foo/deleted' % testing_container_uri, '%s/foo/bar' % testing_container_uri])
+		consumer = EventConsumer(index_repo, host='127.0.0.1', port=server.getsockname()[1], batch_interval=0.5, refresh=True)
+		consumer.start()
+		time.sleep(1)
+		assert consumer._thread.is_alive()
+		stats = consumer.stop()
+		server.close()
+		assert stats['events'] == 2
+		assert stats['evicted'] == 1
+		assert stats['refreshed'] == 1
+		assert stats['errors'] == 0
+		assert index.is_fresh(bar.uri)
+
+
+
 class TestBasicCRUDPOST(object):
 
 	# create, get, and delete POSTed resource
@@ -574,6 +991,177 @@ class TestTransactions(object):
 		assert not zingfoo2
 
 
+	# transactions share session, namespace manager, and settings of repository
+	def test_transaction_view(self):
+
+		txn = repo.start_txn()
+		assert txn.repo is repo
+		assert txn.api.session is repo.api.session
+		assert txn.namespace_manager is repo.namespace_manager
+		assert txn.default_serialization == repo.default_serialization
+		assert txn.parse_uri('foo') == rdflib.term.URIRef('%sfoo' % txn.root)
+		txn.rollback()
+
+
+	# buffered transaction as context manager
+	def test_buffered_transaction(self):
+
+		# child buffered before parent, flushed parent first, and committed
+		with repo.transaction(concurrency=2) as txn:
+			child = BasicContainer(txn, '%s/buffered/child' % testing_container_uri)
+			child.create(specify_uri=True)
+			parent = BasicContainer(txn, '%s/buffered' % testing_container_uri)
+			parent.create(specify_uri=True)
+			assert len(txn.buffer) == 2
+			assert not parent.exists
+
+			# reading back flushes pending operations
+			assert txn.get_resource(child.uri).exists
+			assert len(txn.buffer) == 0
+		assert not txn.active
+		assert repo.get_resource('%s/buffered/child' % testing_container_uri).exists
+
+		# buffered create returns resource, and coalesced updates keep flags
+		with repo.transaction() as txn:
+			merged = BasicContainer(txn, '%s/buffered/merged' % testing_container_uri).create(specify_uri=True)
+			assert type(merged) == BasicContainer
+			merged.add_triple(merged.rdf.prefixes.dc.title, 'merged', auto_refresh=False)
+			merged.update(auto_refresh=False)
+			merged.update(auto_refresh=True)
+			assert txn.buffer.operations[id(merged)][1][-1][1]['auto_refresh'] == True
+		assert merged.exists
+		assert merged.rdf.triples.dc.title
+
+		# exception discards buffer and rolls back
+		with pytest.raises(ValueError):
+			with repo.transaction() as txn:
+				BasicContainer(txn, '%s/buffered/discarded' % testing_container_uri).create(specify_uri=True)
+				raise ValueError('abort')
+		assert not txn.active
+		assert not repo.get_resource('%s/buffered/discarded' % testing_container_uri)
+
+		# commit without context manager flushes buffer, rollback discards
+		txn = repo.transaction()
+		BasicContainer(txn, '%s/buffered/committed' % testing_container_uri).create(specify_uri=True)
+		BasicContainer(txn, '%s/buffered/committed/child' % testing_container_uri).create(specify_uri=True)
+		assert len(txn.buffer) == 2
+		assert txn.commit()
+		assert len(txn.buffer) == 0
+		assert repo.get_resource('%s/buffered/committed' % testing_container_uri).exists
+		assert repo.get_resource('%s/buffered/committed/child' % testing_container_uri).exists
+		txn = repo.transaction()
+		BasicContainer(txn, '%s/buffered/rolled_back' % testing_container_uri).create(specify_uri=True)
+		txn.rollback()
+		assert len(txn.buffer) == 0
+		assert not repo.get_resource('%s/buffered/rolled_back' % testing_container_uri)
+
+
+	# reads of resources written within transaction served from overlay
+	def test_transaction_overlay(self):
+
+		# off by default
+		txn = repo.start_txn()
+		assert txn.overlay == None
+		txn.rollback()
+
+		txn = repo.start_txn(overlay=True)
+		overlay_foo = BasicContainer(txn, '%s/overlay_foo' % testing_container_uri)
+		overlay_foo.add_triple(overlay_foo.rdf.prefixes.dc.title, 'overlay')
+		overlay_foo.create(specify_uri=True)
+		assert txn.overlay.get(overlay_foo.uri)
+
+		# served locally
+		resource = txn.get_resource(overlay_foo.uri)
+		assert resource.exists
+		assert (overlay_foo.uri, overlay_foo.rdf.prefixes.dc.title, rdflib.term.Literal('overlay', datatype=rdflib.XSD.string)) in resource.rdf.graph
+
+		# child create forgets parent, delete is not found
+		child = BasicContainer(txn, '%s/overlay_foo/child' % testing_container_uri)
+		child.create(specify_uri=True)
+		assert not txn.overlay.get(overlay_foo.uri)
+		child.delete()
+		assert txn.get_resource(child.uri) == False
+
+		# discarded on rollback
+		txn.rollback()
+		assert len(txn.overlay) == 0
+		assert not repo.get_resource('%s/overlay_foo' % testing_container_uri)
+
+		# repository minted uri, without refresh, recorded with subjects rewritten from parent
+		txn = fast_repo.start_txn(overlay=True)
+		parent_uri = txn.parse_uri(testing_container_uri)
+		minted = BasicContainer(txn, testing_container_uri)
+		minted.add_triple(minted.rdf.prefixes.dc.title, 'minted')
+		minted.create()
+		assert minted.uri != parent_uri
+		resource = txn.get_resource(minted.uri)
+		assert (minted.uri, minted.rdf.prefixes.dc.title, rdflib.term.Literal('minted', datatype=rdflib.XSD.string)) in resource.rdf.graph
+		assert (parent_uri, None, None) not in resource.rdf.graph
+		txn.rollback()
+
+
+	# ingest workload in sharded transactions
+	def test_ingest_coordinator(self):
+
+		# parents kept with children
+		workload = [ {'uri':'%s/shard_%s' % (testing_container_uri, i)} for i in range(4) ]
+		workload += [ {'uri':'%s/shard_%s/child' % (testing_container_uri, i)} for i in range(4) ]
+		coordinator = IngestCoordinator(repo, shards=2, retries=1)
+		shards = coordinator.partition(workload)
+		assert len(shards) == 2
+		for shard in shards:
+			uris = [ item['uri'] for item in shard ]
+			for uri in uris:
+				if uri.endswith('/child'):
+					assert uri.rsplit('/', 1)[0] in uris
+
+		# failed shard retried in new transaction
+		attempts = []
+		def fail_once(txn):
+			attempts.append(txn.name)
+			if len(attempts) == 1:
+				raise Exception('failing first attempt')
+		report = coordinator.run(workload + [fail_once])
+		assert report['failed'] == 0
+		assert report['resources'] == 9
+		assert len(set(attempts)) == 2
+		assert repo.get_resource('%s/shard_3/child' % testing_container_uri)
+
+
+	# renew transactions in background
+	def test_transaction_keep_alive(self):
+
+		keep_alive_repo = Repository(
+			localsettings.REPO_ROOT,
+			localsettings.REPO_USERNAME,
+			localsettings.REPO_PASSWORD,
+			auto_keep_alive=True)
+
+		# margin longer than transaction lifetime is clamped, so not always due
+		scheduler = keep_alive_repo.keep_alive_scheduler
+		scheduler.margin = 10 ** 6
+		txn = keep_alive_repo.start_txn()
+		time.sleep(1)
+		assert scheduler.report()['renewals'] == 0
+
+		# renew after default interval, without parsable expires
+		txn.expires = None
+		scheduler.default_interval = 1
+		scheduler.wake()
+		time.sleep(2)
+		report = scheduler.report()
+		assert report['renewals'] >= 1
+		assert report['latency_mean'] != None
+		assert email.utils.parsedate_to_datetime(txn.expires).timestamp() > time.time()
+
+		# thread stops after commit
+		txn.commit()
+		scheduler.wake()
+		time.sleep(0.5)
+		assert scheduler.report()['active'] == 0
+		assert scheduler._thread == None
+
+
 
 # test moving/copying
 class TestMovingCopying(object):
@@ -632,6 +1220,17 @@ class TestVersions(object):
 		assert type(foo.versions.v1) == ResourceVersion
 		assert type(foo.versions.v2) == ResourceVersion
 
+		# listed without retrieving, until accessed
+		assert not foo.versions.v1.fetched
+		assert type(foo.versions.v1.created) == datetime.datetime
+		assert foo.versions.v1.resource.exists
+		assert foo.versions.v1.fetched
+		assert not foo.versions.v2.fetched
+
+		# retrieve all concurrently
+		foo.get_versions(fetch=True, concurrency=2)
+		assert foo.versions.v2.fetched
+
 
 	def test_delete_version(self):
 
@@ -691,6 +1290,73 @@ class TestFixity(object):
 		assert type(fixity_check['premis_graph']) == rdflib.Graph
 
 
+	def test_client_side_fixity_check(self):
+
+		# test foo/baz, without fcr:fixity
+		baz = repo.get_resource('%s/foo/baz' % testing_container_uri)
+		fixity_check = baz.fixity(client_side=True)
+		assert fixity_check['verdict']
+		assert type(fixity_check['premis_graph']) == rdflib.Graph
+
+		# fixity while reading
+		content = b''.join(baz.binary.iter_content(5))
+		assert content.decode('utf-8') == 'this is a test, this is only a test'
+		assert baz.binary.fixity_result['verdict']
+
+		# no content for resource that does not exist
+		missing = Binary(repo, '%s/foo/missing' % testing_container_uri)
+		with pytest.raises(Exception) as excinfo:
+			next(missing.binary.iter_content(5))
+		assert 'no binary content' in str(excinfo.value)
+
+		# error response is not streamed as content
+		baz.binary._data = repo.api.http_request('GET', '%s/foo/missing' % baz.repo.parse_uri(testing_container_uri), is_rdf=False, stream=True)
+		baz.binary._fetched = True
+		baz.binary.fixity_result = None
+		with pytest.raises(Exception) as excinfo:
+			next(baz.binary.iter_content(5))
+		assert 'HTTP 404' in str(excinfo.value)
+		assert baz.binary.fixity_result == None
+
+
+	def test_fixity_audit(self, tmpdir):
+
+		# register binaries under foo
+		audit = FixityAudit(repo, str(tmpdir.join('ledger.db')), concurrency=2, rate=10)
+		count = audit.add_subtree('%s/foo' % testing_container_uri)
+		assert count >= 2
+
+		# run, then confirm nothing pending within window
+		report = audit.run(limit=1)
+		assert report['checked'] == 1
+		report = audit.run(older_than=3600)
+		assert report['checked'] == count - 1
+		assert report['passed'] == count - 1
+		assert audit.pending(older_than=3600) == []
+		audit.close()
+
+
+	# export foo as BagIt bag
+	def test_export_bag(self, tmpdir):
+
+		bag_dir = str(tmpdir.join('bag'))
+		report = repo.export_bag(bag_dir, root='%s/foo' % testing_container_uri, algorithms=['sha1', 'sha256'], concurrency=2)
+		assert report['binaries'] >= 2
+		assert report['reused'] == 0
+
+		# confirm manifest entry for baz
+		baz_path = 'data/%s/foo/baz.binary' % testing_container_uri
+		with open(os.path.join(bag_dir, baz_path), 'rb') as f:
+			content = f.read()
+		assert content.decode('utf-8') == 'this is a test, this is only a test'
+		with open(os.path.join(bag_dir, 'manifest-sha256.txt')) as f:
+			assert '%s  %s\n' % (hashlib.sha256(content).hexdigest(), baz_path) in f.read()
+
+		# reuse stored digests
+		report = repo.export_bag(str(tmpdir.join('bag_sha1')), root='%s/foo' % testing_container_uri)
+		assert report['reused'] == report['binaries']
+
+
 # updates and refreshing
 class TestUpdatesRefresh(object):
 
@@ -715,6 +1381,101 @@ class TestUpdatesRefresh(object):
 		assert len(list(foo.rdf.diffs.added)) == 0
 
 
+	def test_local_auto_refresh_strategy(self):
+
+		'''
+		confirm that 'local' auto_refresh_strategy refreshes resource without follow-up requests
+		'''
+
+		local_repo = Repository(
+			localsettings.REPO_ROOT,
+			localsettings.REPO_USERNAME,
+			localsettings.REPO_PASSWORD,
+			default_auto_refresh=True,
+			auto_refresh_strategy='local')
+
+		# create with minted uri, confirm subject rewritten to new uri
+		bc = BasicContainer(local_repo, testing_container_uri)
+		bc.add_triple(bc.rdf.prefixes.dc.subject, 'local')
+		bc.create()
+		assert bc.exists
+		assert bc.uri != local_repo.parse_uri(testing_container_uri)
+		assert (bc.uri, bc.rdf.prefixes.dc.subject, rdflib.term.Literal('local', datatype=rdflib.XSD.string)) in bc.rdf.graph
+
+		# update, confirm no pending diffs
+		bc.add_triple(bc.rdf.prefixes.test.favorite_number, 42)
+		bc.update()
+		bc._diff_graph()
+		assert len(list(bc.rdf.diffs.added)) == 0
+
+		# confirm triple was written to repository
+		bc.refresh()
+		assert bc.rdf.triples.test.favorite_number[0].toPython() == 42
+
+		# representation in response parsed, request headers of resource kept, response headers stored separately
+		bc.headers['X-Request-Header'] = 'kept'
+		response = requests.models.Response()
+		response.status_code = 204
+		response.headers['Content-Type'] = 'application/n-triples'
+		response.headers['ETag'] = 'W/"representation"'
+		response._content = ('<%s> <http://purl.org/dc/elements/1.1/subject> "representation" .\n' % bc.uri).encode('utf-8')
+		bc._refresh_from_response(response)
+		assert bc.rdf.triples.dc.subject[0].toPython() == 'representation'
+		assert bc.headers['X-Request-Header'] == 'kept'
+		assert 'ETag' not in bc.headers
+		assert bc.response_headers['ETag'] == 'W/"representation"'
+		assert bc.response_headers is not response.headers
+
+		# 'get' strategy stores response headers of its GET
+		local_repo.auto_refresh_strategy = 'get'
+		bc.add_triple(bc.rdf.prefixes.dc.subject, 'get')
+		bc.update()
+		assert 'ETag' in bc.response_headers
+
+
+	def test_pickle_resource(self):
+
+		'''
+		confirm that resources and transactions survive pickling, with pending modifications
+		'''
+
+		# modify without update, then pickle
+		foo = repo.get_resource('%s/foo' % testing_container_uri)
+		foo.add_triple(foo.rdf.prefixes.test.pickled, 'yes')
+		unpickled_foo = pickle.loads(pickle.dumps(foo))
+		assert unpickled_foo.uri == foo.uri
+		assert unpickled_foo.response == None
+		assert unpickled_foo.repo.api.session is not repo.api.session
+		unpickled_foo._diff_graph()
+		assert len(list(unpickled_foo.rdf.diffs.added)) == 1
+		assert unpickled_foo.rdf.triples.test.pickled
+
+		# blank nodes shared by current and original graphs stay shared, without spurious diffs
+		bnode_bc = BasicContainer(repo, '%s/pickled_bnode' % testing_container_uri)
+		bnode = rdflib.term.BNode()
+		bnode_bc.add_triple(bnode_bc.rdf.prefixes.dc.relation, bnode)
+		bnode_bc.rdf.graph.add((bnode, bnode_bc.rdf.prefixes.dc.title, rdflib.term.Literal('bnode')))
+		bnode_bc.rdf._orig_graph = copy.deepcopy(bnode_bc.rdf.graph)
+		unpickled_bnode_bc = pickle.loads(pickle.dumps(bnode_bc))
+		unpickled_bnode_bc._diff_graph()
+		assert len(unpickled_bnode_bc.rdf.graph) == 2
+		assert len(list(unpickled_bnode_bc.rdf.diffs.added)) == 0
+		assert len(list(unpickled_bnode_bc.rdf.diffs.removed)) == 0
+
+		# send pending modification from unpickled resource
+		unpickled_foo.update()
+		foo.refresh()
+		assert foo.rdf.triples.test.pickled
+
+		# transactions registered with unpickled repository
+		txn = repo.start_txn()
+		unpickled_txn = pickle.loads(pickle.dumps(txn))
+		assert unpickled_txn.repo.txns[txn.name] is unpickled_txn
+		assert unpickled_txn.api.session is unpickled_txn.repo.api.session
+		assert unpickled_txn.get_resource('%s/foo' % testing_container_uri)
+		txn.rollback()
+
+
 	def test_binary_update_data_type(self):
 
 		'''
@@ -758,6 +1519,54 @@ class TestUpdatesRefresh(object):
 
 
 
+# sharing repository across threads
+class TestConcurrency(object):
+
+	def test_context_per_instance(self):
+
+		# context of one instance does not leak into others, and is read-only
+		assert 'foo' in repo.context
+		assert 'foo' not in fast_repo.context
+		assert 'foo' not in Repository.context
+		with pytest.raises(TypeError):
+			repo.context['bar'] = 'http://bar.com'
+
+
+	def test_repository_threads(self):
+
+		'''
+		hammer one repository instance from many threads, reading, writing, and opening transactions
+		'''
+
+		# keep references to sessions, per thread, so distinct sessions cannot share an id()
+		sessions = {}
+		sessions_lock = threading.Lock()
+		def worker(i):
+			session = fast_repo.api.session
+			with sessions_lock:
+				assert sessions.setdefault(threading.get_ident(), session) is session
+			bc = BasicContainer(fast_repo, '%s/thread_%s' % (testing_container_uri, i))
+			bc.add_triple(bc.rdf.prefixes.dc.title, 'thread %s' % i, auto_refresh=False)
+			bc.create(specify_uri=True)
+			retrieved = fast_repo.get_resource(bc.uri)
+			assert retrieved.rdf.triples.dc.title[0].toPython() == 'thread %s' % i
+			txn = fast_repo.start_txn()
+			assert txn.get_resource(bc.uri)
+			txn.rollback()
+			assert fast_repo.api.session is session
+			return txn.name
+
+		with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+			names = list(executor.map(worker, range(200)))
+
+		# every transaction registered, each thread with own session, stable across calls
+		assert set(names) <= set(fast_repo.txns.keys())
+		assert 1 <= len(sessions) <= 16
+		assert len(set([ id(session) for session in sessions.values() ])) == len(sessions)
+		assert len(list(fast_repo.get_resource(testing_container_uri).children())) >= 200
+
+
+
 
 ########################################################
 # TEARDOWN